@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Component micro-benchmarks for Vantage AI PersonaPilot
+
+Times the CPU-bound stages of the persona pipeline in isolation:
+prompt construction (BasePersona.format_prompt, PromptEngine.create_dynamic_prompt),
+query preprocessing (analyze_query, uncached and cached),
+retrieval (RAGSystem.retrieve_relevant_documents at 1k/100k/1M documents),
+JSON parsing in AIClient.generate_structured_response (against a zero-latency
+stub backend), and every OutputFormatter format and render target.
+
+Usage:
+    python benchmarks/bench_components.py [--quick] [--rag-sizes 1000,100000,1000000]
+                                          [--only prompts,rag,json,formatters]
+"""
+
+import json
+import random
+import tempfile
+
+from harness import BenchmarkReport, make_parser, measure, quiet_logging
+
+from src.core.ai_client import AIClient
+from src.core.backends import StubBackend
+from src.core.json_repair import parse_json_response
+from src.core.model_router import ComplexityClassifier
+from src.core.output_formatter import OutputFormatter
+from src.core.prompt_engine import PromptEngine
+from src.core.query_analysis import QueryAnalysis, analyze_query
+from src.core.rag_system import RAGSystem
+from src.core.render_plan import TARGETS
+from src.core.response_schema import sample_from_schema, to_response_schema
+from src.personas.registry import PersonaRegistry
+
+QUERY = "How can I plan a cheap weekend trip and still learn something useful about Python?"
+
+VOCABULARY = (
+    "python travel budget startup market code test deploy trip hostel train flight "
+    "student study exam loan invest growth team product customer story planet robot "
+    "galaxy network meeting strategy revenue cost cheap weekend learn plan api data "
+    "cache database latency service cloud design review hotel museum food city"
+).split()
+
+
+def synthetic_documents(count: int, words_per_doc: int = 12, seed: int = 7) -> list:
+    """Documents in the shape RAGSystem stores them"""
+    rng = random.Random(seed)
+    return [
+        {"id": index, "content": " ".join(rng.choices(VOCABULARY, k=words_per_doc)), "metadata": {}}
+        for index in range(count)
+    ]
+
+
+def bench_prompts(report: BenchmarkReport, registry: PersonaRegistry, min_time: float):
+    for name in registry.names():
+        persona = registry.get(name)
+        state = persona.create_state()
+        report.add(f"format_prompt/{name}", measure(
+            lambda: persona.format_prompt(QUERY, state=state), min_time=min_time))
+        for index in range(10):
+            state.add_context(f"Earlier the user asked about {VOCABULARY[index]} and {VOCABULARY[-index - 1]}")
+        report.add(f"format_prompt/{name}/with_memory", measure(
+            lambda: persona.format_prompt(QUERY, state=state), min_time=min_time))
+        report.add(f"format_prompt/{name}/with_instructions_off", measure(
+            lambda: persona.format_prompt(QUERY, state=state, include_format_instructions=False),
+            min_time=min_time))
+
+    engine = PromptEngine()
+    system_prompt = registry.get("developer").get_system_prompt()
+    for complexity in ("simple", "medium", "complex"):
+        report.add(f"create_dynamic_prompt/{complexity}", measure(
+            lambda: engine.create_dynamic_prompt(system_prompt, QUERY, complexity=complexity),
+            min_time=min_time))
+    classifier = ComplexityClassifier()
+    report.add("classify_complexity", measure(
+        lambda: classifier.classify(QUERY), min_time=min_time))
+    # Uncached cost of the shared query preprocessing, and the cache hit every later stage pays
+    report.add("analyze_query/uncached", measure(
+        lambda: QueryAnalysis(QUERY).embedding, min_time=min_time))
+    report.add("analyze_query/cached", measure(
+        lambda: analyze_query(QUERY).embedding, min_time=min_time))
+    context = " ".join(VOCABULARY * 5)
+    report.add("create_dynamic_prompt/rag_context", measure(
+        lambda: engine.create_dynamic_prompt(system_prompt, QUERY, context=context), min_time=min_time))
+
+
+def bench_rag(report: BenchmarkReport, sizes: list, quick: bool):
+    with tempfile.TemporaryDirectory() as vector_db_path:
+        rag = RAGSystem(vector_db_path=vector_db_path)
+        for size in sizes:
+            # Populate directly: add_document() rewrites documents.json on every call
+            rag.documents = synthetic_documents(size)
+            iterations = max(3, min(200, 2000000 // size)) if not quick else 3
+            report.add(f"rag_retrieve/{size}", measure(
+                lambda: rag.retrieve_relevant_documents(QUERY, top_k=5),
+                iterations=iterations, warmup=1), documents=size, top_k=5)
+        rag.documents = []
+
+
+def bench_json(report: BenchmarkReport, registry: PersonaRegistry, min_time: float):
+    schema = registry.get("developer").get_output_format()
+    document = json.dumps(sample_from_schema(to_response_schema(schema)), indent=2)
+    inputs = {
+        "valid": document,
+        "fenced": f"Here is the plan:\n```json\n{document}\n```\nGood luck!",
+        "repair": document.replace('"\n', '",\n', 3).replace("}", ",}", 2),
+        "truncated": document[: len(document) * 2 // 3],
+    }
+    for case, text in inputs.items():
+        report.add(f"parse_json_response/{case}", measure(
+            lambda: parse_json_response(text, schema), min_time=min_time), chars=len(text))
+
+    for case in ("valid", "fenced", "repair"):
+        text = inputs[case]
+        client = AIClient(backend=StubBackend(latency_ms=0, responder=lambda prompt: text), coalesce=False)
+        report.add(f"generate_structured_response/{case}", measure(
+            lambda: client.generate_structured_response("prompt", schema=schema), min_time=min_time))
+
+    client = AIClient(backend=StubBackend(latency_ms=0), coalesce=False)
+    report.add("generate_structured_response/json_mode", measure(
+        lambda: client.generate_structured_response("prompt", schema=schema), min_time=min_time))
+
+
+def bench_formatters(report: BenchmarkReport, registry: PersonaRegistry, min_time: float):
+    formatter = OutputFormatter(registry=registry)
+    for name in registry.names():
+        persona = registry.get(name)
+        data = sample_from_schema(to_response_schema(persona.get_output_format()))
+        for format_type in formatter.formatters:
+            report.add(f"format_response/{format_type}/{name}", measure(
+                lambda: formatter.format_response(data, format_type, name), min_time=min_time))
+        for target in TARGETS:
+            report.add(f"format_for_persona/{target}/{name}", measure(
+                lambda: formatter.format_for_persona(data, persona, target=target), min_time=min_time))
+
+
+def main():
+    parser = make_parser("components", "Component micro-benchmarks")
+    parser.add_argument("--rag-sizes", default="1000,100000,1000000",
+                        help="Comma-separated document counts for retrieval")
+    parser.add_argument("--only", default="prompts,rag,json,formatters",
+                        help="Comma-separated groups to run")
+    args = parser.parse_args()
+    quiet_logging()
+
+    groups = set(args.only.split(","))
+    min_time = 0.05 if args.quick else 0.3
+    sizes = [int(size) for size in args.rag_sizes.split(",")]
+    if args.quick:
+        sizes = [size for size in sizes if size <= 100000]
+
+    registry = PersonaRegistry(discover_entry_points=False)
+    report = BenchmarkReport("components")
+    if "prompts" in groups:
+        bench_prompts(report, registry, min_time)
+    if "rag" in groups:
+        bench_rag(report, sizes, args.quick)
+    if "json" in groups:
+        bench_json(report, registry, min_time)
+    if "formatters" in groups:
+        bench_formatters(report, registry, min_time)
+    report.write(args.output)
+
+
+if __name__ == "__main__":
+    main()
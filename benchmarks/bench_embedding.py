@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Embedding micro-batching benchmark for Vantage AI PersonaPilot
+
+Concurrent callers encode one text each, either by calling the encoder
+directly (batch size 1 per call) or through EmbeddingService, which merges
+concurrent requests into batches. Reports p50/p99 latency, throughput and
+the mean batch size at each concurrency level.
+
+The encoder is the sentence-transformers model when installed. Otherwise a
+simulated encoder is used that sleeps for a fixed per-call overhead plus a
+per-text cost, one call at a time, which is the cost profile that makes
+batching pay off.
+
+Usage:
+    python benchmarks/bench_embedding.py [--quick] [--concurrency 1,8,32]
+                                         [--requests 512] [--max-wait-ms 0,5]
+                                         [--encoder auto|sentence-transformers|simulated|hashed]
+                                         [--overhead-ms 8] [--per-text-ms 0.4]
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import threading
+import time
+
+from harness import BenchmarkReport, make_parser, quiet_logging, summarize
+
+from src.core.embedding_service import EmbeddingService, HashedEncoder, SentenceTransformerEncoder
+from src.utils.config import get_config
+from src.utils.lazy_imports import optional_import
+
+
+class SimulatedEncoder:
+    """Sleeps like a model call: fixed overhead per call plus a cost per text
+
+    Calls run one at a time, as on a CPU model whose single call already uses
+    every core; concurrent callers queue for it.
+    """
+
+    name = "simulated"
+    dimension = 384
+
+    def __init__(self, overhead_ms: float, per_text_ms: float):
+        self.overhead = overhead_ms / 1000.0
+        self.per_text = per_text_ms / 1000.0
+        self._busy = threading.Lock()
+
+    def encode(self, texts):
+        with self._busy:
+            time.sleep(self.overhead + self.per_text * len(texts))
+        return [[0.0] * self.dimension for _ in texts]
+
+
+def build_encoder(args):
+    choice = args.encoder
+    if choice == "auto":
+        choice = "sentence-transformers" if optional_import("sentence_transformers") else "simulated"
+    if choice == "sentence-transformers":
+        return SentenceTransformerEncoder(get_config().embedding_model)
+    if choice == "hashed":
+        return HashedEncoder()
+    return SimulatedEncoder(args.overhead_ms, args.per_text_ms)
+
+
+def run_level(encode, concurrency: int, total: int) -> dict:
+    """Issue `total` single-text encodes from `concurrency` threads"""
+    counter = itertools.count()
+    latencies = []
+    lock = threading.Lock()
+
+    def one_request(_):
+        # Distinct texts, so nothing is deduplicated within a batch
+        text = f"Query {next(counter)}: how do I plan a cheap weekend trip?"
+        start = time.perf_counter()
+        encode(text)
+        elapsed = (time.perf_counter() - start) * 1000.0
+        with lock:
+            latencies.append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one_request, range(total)))
+    wall = time.perf_counter() - started
+
+    stats = summarize(latencies)
+    stats.pop("ops_per_sec")
+    stats["throughput_rps"] = total / wall
+    return stats
+
+
+def main():
+    parser = make_parser("embedding", "Micro-batched vs per-call embedding")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated caller counts")
+    parser.add_argument("--requests", type=int, default=512, help="Encodes per concurrency level")
+    parser.add_argument("--max-wait-ms", default="0,5", help="Comma-separated batching windows")
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--encoder", default="auto",
+                        choices=["auto", "sentence-transformers", "simulated", "hashed"])
+    parser.add_argument("--overhead-ms", type=float, default=8.0, help="Simulated per-call overhead")
+    parser.add_argument("--per-text-ms", type=float, default=0.4, help="Simulated per-text cost")
+    args = parser.parse_args()
+    quiet_logging()
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    windows = [float(window) for window in args.max_wait_ms.split(",")]
+    total = min(args.requests, 128) if args.quick else args.requests
+    encoder = build_encoder(args)
+    # Load the model and warm up outside the timings
+    encoder.encode(["warm up"])
+
+    report = BenchmarkReport("embedding")
+    for concurrency in levels:
+        stats = run_level(lambda text: encoder.encode([text]), concurrency, total)
+        report.add(f"{encoder.name}/per_call/concurrency_{concurrency}", stats,
+                   concurrency=concurrency, requests=total, mean_batch_size=1.0)
+        for window in windows:
+            service = EmbeddingService(encoder, max_batch_size=args.max_batch_size, max_wait_ms=window)
+            stats = run_level(service.embed, concurrency, total)
+            service.close()
+            mean_batch = service.get_stats()["mean_batch_size"]
+            report.add(f"{encoder.name}/batched_wait_{window:g}ms/concurrency_{concurrency}", stats,
+                       concurrency=concurrency, requests=total, max_wait_ms=window,
+                       max_batch_size=args.max_batch_size, mean_batch_size=mean_batch)
+    report.write(args.output)
+
+
+if __name__ == "__main__":
+    main()
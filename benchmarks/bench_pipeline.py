@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+End-to-end throughput benchmark for Vantage AI PersonaPilot
+
+Drives PersonaManager.get_response (prompt construction, model call through
+the resilience/coalescing layers, JSON parsing and formatting) against the
+stub backend from a thread pool at several concurrency levels, and records
+throughput with p50/p99 request latency for each level. With --cpu-workers,
+JSON repair and formatting run on a ProcessWorkerPool, for comparison with
+the threads-only mode.
+
+With --offload-sizes, the pool's offload threshold is measured instead: for
+model replies of each size, JSON repair and persona formatting are timed in
+the calling process and on a worker. The smallest size from which the worker
+stays within 15% of local (the round trip is then small next to the work,
+and the caller's GIL is free meanwhile) is reported per stage. The repair
+crossover sets process_pool.DEFAULT_MIN_OFFLOAD_CHARS (valid replies are
+never offloaded) and the format crossover FORMAT_OFFLOAD_FACTOR.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--quick] [--concurrency 1,4,16,64]
+                                        [--requests 400] [--latency-ms 50]
+                                        [--latency-distribution lognormal]
+                                        [--cpu-workers 0]
+                                        [--offload-sizes 1024,4096,16384,65536,262144]
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import json
+import threading
+import time
+
+from harness import BenchmarkReport, make_parser, measure, quiet_logging, summarize
+
+from src.core.ai_client import AIClient
+from src.core.backends import StubBackend
+from src.core.json_repair import parse_json_response
+from src.core.output_formatter import OutputFormatter
+from src.core.persona_manager import PersonaManager
+from src.core.process_pool import ProcessWorkerPool, _format_for_persona, _parse_json
+from src.core.resilience import CircuitBreaker, ResilientCaller, RetryPolicy
+from src.core.response_schema import sample_from_schema, to_response_schema
+from src.personas.registry import PersonaRegistry
+
+
+def build_manager(args, worker_pool=None) -> PersonaManager:
+    backend = StubBackend(
+        latency_ms=args.latency_ms,
+        latency_distribution=args.latency_distribution,
+        latency_jitter_ms=args.latency_ms / 4.0 if args.latency_distribution != "fixed" else 0.0,
+        error_rate=args.error_rate,
+        seed=1
+    )
+    resilience = ResilientCaller(RetryPolicy(max_attempts=3, base_delay=0.01, max_delay=0.05), CircuitBreaker())
+    client = AIClient(backend=backend, resilience=resilience, coalesce=not args.no_coalesce,
+                      json_parser=worker_pool.parse_json_response if worker_pool is not None else None)
+    return PersonaManager(client, registry=PersonaRegistry(discover_entry_points=False), worker_pool=worker_pool)
+
+
+def run_level(manager: PersonaManager, concurrency: int, total: int, output_format: str) -> dict:
+    """Issue `total` requests with `concurrency` workers; returns stats including throughput"""
+    personas = manager.list_personas()
+    counter = itertools.count()
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one_request(_):
+        nonlocal errors
+        index = next(counter)
+        # Unique queries and sessions so requests are neither coalesced nor share memory
+        persona = personas[index % len(personas)]
+        start = time.perf_counter()
+        response = manager.get_response(persona, f"Request {index}: plan my week", output_format=output_format,
+                                        session_id=f"bench-{index % 256}")
+        elapsed = (time.perf_counter() - start) * 1000.0
+        with lock:
+            latencies.append(elapsed)
+            if isinstance(response, str) and response.startswith("Sorry, I encountered an error"):
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one_request, range(total)))
+    wall = time.perf_counter() - started
+
+    stats = summarize(latencies)
+    stats.pop("ops_per_sec")
+    stats["throughput_rps"] = total / wall
+    stats["wall_s"] = wall
+    stats["errors"] = errors
+    return stats
+
+
+# Worker / local mean time up to which offloading counts as break-even
+OFFLOAD_TOLERANCE = 1.15
+
+
+def sized_reply(schema: dict, chars: int) -> dict:
+    """A response following the schema, with its lists grown until the JSON is about `chars` long"""
+    data = sample_from_schema(to_response_schema(schema))
+    lists = [value for value in data.values() if isinstance(value, list) and value]
+    while lists and len(json.dumps(data)) < chars:
+        for values in lists:
+            values.extend(values[:max(1, len(values))])
+    return data
+
+
+def bench_offload(report: BenchmarkReport, worker_pool: ProcessWorkerPool, sizes: list, min_time: float):
+    """Time repair and formatting locally and on a worker for replies of each size"""
+    registry = PersonaRegistry(discover_entry_points=False)
+    formatter = OutputFormatter(registry=registry)
+    persona = registry.get("developer")
+    schema = persona.get_output_format()
+    # stage -> [(size, worker / local mean time)]
+    ratios = {}
+    for size in sorted(sizes):
+        data = sized_reply(schema, size)
+        # Trailing commas send the reply down the repair path, the only one that is offloaded
+        text = json.dumps(data, indent=2).replace("}", ",}", 8)
+        stages = {
+            "repair": (lambda: parse_json_response(text, schema),
+                       lambda: worker_pool.submit(_parse_json, text, schema).result()),
+            "format": (lambda: formatter.format_for_persona(data, persona, schema=schema),
+                       lambda: worker_pool.submit(_format_for_persona, persona.name, data, schema).result()),
+        }
+        for stage, (local, offloaded) in stages.items():
+            local_stats = measure(local, min_time=min_time)
+            offloaded_stats = measure(offloaded, min_time=min_time)
+            report.add(f"offload/{stage}/{size}/local", local_stats, reply_chars=len(text))
+            report.add(f"offload/{stage}/{size}/worker", offloaded_stats, reply_chars=len(text))
+            ratios.setdefault(stage, []).append((size, offloaded_stats["mean_ms"] / local_stats["mean_ms"]))
+
+    crossover = {}
+    for stage, points in ratios.items():
+        crossover[f"{stage}_chars"] = None
+        for size, ratio in reversed(points):
+            if ratio > OFFLOAD_TOLERANCE:
+                break
+            crossover[f"{stage}_chars"] = size
+    report.add("offload/crossover", crossover)
+    print(f"Smallest reply worth offloading: {crossover}")
+
+
+def main():
+    parser = make_parser("pipeline", "End-to-end persona pipeline throughput")
+    parser.add_argument("--concurrency", default="1,4,16,64", help="Comma-separated worker counts")
+    parser.add_argument("--requests", type=int, default=400, help="Requests per concurrency level")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Mean stub model latency")
+    parser.add_argument("--latency-distribution", default="lognormal")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Injected retryable error rate")
+    parser.add_argument("--output-format", default="structured", choices=["structured", "raw", "text"])
+    parser.add_argument("--no-coalesce", action="store_true")
+    parser.add_argument("--cpu-workers", type=int, default=0, help="Worker processes for CPU-bound stages (0: threads only)")
+    parser.add_argument("--offload-sizes", default="",
+                        help="Comma-separated reply sizes (chars): measure the local vs worker crossover instead")
+    args = parser.parse_args()
+    quiet_logging()
+
+    if args.offload_sizes:
+        worker_pool = ProcessWorkerPool(workers=max(1, args.cpu_workers)).start()
+        report = BenchmarkReport("pipeline")
+        try:
+            bench_offload(report, worker_pool, [int(size) for size in args.offload_sizes.split(",")],
+                          0.05 if args.quick else 1.0)
+        finally:
+            worker_pool.shutdown()
+        report.write(args.output)
+        return
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    total = args.requests
+    if args.quick:
+        total = min(total, 40)
+        args.latency_ms = min(args.latency_ms, 5.0)
+
+    worker_pool = ProcessWorkerPool(workers=args.cpu_workers).start() if args.cpu_workers else None
+    manager = build_manager(args, worker_pool)
+    suffix = f"/workers_{args.cpu_workers}" if worker_pool is not None else ""
+    report = BenchmarkReport("pipeline")
+    try:
+        for concurrency in levels:
+            # Warm the persona registry and render-plan caches outside the timings
+            run_level(manager, concurrency, min(concurrency, total), args.output_format)
+            stats = run_level(manager, concurrency, total, args.output_format)
+            report.add(f"get_response/concurrency_{concurrency}{suffix}", stats, concurrency=concurrency,
+                       requests=total, latency_ms=args.latency_ms, cpu_workers=args.cpu_workers,
+                       latency_distribution=args.latency_distribution, output_format=args.output_format)
+    finally:
+        if worker_pool is not None:
+            worker_pool.shutdown()
+    report.write(args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark for Vantage AI PersonaPilot
+
+Measures wall time of importing key modules (and building a stub-backed
+PersonaManager) in fresh interpreters, plus the heaviest imports reported by
+`python -X importtime`.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 10] [--output benchmarks/results/startup.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    "import_src_core": "import src.core",
+    "import_persona_manager": "import src.core.persona_manager",
+    "import_ai_client": "import src.core.ai_client",
+    "import_output_formatter": "import src.core.output_formatter",
+    "load_config": "from src.utils.config import get_config; get_config()",
+    "stub_pipeline_ready": (
+        "from src.core.ai_client import AIClient\n"
+        "from src.core.backends import StubBackend\n"
+        "from src.core.persona_manager import PersonaManager\n"
+        "PersonaManager(AIClient(backend=StubBackend(latency_ms=0))).get_persona('college_student')"
+    ),
+}
+
+
+def time_snippet(code: str, runs: int) -> dict:
+    """Run a snippet in fresh interpreters and return wall-time stats in ms"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return {
+        "runs": runs,
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+        "max_ms": max(samples)
+    }
+
+
+def top_imports(code: str, limit: int = 10) -> list:
+    """Get the modules with the highest cumulative import time (microseconds)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, check=True, capture_output=True, text=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        rows.append({"module": name, "self_us": int(self_us), "cumulative_us": int(cumulative_us)})
+    rows.sort(key=lambda row: row["cumulative_us"], reverse=True)
+    return rows[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup-time benchmark")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--output", default=os.path.join(ROOT, "benchmarks", "results", "startup.json"))
+    args = parser.parse_args()
+    
+    baseline = time_snippet("pass", args.runs)
+    results = {"interpreter_baseline": baseline}
+    for name, code in TARGETS.items():
+        results[name] = time_snippet(code, args.runs)
+        results[name]["over_baseline_ms"] = results[name]["median_ms"] - baseline["median_ms"]
+        print(f"{name:28s} median {results[name]['median_ms']:8.1f} ms "
+              f"(+{results[name]['over_baseline_ms']:.1f} ms over bare interpreter)")
+    
+    report = {
+        "benchmark": "startup",
+        "python": sys.version.split()[0],
+        "results": results,
+        "top_imports": top_imports(TARGETS["stub_pipeline_ready"])
+    }
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Connection reuse benchmark for the Gemini REST backend
+
+Runs GeminiRestBackend against a local HTTP server that mimics the
+generateContent endpoint. The server pays a simulated handshake cost on
+every new connection (standing in for TCP + TLS setup), so the latency gap
+between pooled keep-alive connections and a new connection per call shows
+up the way it does against the real API. For each scenario the report
+includes p50/p99 latency and the connection reuse rate from
+GeminiRestBackend.transport_stats().
+
+Usage:
+    python benchmarks/bench_transport.py [--quick] [--requests 400] [--concurrency 16]
+                                         [--handshake-ms 30] [--latency-ms 5]
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import multiprocessing
+import threading
+import time
+
+from harness import BenchmarkReport, make_parser, quiet_logging, summarize
+
+from src.core.backends.gemini_rest import GeminiRestBackend
+from src.core.backends.transport import TransportConfig
+
+
+def serve(handshake_ms: float, latency_ms: float, ports: "multiprocessing.Queue"):
+    """Local stand-in for the Gemini API (run in its own process, so it does not share the client's GIL)"""
+    payload = json.dumps({
+        "candidates": [{"content": {"role": "model", "parts": [{"text": "Benchmark response"}]}}],
+        "usageMetadata": {"promptTokenCount": 12, "candidatesTokenCount": 3}
+    }).encode("utf-8")
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            super().setup()
+            # Runs once per accepted connection
+            time.sleep(handshake_ms / 1000.0)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(latency_ms / 1000.0)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            if self.headers.get("Connection", "").lower() == "close":
+                self.send_header("Connection", "close")
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        # Room for a burst of concurrent connects (the default backlog is 5)
+        request_queue_size = 256
+        daemon_threads = True
+
+    server = Server(("127.0.0.1", 0), Handler)
+    ports.put(server.server_address[1])
+    server.serve_forever()
+
+
+def run_scenario(endpoint: str, transport: TransportConfig, total: int, concurrency: int) -> dict:
+    backend = GeminiRestBackend(api_key="benchmark", transport=TransportConfig(
+        transport="rest", pool_size=transport.pool_size, keepalive=transport.keepalive, endpoint=endpoint
+    ))
+    latencies = []
+    lock = threading.Lock()
+
+    def one_request(index):
+        start = time.perf_counter()
+        backend.generate(f"Request {index}", "gemini-2.0-flash")
+        elapsed = (time.perf_counter() - start) * 1000.0
+        with lock:
+            latencies.append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one_request, range(total)))
+    wall = time.perf_counter() - started
+
+    stats = summarize(latencies)
+    stats.pop("ops_per_sec")
+    stats["throughput_rps"] = total / wall
+    transport_stats = backend.transport_stats()
+    stats["reuse_rate"] = transport_stats["reuse_rate"]
+    stats["connections_opened"] = transport_stats["connections_opened"]
+    backend.close()
+    return stats
+
+
+def main():
+    parser = make_parser("transport", "Gemini REST connection reuse")
+    parser.add_argument("--requests", type=int, default=400, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent callers")
+    parser.add_argument("--handshake-ms", type=float, default=30.0, help="Simulated cost of a new connection")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Simulated server processing time")
+    args = parser.parse_args()
+    quiet_logging()
+
+    total = min(args.requests, 80) if args.quick else args.requests
+    ports: "multiprocessing.Queue" = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, args=(args.handshake_ms, args.latency_ms, ports), daemon=True)
+    server.start()
+    endpoint = f"http://127.0.0.1:{ports.get(timeout=10)}"
+
+    scenarios = {
+        "keepalive_pool_matched": TransportConfig(transport="rest", pool_size=args.concurrency),
+        "keepalive_pool_undersized": TransportConfig(transport="rest", pool_size=max(1, args.concurrency // 4)),
+        "no_keepalive": TransportConfig(transport="rest", pool_size=args.concurrency, keepalive=False),
+    }
+    report = BenchmarkReport("transport")
+    try:
+        for name, transport in scenarios.items():
+            stats = run_scenario(endpoint, transport, total, args.concurrency)
+            report.add(f"gemini_rest/{name}", stats, pool_size=transport.pool_size,
+                       keepalive=transport.keepalive, concurrency=args.concurrency, requests=total,
+                       handshake_ms=args.handshake_ms, latency_ms=args.latency_ms)
+    finally:
+        server.terminate()
+    report.write(args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Recall/memory benchmark for the quantized RAG vector index
+
+Builds VectorStore indexes over synthetic clustered, normalized embeddings
+with each quantization (none, int8, pq at several sizes) and re-scoring
+factor, then searches perturbed copies of indexed vectors. For every
+configuration the report has recall@k against exact float32 search, the
+in-memory bytes per vector and the query latency.
+
+Usage:
+    python benchmarks/bench_vector_store.py [--quick] [--vectors 100000] [--dimension 384]
+                                            [--queries 200] [--top-k 10]
+                                            [--pq-subvectors 16,48,96] [--rescore 0,4,16]
+"""
+
+import tempfile
+import time
+
+from harness import BenchmarkReport, make_parser, quiet_logging, summarize
+
+from src.core.vector_store import INT8, NONE, PQ, VectorStore
+from src.utils.lazy_imports import require
+
+
+def synthetic_embeddings(np, count: int, dimension: int, seed: int = 3):
+    """Normalized vectors around a few hundred topic centers, like sentence embeddings of a corpus"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(16, count // 100), dimension)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), count)]
+    vectors += 0.6 * rng.normal(size=(count, dimension)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def run_config(np, vectors, queries, truth, top_k: int, quantization: str, pq_subvectors: int, rescore: int) -> dict:
+    store = VectorStore(tempfile.mkdtemp(prefix="bench-index-"), vectors.shape[1], quantization,
+                        pq_subvectors=pq_subvectors, rescore_factor=rescore)
+    started = time.perf_counter()
+    store.add(vectors)
+    store.save()
+    build_s = time.perf_counter() - started
+
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        results = store.search(query, top_k)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+        hits += len({row for row, _ in results} & set(expected.tolist()))
+
+    stats = summarize(latencies)
+    stats[f"recall_at_{top_k}"] = hits / (len(queries) * top_k)
+    stats["memory_bytes"] = store.memory_bytes()
+    stats["bytes_per_vector"] = store.memory_bytes() / len(store)
+    stats["compression"] = store.get_stats()["full_precision_bytes"] / store.memory_bytes()
+    stats["build_s"] = build_s
+    return stats
+
+
+def main():
+    parser = make_parser("vector_store", "Quantized vector index recall vs memory")
+    parser.add_argument("--vectors", type=int, default=100000, help="Indexed vectors")
+    parser.add_argument("--dimension", type=int, default=384, help="Embedding dimension")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--pq-subvectors", default="16,48,96", help="Comma-separated PQ sizes (bytes per vector)")
+    parser.add_argument("--rescore", default="0,4,16", help="Comma-separated re-scoring factors")
+    args = parser.parse_args()
+    quiet_logging()
+    np = require("numpy", "the vector index benchmark")
+
+    count = min(args.vectors, 10000) if args.quick else args.vectors
+    query_count = min(args.queries, 50) if args.quick else args.queries
+    vectors = synthetic_embeddings(np, count, args.dimension)
+    rng = np.random.default_rng(11)
+    queries = vectors[rng.integers(0, count, query_count)] + 0.3 * rng.normal(
+        size=(query_count, args.dimension)).astype(np.float32)
+    truth = np.argsort(-(queries @ vectors.T), axis=1)[:, :args.top_k]
+
+    configs = [(NONE, 0, 0)]
+    rescores = [int(factor) for factor in args.rescore.split(",")]
+    configs += [(INT8, 0, factor) for factor in rescores]
+    for subvectors in (int(size) for size in args.pq_subvectors.split(",")):
+        if args.dimension % subvectors == 0:
+            configs += [(PQ, subvectors, factor) for factor in rescores]
+
+    report = BenchmarkReport("vector_store")
+    for quantization, subvectors, rescore in configs:
+        name = quantization if quantization != PQ else f"pq{subvectors}"
+        stats = run_config(np, vectors, queries, truth, args.top_k, quantization, subvectors or 32, rescore)
+        report.add(f"{name}/rescore_{rescore}", stats, vectors=count, dimension=args.dimension,
+                   quantization=quantization, pq_subvectors=subvectors or None, rescore_factor=rescore,
+                   top_k=args.top_k, queries=query_count)
+    report.write(args.output)
+
+
+if __name__ == "__main__":
+    main()
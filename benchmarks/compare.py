@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Compare two benchmark result files
+
+Cases present in both files are compared on p50 latency (lower is better)
+and, where recorded, throughput (higher is better). Exits with status 1 if
+any case regressed by more than the threshold.
+
+Usage:
+    python benchmarks/compare.py baseline.json candidate.json [--threshold 10]
+"""
+
+import argparse
+import json
+import sys
+
+# metric -> True if higher values are better
+METRICS = {"p50_ms": False, "p99_ms": False, "throughput_rps": True}
+
+
+def load_results(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> list:
+    """Rows of (case, metric, baseline, candidate, change %, regressed)"""
+    rows = []
+    for case, base_stats in baseline["results"].items():
+        new_stats = candidate["results"].get(case)
+        if new_stats is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = base_stats.get(metric), new_stats.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100.0
+            worse = -change if higher_is_better else change
+            rows.append((case, metric, old, new, change, worse > threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Percent change counted as a regression")
+    parser.add_argument("--all", action="store_true", help="Show unchanged cases too")
+    args = parser.parse_args()
+
+    baseline = load_results(args.baseline)
+    candidate = load_results(args.candidate)
+    print(f"baseline  {baseline.get('commit')} ({baseline.get('timestamp')})")
+    print(f"candidate {candidate.get('commit')} ({candidate.get('timestamp')})\n")
+
+    rows = compare(baseline, candidate, args.threshold)
+    regressions = 0
+    for case, metric, old, new, change, regressed in rows:
+        regressions += regressed
+        if regressed or args.all or abs(change) > args.threshold:
+            flag = "REGRESSION" if regressed else ""
+            print(f"{case:48s} {metric:15s} {old:12.4f} -> {new:12.4f} {change:+8.1f}% {flag}")
+
+    print(f"\n{len(rows)} comparisons, {regressions} regressions over {args.threshold:g}%")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Shared benchmark harness for Vantage AI PersonaPilot
+
+Every benchmark script times callables with measure() and collects the
+results in a BenchmarkReport, which is written as JSON together with the
+environment it ran in (Python version, platform, git commit). compare.py
+diffs two such files.
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    """Latency statistics (milliseconds) for a list of samples"""
+    ordered = sorted(samples_ms)
+    total = sum(ordered)
+    return {
+        "samples": len(ordered),
+        "mean_ms": total / len(ordered) if ordered else 0.0,
+        "min_ms": ordered[0] if ordered else 0.0,
+        "p50_ms": percentile(ordered, 50),
+        "p90_ms": percentile(ordered, 90),
+        "p99_ms": percentile(ordered, 99),
+        "max_ms": ordered[-1] if ordered else 0.0,
+        "ops_per_sec": len(ordered) / (total / 1000.0) if total else 0.0
+    }
+
+
+def measure(func: Callable[[], Any],
+            iterations: Optional[int] = None,
+            min_time: float = 0.2,
+            max_iterations: int = 100000,
+            warmup: int = 3) -> Dict[str, float]:
+    """
+    Time repeated calls of a zero-argument callable
+
+    Args:
+        func: Callable to time
+        iterations: Fixed number of timed calls (otherwise run for min_time seconds)
+        min_time: Minimum total timed duration when iterations is not given
+        max_iterations: Upper bound on timed calls when iterations is not given
+        warmup: Untimed calls made first
+
+    Returns:
+        Statistics from summarize()
+    """
+    for _ in range(warmup):
+        func()
+    samples = []
+    clock = time.perf_counter
+    deadline = clock() + min_time
+    count = 0
+    while True:
+        start = clock()
+        func()
+        end = clock()
+        samples.append((end - start) * 1000.0)
+        count += 1
+        if iterations is not None:
+            if count >= iterations:
+                break
+        elif end >= deadline or count >= max_iterations:
+            break
+    return summarize(samples)
+
+
+def git_commit() -> Optional[str]:
+    """Current commit of the repository, if available"""
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class BenchmarkReport:
+    """Results of one benchmark run, keyed by case name"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, case: str, stats: Dict[str, Any], **params) -> Dict[str, Any]:
+        """Record the statistics of a case (params describe its inputs)"""
+        entry = dict(stats)
+        if params:
+            entry["params"] = params
+        self.results[case] = entry
+        if "p50_ms" in entry:
+            rate = entry.get("throughput_rps", entry.get("ops_per_sec", 0.0))
+            print(f"{case:48s} p50 {entry['p50_ms']:10.4f} ms  p99 {entry['p99_ms']:10.4f} ms  "
+                  f"{rate:12.1f} /s")
+        return entry
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "benchmark": self.name,
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "results": self.results
+        }
+
+    def write(self, output: Optional[str] = None) -> str:
+        """Write the report as JSON and return its path"""
+        output = output or os.path.join(RESULTS_DIR, f"{self.name}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        print(f"\nResults written to {output}")
+        return output
+
+
+def make_parser(name: str, description: str) -> argparse.ArgumentParser:
+    """Argument parser with the options every benchmark script shares"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, f"{name}.json"),
+                        help="Where to write the JSON results")
+    parser.add_argument("--quick", action="store_true",
+                        help="Smaller inputs and shorter runs (smoke test)")
+    return parser
+
+
+def quiet_logging():
+    """Keep library logging out of benchmark output and timings"""
+    logging.disable(logging.WARNING)
@@ -7,16 +7,23 @@ import os
 import sys
 import time
 import json
-from dotenv import load_dotenv
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 from src.core.persona_manager import PersonaManager
 from src.core.ai_client import AIClient
+from src.core.resilience import ResilientCaller
+from src.core.backends import create_backend_from_config
+from src.core.model_router import ModelRouter
+from src.core.session_store import SessionStore
+from src.core.usage import UsageLedger
+from src.personas.registry import PersonaRegistry
 from src.core.output_formatter import OutputFormatter
-from src.utils.config import Config
+from src.utils.config import get_config
 from src.utils.logger import setup_logger
+from src.utils.metrics import configure_metrics
+from src.utils.profiling import configure_profiling, install_signal_handler
 
 def display_loading_animation(seconds):
     """Display a simple loading animation"""
@@ -43,21 +50,36 @@ def get_persona_description(persona_manager, persona_name):
 
 def main():
     """Main application entry point"""
-    # Load environment variables
-    load_dotenv()
+    # Load configuration (reads .env once)
+    config = get_config()
     
     # Setup logging
-    logger = setup_logger()
+    logger = setup_logger(config=config)
     logger.info("Starting Vantage AI PersonaPilot...")
-    
-    # Initialize configuration
-    config = Config()
+    configure_metrics(config.metrics_enabled, config.metrics_exporters)
+    configure_profiling(config.profiling_enabled, config.profiling_dir, config.profiling_top_n,
+                        config.profiling_sort, config.profiling_dump_each)
+    if config.profiling_signal:
+        install_signal_handler()
     
     # Initialize AI client
-    ai_client = AIClient()
+    ai_client = AIClient(
+        resilience=ResilientCaller.from_config(config),
+        backend=create_backend_from_config(config),
+        coalesce=config.coalesce_requests,
+        chat_token_budget=config.chat_token_budget,
+        chat_sessions=SessionStore(config.max_sessions, config.session_ttl),
+        usage=UsageLedger(config.model_pricing, max_sessions=config.max_sessions),
+        router=ModelRouter.from_config(config) if config.model_routing else None
+    )
     
     # Initialize persona manager and output formatter
-    persona_manager = PersonaManager(ai_client)
+    persona_manager = PersonaManager(
+        ai_client,
+        session_store=SessionStore(config.max_sessions, config.session_ttl),
+        registry=PersonaRegistry(data_dir=config.persona_data_dir),
+        max_context=config.max_context_entries
+    )
     output_formatter = OutputFormatter()
     
     # CLI interface
@@ -108,89 +130,12 @@ def main():
         # Get raw response from persona manager - use 'raw' output format to get the dictionary
         raw_response = persona_manager.get_response(persona_name, query, output_format="raw")
         
-        # Format the response using a more readable approach
-        formatted_response = ""
+        # Render the whole response in a single pass
+        formatted_response = output_formatter.render(raw_response)
         
-        # Check if response is a dictionary
-        if isinstance(raw_response, dict):
-            for key, value in raw_response.items():
-                # Format section header
-                section_header = key.replace('_', ' ').title()
-                formatted_response += f"\n## {section_header}\n"
-                
-                # Format section content based on type
-                if isinstance(value, list):
-                    for item in value:
-                        if isinstance(item, dict):
-                            # Format dictionary items in a list
-                            formatted_response += "\n"
-                            for item_key, item_value in item.items():
-                                # Handle complex nested structures
-                                if isinstance(item_value, dict):
-                                    # Format nested dictionary as a readable description
-                                    nested_str = "\n    "
-                                    for k, v in item_value.items():
-                                        k_formatted = k.replace('_', ' ').title()
-                                        if isinstance(v, (dict, list)):
-                                            v = str(v).replace('{', '').replace('}', '').replace('[', '').replace(']', '').replace("'", "")
-                                        nested_str += f"{k_formatted}: {v}\n    "
-                                    item_value_str = nested_str
-                                elif isinstance(item_value, list):
-                                    # Format list as comma-separated values
-                                    items = []
-                                    for i in item_value:
-                                        if isinstance(i, (dict, list)):
-                                            i = str(i).replace('{', '').replace('}', '').replace('[', '').replace(']', '').replace("'", "")
-                                        items.append(str(i))
-                                    item_value_str = ", ".join(items)
-                                else:
-                                    item_value_str = str(item_value)
-                                formatted_response += f"**{item_key.replace('_', ' ').title()}**: {item_value_str}\n"
-                        else:
-                            # Format simple list items
-                            formatted_response += f"- {item}\n"
-                elif isinstance(value, dict):
-                    # Format nested dictionary
-                    for sub_key, sub_value in value.items():
-                        sub_key_formatted = sub_key.replace('_', ' ').title()
-                        
-                        # Handle complex nested structures
-                        if isinstance(sub_value, dict):
-                            # Format nested dictionary as a readable description
-                            formatted_response += f"**{sub_key_formatted}**:\n"
-                            for k, v in sub_value.items():
-                                k_formatted = k.replace('_', ' ').title()
-                                if isinstance(v, (dict, list)):
-                                    v = str(v).replace('{', '').replace('}', '').replace('[', '').replace(']', '').replace("'", "")
-                                formatted_response += f"    **{k_formatted}**: {v}\n"
-                        elif isinstance(sub_value, list):
-                            # Format list items properly
-                            formatted_response += f"**{sub_key_formatted}**:\n"
-                            for item in sub_value:
-                                if isinstance(item, dict):
-                                    formatted_response += "    - "
-                                    item_parts = []
-                                    for k, v in item.items():
-                                        k_formatted = k.replace('_', ' ').title()
-                                        if isinstance(v, (dict, list)):
-                                            v = str(v).replace('{', '').replace('}', '').replace('[', '').replace(']', '').replace("'", "")
-                                        item_parts.append(f"{k_formatted}: {v}")
-                                    formatted_response += ", ".join(item_parts) + "\n"
-                                else:
-                                    formatted_response += f"    - {item}\n"
-                        else:
-                            # Format simple values
-                            formatted_response += f"**{sub_key_formatted}**: {sub_value}\n"
-                else:
-                    # Format simple values
-                    formatted_response += f"{value}\n"
-        else:
-            # If not a dictionary, just convert to string
-            formatted_response = str(raw_response)
-            
         print(f"\n✅ Response:\n{formatted_response}")
     except Exception as e:
-        logger.error(f"Error getting response: {e}")
+        logger.error("Error getting response: %s", e)
         print(f"❌ Error: {e}")
     
     # Ask if user wants to continue with another prompt or change persona
@@ -211,89 +156,12 @@ def main():
                 # Get raw response from persona manager - use 'raw' output format to get the dictionary
                 raw_response = persona_manager.get_response(persona_name, query, output_format="raw")
                 
-                # Format the response using a more readable approach
-                formatted_response = ""
+                # Render the whole response in a single pass
+                formatted_response = output_formatter.render(raw_response)
                 
-                # Check if response is a dictionary
-                if isinstance(raw_response, dict):
-                    for key, value in raw_response.items():
-                        # Format section header
-                        section_header = key.replace('_', ' ').title()
-                        formatted_response += f"\n## {section_header}\n"
-                        
-                        # Format section content based on type
-                        if isinstance(value, list):
-                            for item in value:
-                                if isinstance(item, dict):
-                                    # Format dictionary items in a list
-                                    formatted_response += "\n"
-                                    for item_key, item_value in item.items():
-                                        # Handle complex nested structures
-                                        if isinstance(item_value, dict):
-                                            # Format nested dictionary as a readable description
-                                            nested_str = "\n    "
-                                            for k, v in item_value.items():
-                                                k_formatted = k.replace('_', ' ').title()
-                                                if isinstance(v, (dict, list)):
-                                                    v = str(v).replace('{', '').replace('}', '').replace('[', '').replace(']', '').replace("'", "")
-                                                nested_str += f"{k_formatted}: {v}\n    "
-                                            item_value_str = nested_str
-                                        elif isinstance(item_value, list):
-                                            # Format list as comma-separated values
-                                            items = []
-                                            for i in item_value:
-                                                if isinstance(i, (dict, list)):
-                                                    i = str(i).replace('{', '').replace('}', '').replace('[', '').replace(']', '').replace("'", "")
-                                                items.append(str(i))
-                                            item_value_str = ", ".join(items)
-                                        else:
-                                            item_value_str = str(item_value)
-                                        formatted_response += f"**{item_key.replace('_', ' ').title()}**: {item_value_str}\n"
-                                else:
-                                    # Format simple list items
-                                    formatted_response += f"- {item}\n"
-                        elif isinstance(value, dict):
-                            # Format nested dictionary
-                            for sub_key, sub_value in value.items():
-                                sub_key_formatted = sub_key.replace('_', ' ').title()
-                                
-                                # Handle complex nested structures
-                                if isinstance(sub_value, dict):
-                                    # Format nested dictionary as a readable description
-                                    formatted_response += f"**{sub_key_formatted}**:\n"
-                                    for k, v in sub_value.items():
-                                        k_formatted = k.replace('_', ' ').title()
-                                        if isinstance(v, (dict, list)):
-                                            v = str(v).replace('{', '').replace('}', '').replace('[', '').replace(']', '').replace("'", "")
-                                        formatted_response += f"    **{k_formatted}**: {v}\n"
-                                elif isinstance(sub_value, list):
-                                    # Format list items properly
-                                    formatted_response += f"**{sub_key_formatted}**:\n"
-                                    for item in sub_value:
-                                        if isinstance(item, dict):
-                                            formatted_response += "    - "
-                                            item_parts = []
-                                            for k, v in item.items():
-                                                k_formatted = k.replace('_', ' ').title()
-                                                if isinstance(v, (dict, list)):
-                                                    v = str(v).replace('{', '').replace('}', '').replace('[', '').replace(']', '').replace("'", "")
-                                                item_parts.append(f"{k_formatted}: {v}")
-                                            formatted_response += ", ".join(item_parts) + "\n"
-                                        else:
-                                            formatted_response += f"    - {item}\n"
-                                else:
-                                    # Format simple values
-                                    formatted_response += f"**{sub_key_formatted}**: {sub_value}\n"
-                        else:
-                            # Format simple values
-                            formatted_response += f"{value}\n"
-                else:
-                    # If not a dictionary, just convert to string
-                    formatted_response = str(raw_response)
-                    
                 print(f"\n✅ Response:\n{formatted_response}")
             except Exception as e:
-                logger.error(f"Error getting response: {e}")
+                logger.error("Error getting response: %s", e)
                 print(f"❌ Error: {e}")
                 
         elif choice == '2':
@@ -340,7 +208,7 @@ def main():
                 response = persona_manager.get_response(persona_name, query)
                 print(f"\n✅ Response:\n{response}")
             except Exception as e:
-                logger.error(f"Error getting response: {e}")
+                logger.error("Error getting response: %s", e)
                 print(f"❌ Error: {e}")
                 
         elif choice == '3':
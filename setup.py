@@ -59,10 +59,15 @@ setup(
             "faiss-cpu>=1.7.0",
             "numpy>=1.24.0",
         ],
+        "otel": [
+            "opentelemetry-api>=1.20.0",
+            "opentelemetry-sdk>=1.20.0",
+        ],
     },
     entry_points={
         "console_scripts": [
             "vantage-ai=main:main",
+            "vantage-ai-server=src.api.server:main",
         ],
     },
     include_package_data=True,
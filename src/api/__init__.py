@@ -0,0 +1,29 @@
+"""
+HTTP API for Vantage AI PersonaPilot
+
+The web dependencies (fastapi, uvicorn) are optional, so nothing is imported
+until an export is first accessed.
+"""
+
+import importlib
+
+_EXPORTS = {
+    'create_app': 'src.api.app',
+    'create_persona_manager': 'src.api.app',
+    'ConcurrencyGate': 'src.api.app',
+    'run': 'src.api.server'
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
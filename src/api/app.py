@@ -0,0 +1,435 @@
+"""
+FastAPI application for Vantage AI PersonaPilot
+
+PersonaManager is synchronous and its calls block on the model backend, so
+every request runs on a bounded thread pool behind an admission gate:
+
+- at most API_MAX_CONCURRENCY requests run at once per worker; others wait up
+  to API_QUEUE_TIMEOUT seconds for a slot and are then rejected with 503
+- the client gets a 504 after API_REQUEST_TIMEOUT seconds
+- on shutdown, work still running on the pool gets API_SHUTDOWN_GRACE seconds
+  to finish
+
+Each query runs in a session whose persona state (context memory) it uses.
+A request without a session_id gets a new session; its id is returned in the
+response (the X-Session-Id header for streams) for follow-up queries.
+
+With CPU_WORKERS set, JSON repair and response formatting run on pre-warmed
+worker processes (see ProcessWorkerPool) while the request threads only wait
+on the model API and on those workers.
+
+The /admin endpoints control the profiler of the worker that answers them.
+They and the /usage endpoints require the X-Admin-Token header to match
+API_ADMIN_TOKEN, and are disabled while no token is configured.
+
+uvicorn's limit_concurrency (see server.py) sheds excess connections before
+they reach the application.
+"""
+
+from typing import Any, AsyncIterator, Callable, Iterator, Optional, TypeVar
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import asyncio
+import functools
+import hmac
+import json
+import logging
+import threading
+
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+
+from src.core.ai_client import AIClient
+from src.core.backends import create_backend_from_config
+from src.core.model_router import ModelRouter
+from src.core.persona_manager import PersonaManager
+from src.core.process_pool import ProcessWorkerPool
+from src.core.resilience import ResilientCaller
+from src.core.session_store import SessionStore
+from src.core.usage import DIMENSIONS, UsageLedger
+from src.personas.registry import PersonaRegistry
+from src.utils.config import Config, get_config
+from src.utils.logger import setup_logger
+from src.utils.metrics import PrometheusExporter, configure_metrics, get_exporter
+from src.utils.profiling import capture_flamegraph, configure_profiling, get_profiler, install_signal_handler
+from .models import (
+    BatchRequest, BatchResponse, HealthResponse, PersonaList, ProfilingStatus,
+    QueryRequest, QueryResponse, StreamRequest
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Rendered fragments buffered per stream before the producer thread waits for the client
+STREAM_QUEUE_SIZE = 16
+
+# Longest flame graph capture accepted by the admin endpoint
+MAX_FLAMEGRAPH_SECONDS = 60.0
+
+
+def create_persona_manager(config: Config) -> PersonaManager:
+    """Build a PersonaManager (and its AI client) from configuration"""
+    # Started here so workers are warm before the first request
+    worker_pool = ProcessWorkerPool.from_config(config).start() if config.cpu_workers else None
+    ai_client = AIClient(
+        resilience=ResilientCaller.from_config(config),
+        backend=create_backend_from_config(config),
+        coalesce=config.coalesce_requests,
+        chat_token_budget=config.chat_token_budget,
+        chat_sessions=SessionStore(config.max_sessions, config.session_ttl),
+        usage=UsageLedger(config.model_pricing, max_sessions=config.max_sessions),
+        router=ModelRouter.from_config(config) if config.model_routing else None,
+        json_parser=worker_pool.parse_json_response if worker_pool is not None else None
+    )
+    return PersonaManager(
+        ai_client,
+        session_store=SessionStore(config.max_sessions, config.session_ttl),
+        registry=PersonaRegistry(data_dir=config.persona_data_dir),
+        worker_pool=worker_pool,
+        max_context=config.max_context_entries
+    )
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Encode one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class ConcurrencyGate:
+    """Admission control for blocking work
+
+    A slot is released when the work actually finishes, not when the client
+    stops waiting, so timed-out requests still count against the limit.
+    Must be created inside the event loop that uses it.
+    """
+
+    def __init__(self, limit: int, queue_timeout: float):
+        self.limit = max(1, limit)
+        self.queue_timeout = queue_timeout
+        self.draining = False
+        self._semaphore = asyncio.Semaphore(self.limit)
+        self._in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @property
+    def in_flight(self) -> int:
+        """Number of admitted requests that have not finished"""
+        return self._in_flight
+
+    async def acquire(self):
+        """Wait for a slot, raising 503 when shutting down or saturated"""
+        if self.draining:
+            raise HTTPException(503, "Server is shutting down", headers={"Retry-After": "1"})
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(503, "Server is busy; retry later", headers={"Retry-After": "1"})
+        self._in_flight += 1
+        self._idle.clear()
+
+    def release(self):
+        """Release a slot (must be called on the event loop thread)"""
+        self._in_flight -= 1
+        self._semaphore.release()
+        if self._in_flight == 0:
+            self._idle.set()
+
+    async def drain(self, timeout: float) -> bool:
+        """Stop admitting requests and wait for admitted ones to finish"""
+        self.draining = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class ApiRuntime:
+    """Per-worker state: the persona manager, its thread pool and the admission gate"""
+
+    def __init__(self, manager: PersonaManager, config: Config):
+        self.manager = manager
+        self.request_timeout = config.api_request_timeout
+        self.max_batch_size = config.api_max_batch_size
+        self.gate = ConcurrencyGate(config.api_max_concurrency, config.api_queue_timeout)
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.gate.limit,
+            thread_name_prefix="api-worker"
+        )
+
+    def _submit(self, func: Callable[[], T]) -> "asyncio.Future[T]":
+        """Run func on the pool; the gate slot is released when it finishes"""
+        future = asyncio.get_running_loop().run_in_executor(self.executor, func)
+        future.add_done_callback(lambda _: self.gate.release())
+        return future
+
+    async def run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """Run a blocking call with admission control and a timeout"""
+        await self.gate.acquire()
+        try:
+            future = self._submit(functools.partial(func, *args, **kwargs))
+        except BaseException:
+            self.gate.release()
+            raise
+        try:
+            # shield: a timeout or client disconnect must not cancel the slot bookkeeping
+            return await asyncio.wait_for(asyncio.shield(future), self.request_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(504, f"Request timed out after {self.request_timeout:g}s")
+
+    async def open_stream(self, make_iterator: Callable[[], Iterator[str]]) -> AsyncIterator[str]:
+        """
+        Start producing a stream and return its Server-Sent Events
+
+        The slot is acquired here, before the response starts, so a saturated
+        server can still answer with a 503 status. Fragments pass through a
+        bounded queue: a slow client blocks the producer thread instead of
+        buffering the whole response, and a client that stops reading for
+        longer than the request timeout ends the producer.
+        """
+        await self.gate.acquire()
+        loop = asyncio.get_running_loop()
+        queue: "asyncio.Queue[tuple]" = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        stopped = threading.Event()
+        timeout = self.request_timeout
+
+        def put(event: str, data: Any) -> bool:
+            if stopped.is_set():
+                return False
+            try:
+                asyncio.run_coroutine_threadsafe(
+                    asyncio.wait_for(queue.put((event, data)), timeout), loop
+                ).result()
+                return True
+            except Exception:
+                return False
+
+        def produce():
+            try:
+                for fragment in make_iterator():
+                    if not put("fragment", {"text": fragment}):
+                        return
+                put("done", {})
+            except Exception as e:
+                logger.error("Error while streaming response: %s", e)
+                put("error", {"error": str(e)})
+
+        try:
+            self._submit(produce)
+        except BaseException:
+            self.gate.release()
+            raise
+        return self._consume(queue, stopped, loop.time() + timeout)
+
+    async def _consume(self, queue: "asyncio.Queue[tuple]", stopped: threading.Event,
+                       deadline: float) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), max(0.0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    yield format_sse("error", {"error": f"Stream timed out after {self.request_timeout:g}s"})
+                    return
+                yield format_sse(event, data)
+                if event != "fragment":
+                    return
+        finally:
+            stopped.set()
+            # Unblock a producer waiting on a full queue so it can see the stop flag
+            while not queue.empty():
+                queue.get_nowait()
+
+    def require_persona(self, persona_name: str):
+        """Raise 404 for an unknown persona before any work is queued"""
+        # A miss rescans the persona data directory (rate limited by the registry), so files
+        # added at runtime are found
+        if persona_name not in self.manager.registry:
+            raise HTTPException(404, f"Persona '{persona_name}' not found")
+
+    def shutdown(self):
+        """Release the thread pools and worker processes"""
+        self.executor.shutdown(wait=False)
+        self.manager.ai_client.resilience.shutdown()
+        if self.manager.worker_pool is not None:
+            self.manager.worker_pool.shutdown()
+
+
+def create_app(persona_manager: Optional[PersonaManager] = None,
+               config: Optional[Config] = None) -> FastAPI:
+    """
+    Create the HTTP application
+
+    Used as a uvicorn factory, so each worker process builds its own manager
+    during startup.
+
+    Args:
+        persona_manager: Manager to serve (built from configuration otherwise)
+        config: Configuration object (defaults to the process-wide config)
+
+    Returns:
+        FastAPI application
+    """
+    config = config or get_config()
+    setup_logger(config=config)
+    configure_metrics(config.metrics_enabled, config.metrics_exporters)
+    configure_profiling(config.profiling_enabled, config.profiling_dir, config.profiling_top_n,
+                        config.profiling_sort, config.profiling_dump_each)
+    if config.profiling_signal:
+        # uvicorn calls the factory on the worker's main thread
+        install_signal_handler()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        manager = persona_manager or create_persona_manager(config)
+        runtime = ApiRuntime(manager, config)
+        app.state.runtime = runtime
+        logger.info("API worker started")
+        try:
+            yield
+        finally:
+            if not await runtime.gate.drain(config.api_shutdown_grace):
+                logger.warning("Shutting down with %s requests still running", runtime.gate.in_flight)
+            runtime.shutdown()
+            logger.info("API worker stopped")
+
+    app = FastAPI(title="Vantage AI PersonaPilot", version="1.0.0", lifespan=lifespan)
+
+    def get_runtime(request: Request) -> ApiRuntime:
+        return request.app.state.runtime
+
+    def require_admin(x_admin_token: Optional[str] = Header(None)):
+        # Fail closed: without a configured token the endpoints are disabled
+        if not config.api_admin_token:
+            raise HTTPException(403, "Admin endpoints are disabled; set API_ADMIN_TOKEN to enable them")
+        if x_admin_token is None or not hmac.compare_digest(
+                x_admin_token.encode("utf-8"), config.api_admin_token.encode("utf-8")):
+            raise HTTPException(403, "Invalid admin token")
+
+    def profiling_status(top: int = 0) -> ProfilingStatus:
+        profiler = get_profiler()
+        return ProfilingStatus(
+            enabled=profiler.enabled,
+            profiles=profiler.profiles,
+            skipped=profiler.skipped,
+            dump_dir=profiler.dump_dir,
+            top=profiler.top_functions(top) if top else []
+        )
+
+    @app.get("/health", response_model=HealthResponse)
+    async def health(request: Request):
+        runtime = get_runtime(request)
+        return HealthResponse(
+            status="draining" if runtime.gate.draining else "ok",
+            in_flight=runtime.gate.in_flight,
+            max_concurrency=runtime.gate.limit
+        )
+
+    @app.get("/metrics")
+    async def metrics():
+        # Per worker process: with several workers each scrape sees one worker
+        exporter = get_exporter(PrometheusExporter.name) or PrometheusExporter()
+        return Response(exporter.render(), media_type=PrometheusExporter.content_type)
+
+    # Usage totals name live session ids, which give access to a user's context memory
+    @app.get("/usage", dependencies=[Depends(require_admin)])
+    async def usage(request: Request, dimension: Optional[str] = None):
+        manager = get_runtime(request).manager
+        if dimension is not None and dimension not in DIMENSIONS:
+            raise HTTPException(400, f"Unknown usage dimension '{dimension}'. Available: {list(DIMENSIONS)}")
+        return manager.get_usage(dimension)
+
+    @app.get("/usage/{dimension}/{name}", dependencies=[Depends(require_admin)])
+    async def usage_for(dimension: str, name: str, request: Request):
+        if dimension not in DIMENSIONS:
+            raise HTTPException(400, f"Unknown usage dimension '{dimension}'. Available: {list(DIMENSIONS)}")
+        totals = get_runtime(request).manager.ai_client.usage.get(dimension, name)
+        if totals is None:
+            raise HTTPException(404, f"No usage recorded for {dimension} '{name}'")
+        return totals
+
+    @app.get("/admin/profiling", response_model=ProfilingStatus, dependencies=[Depends(require_admin)])
+    async def get_profiling(top: int = 0):
+        return profiling_status(top)
+
+    @app.post("/admin/profiling", response_model=ProfilingStatus, dependencies=[Depends(require_admin)])
+    async def set_profiling(enabled: Optional[bool] = None, reset: bool = False):
+        profiler = get_profiler()
+        if reset:
+            profiler.reset()
+        if enabled is None:
+            enabled = not profiler.enabled
+        if enabled and not profiler.enabled:
+            profiler.enable()
+        elif not enabled and profiler.enabled:
+            # Writes the aggregate report
+            await asyncio.to_thread(profiler.disable)
+        return profiling_status()
+
+    @app.get("/admin/profiling/report", response_class=PlainTextResponse,
+             dependencies=[Depends(require_admin)])
+    async def profiling_report(top: Optional[int] = None):
+        return await asyncio.to_thread(get_profiler().report, top)
+
+    @app.post("/admin/profiling/flamegraph", response_class=PlainTextResponse,
+              dependencies=[Depends(require_admin)])
+    async def flamegraph(seconds: float = 10.0):
+        if not 0 < seconds <= MAX_FLAMEGRAPH_SECONDS:
+            raise HTTPException(400, f"seconds must be in (0, {MAX_FLAMEGRAPH_SECONDS:g}]")
+        # Sampling blocks for the whole capture, so it runs outside the request pool
+        path = await asyncio.to_thread(capture_flamegraph, seconds)
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+
+    @app.get("/personas", response_model=PersonaList)
+    async def list_personas(request: Request):
+        return PersonaList(personas=get_runtime(request).manager.list_personas())
+
+    @app.get("/personas/{persona_name}")
+    async def get_persona_info(persona_name: str, request: Request):
+        runtime = get_runtime(request)
+        runtime.require_persona(persona_name)
+        return await runtime.run(runtime.manager.get_persona_info, persona_name)
+
+    @app.post("/query", response_model=QueryResponse)
+    async def query(body: QueryRequest, request: Request):
+        runtime = get_runtime(request)
+        runtime.require_persona(body.persona)
+        response = await runtime.run(runtime.manager.get_response, **body.to_kwargs())
+        return QueryResponse(persona=body.persona, response=response, session_id=body.session_id)
+
+    @app.post("/batch", response_model=BatchResponse)
+    async def batch(body: BatchRequest, request: Request):
+        runtime = get_runtime(request)
+        if len(body.requests) > runtime.max_batch_size:
+            raise HTTPException(413, f"Batch exceeds {runtime.max_batch_size} requests")
+        for item in body.requests:
+            runtime.require_persona(item.persona)
+        # Every item takes its own admission slot, so a batch is held to API_MAX_CONCURRENCY
+        responses = await asyncio.gather(*(
+            runtime.run(runtime.manager.get_response, **item.to_kwargs())
+            for item in body.requests
+        ))
+        return BatchResponse(responses=[
+            QueryResponse(persona=item.persona, response=response, session_id=item.session_id)
+            for item, response in zip(body.requests, responses)
+        ])
+
+    @app.post("/stream")
+    async def stream(body: StreamRequest, request: Request):
+        runtime = get_runtime(request)
+        runtime.require_persona(body.persona)
+        events = await runtime.open_stream(lambda: runtime.manager.stream_response(
+            body.persona, body.query, body.context,
+            session_id=body.session_id, target=body.target
+        ))
+        return StreamingResponse(
+            events,
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no",
+                     "X-Session-Id": body.session_id}
+        )
+
+    return app
@@ -0,0 +1,89 @@
+"""
+Request and response models for the Vantage AI PersonaPilot HTTP API
+"""
+
+from typing import Any, Dict, List, Literal, Optional
+import uuid
+from pydantic import BaseModel, Field
+
+
+def new_session_id() -> str:
+    """A fresh, unguessable session id for a client that did not send one"""
+    return uuid.uuid4().hex
+
+
+class QueryRequest(BaseModel):
+    """A single query to a persona"""
+    
+    persona: str = Field(..., description="Name of the persona to use")
+    query: str = Field(..., min_length=1, description="User's query")
+    context: Optional[str] = Field(None, description="Optional context information")
+    output_format: Literal["structured", "raw", "text"] = "structured"
+    session_id: str = Field(
+        default_factory=new_session_id, min_length=1,
+        description="Session whose context memory is used (a new one if omitted)"
+    )
+    
+    def to_kwargs(self) -> Dict[str, Any]:
+        """Keyword arguments for PersonaManager.get_response"""
+        return {
+            "persona_name": self.persona,
+            "query": self.query,
+            "context": self.context,
+            "output_format": self.output_format,
+            "session_id": self.session_id
+        }
+
+
+class QueryResponse(BaseModel):
+    """Response of a persona to a single query"""
+    
+    persona: str
+    response: Any
+    session_id: str = Field(..., description="Session to send with follow-up queries")
+
+
+class BatchRequest(BaseModel):
+    """Several queries processed concurrently"""
+    
+    requests: List[QueryRequest] = Field(..., min_length=1)
+
+
+class BatchResponse(BaseModel):
+    """Responses in the same order as the batch requests"""
+    
+    responses: List[QueryResponse]
+
+
+class StreamRequest(BaseModel):
+    """A query whose formatted response is streamed as Server-Sent Events"""
+    
+    persona: str
+    query: str = Field(..., min_length=1)
+    context: Optional[str] = None
+    session_id: str = Field(default_factory=new_session_id, min_length=1)
+    target: Literal["markdown", "plain", "html", "ansi"] = "markdown"
+
+
+class PersonaList(BaseModel):
+    """Names of the available personas"""
+    
+    personas: List[str]
+
+
+class HealthResponse(BaseModel):
+    """Server status"""
+    
+    status: str
+    in_flight: int
+    max_concurrency: int
+
+
+class ProfilingStatus(BaseModel):
+    """State of the profiler of the worker that answered"""
+    
+    enabled: bool
+    profiles: int
+    skipped: int
+    dump_dir: str
+    top: List[Dict[str, Any]] = []
@@ -0,0 +1,54 @@
+"""
+Run the Vantage AI PersonaPilot HTTP API under uvicorn
+"""
+
+from typing import Optional
+import argparse
+
+from src.utils.config import get_config
+from src.utils.lazy_imports import require
+
+APP_FACTORY = "src.api.app:create_app"
+
+
+def run(host: Optional[str] = None,
+        port: Optional[int] = None,
+        workers: Optional[int] = None):
+    """
+    Serve the API
+
+    The app is passed to uvicorn as a factory import string so that every
+    worker process builds its own PersonaManager.
+
+    Args:
+        host: Bind address (defaults to API_HOST)
+        port: Bind port (defaults to API_PORT)
+        workers: Number of worker processes (defaults to API_WORKERS)
+    """
+    config = get_config()
+    uvicorn = require("uvicorn", "the HTTP API server")
+    uvicorn.run(
+        APP_FACTORY,
+        factory=True,
+        host=host or config.api_host,
+        port=port or config.api_port,
+        workers=workers or config.api_workers,
+        # Connections beyond this limit get an immediate 503
+        limit_concurrency=config.api_max_connections,
+        timeout_graceful_shutdown=int(config.api_shutdown_grace),
+        log_level=config.log_level.lower()
+    )
+
+
+def main():
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Vantage AI PersonaPilot HTTP API")
+    parser.add_argument("--host", help="Bind address")
+    parser.add_argument("--port", type=int, help="Bind port")
+    parser.add_argument("--workers", type=int, help="Number of worker processes")
+    args = parser.parse_args()
+    run(host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,32 @@
 """
 Core components for Vantage AI PersonaPilot
+
+Components are imported lazily on attribute access so that importing one
+module (or just the package) does not pull in every core dependency.
 """
 
-from src.core.persona_manager import PersonaManager
-from src.core.prompt_engine import PromptEngine
-from src.core.rag_system import RAGSystem
-from src.core.output_formatter import OutputFormatter
-from src.core.ai_client import AIClient
-
-__all__ = [
-    'PersonaManager',
-    'PromptEngine', 
-    'RAGSystem',
-    'OutputFormatter',
-    'AIClient'
-]
+import importlib
+
+_EXPORTS = {
+    'PersonaManager': 'src.core.persona_manager',
+    'PromptEngine': 'src.core.prompt_engine',
+    'RAGSystem': 'src.core.rag_system',
+    'OutputFormatter': 'src.core.output_formatter',
+    'AIClient': 'src.core.ai_client',
+    'ProcessWorkerPool': 'src.core.process_pool',
+    'EmbeddingService': 'src.core.embedding_service'
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
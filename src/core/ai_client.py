@@ -2,35 +2,101 @@
 AI Client for Gemini API integration
 """
 
-import os
-import google.generativeai as genai
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Iterator, Optional, Tuple
 import logging
+import time
+from .backends import ModelBackend, GeminiBackend, TransportConfig
+from .resilience import ResilientCaller, RetryPolicy, CircuitBreaker
+from .coalescing import SingleFlight, make_request_key
+from .session_store import SessionStore
+from .chat_sessions import ChatSession, estimate_tokens, normalize_role
+from .json_repair import CONTINUATION_PROMPT, ParsedResponse, merge_continuation, parse_json_response
+from .response_schema import JSON_INSTRUCTION, format_instructions, to_response_schema
+from src.utils.metrics import (
+    MODEL_REQUESTS, STAGE_SECONDS, TIME_TO_FIRST_CHUNK_SECONDS,
+    increment, metrics_enabled, observe, span
+)
+from .usage import TokenUsage, UsageLedger, current_attribution
+from .model_router import ModelRouter, RoutingDecision, should_fall_back
+from .query_analysis import QueryAnalysis
 
 logger = logging.getLogger(__name__)
 
 class AIClient:
-    """Client for interacting with Google's Gemini AI API"""
+    """Client for interacting with generative model backends (Gemini by default)"""
     
-    def __init__(self, api_key: Optional[str] = None):
-        """Initialize the AI client"""
-        self.api_key = api_key or os.getenv('GEMINI_API_KEY')
-        if not self.api_key:
-            raise ValueError("GEMINI_API_KEY not found in environment variables")
+    def __init__(self, 
+                 api_key: Optional[str] = None,
+                 resilience: Optional[ResilientCaller] = None,
+                 backend: Optional[ModelBackend] = None,
+                 coalesce: bool = True,
+                 chat_token_budget: int = 4000,
+                 chat_sessions: Optional[SessionStore] = None,
+                 usage: Optional[UsageLedger] = None,
+                 router: Optional[ModelRouter] = None,
+                 transport: Optional[TransportConfig] = None,
+                 json_parser: Optional[Callable[[str, Optional[Dict[str, Any]]], ParsedResponse]] = None):
+        """
+        Initialize the AI client
         
-        # Configure the API
-        genai.configure(api_key=self.api_key)
+        Args:
+            api_key: Gemini API key (defaults to GEMINI_API_KEY)
+            resilience: Retry/hedging/circuit breaker policy for API calls
+            backend: Model backend to use (defaults to GeminiBackend)
+            coalesce: Share one backend call between identical concurrent requests
+            chat_token_budget: Estimated token budget before chat history is summarized
+            chat_sessions: Store for persistent chat sessions
+            usage: Ledger receiving the token usage of every model call
+            router: Chooses models by query complexity and supplies fallback chains
+            transport: Connection settings for the default GeminiBackend
+            json_parser: Parses and repairs JSON replies (e.g. ProcessWorkerPool.parse_json_response
+                to run the repair on a worker process)
+        """
+        self.backend = backend or GeminiBackend(api_key, transport=transport)
+        self.api_key = getattr(self.backend, 'api_key', None)
         
         # Default model
         self.default_model = "gemini-2.0-flash-exp"
         self.model = None
         
+        self.resilience = resilience or ResilientCaller(
+            retry_policy=RetryPolicy(),
+            circuit_breaker=CircuitBreaker()
+        )
+        self.coalescer = SingleFlight() if coalesce else None
+        self.chat_token_budget = chat_token_budget
+        self.chat_sessions = chat_sessions if chat_sessions is not None else SessionStore()
+        self.usage = usage if usage is not None else UsageLedger()
+        self.router = router
+        self.parse_json = json_parser or parse_json_response
+        
         logger.info("AI Client initialized successfully")
     
-    def get_model(self, model_name: Optional[str] = None) -> genai.GenerativeModel:
+    @property
+    def supports_json_mode(self) -> bool:
+        """Whether the backend can be constrained to a response schema"""
+        return self.backend.supports_json_mode
+    
+    def get_model(self, model_name: Optional[str] = None) -> Any:
         """Get a generative model instance"""
         model_name = model_name or self.default_model
-        return genai.GenerativeModel(model_name)
+        return self.backend.get_model(model_name)
+    
+    def route(self,
+              query: str,
+              context: Optional[str] = None,
+              analysis: Optional[QueryAnalysis] = None) -> Optional[RoutingDecision]:
+        """Choose a model for a query (None without a router: the default model is used)"""
+        if self.router is None:
+            return None
+        return self.router.route(query, context, analysis)
+    
+    def model_chain(self, model_name: Optional[str] = None) -> tuple:
+        """Models tried for a call, in order: the requested model, then its fallbacks"""
+        model_name = model_name or self.default_model
+        if self.router is None:
+            return (model_name,)
+        return self.router.chain(model_name)
     
     def generate_content(self, 
                         prompt: str, 
@@ -39,6 +105,9 @@ class AIClient:
         """
         Generate content using the specified model
         
+        With a router, a model that stays unavailable after the retries (or
+        whose circuit is open) hands the call to the next model of its chain.
+        
         Args:
             prompt: The input prompt
             model_name: Model to use (defaults to default_model)
@@ -47,93 +116,297 @@ class AIClient:
         Returns:
             Generated text response
         """
-        try:
-            model = self.get_model(model_name)
-            response = model.generate_content(prompt, **kwargs)
+        models = self.model_chain(model_name)
+        # Captured here: hedged attempts run on pool threads without this context
+        attribution = current_attribution()
+        
+        for index, candidate in enumerate(models):
+            try:
+                return self._generate(prompt, candidate, attribution, kwargs)
+            except Exception as e:
+                if index + 1 < len(models) and should_fall_back(e):
+                    self.router.record_fallback(candidate, models[index + 1], e)
+                    continue
+                logger.error("Error generating content: %s", e)
+                raise
+    
+    def _generate(self, prompt: str, model_name: str, attribution: Dict[str, str], kwargs: Dict[str, Any]) -> str:
+        """One model's call with resilience, coalescing, usage accounting and metrics"""
+        def attempt() -> str:
+            response = self.backend.generate(prompt, model_name, **kwargs)
+            self.usage.record(model_name, TokenUsage.from_response(response, prompt), attribution)
             return response.text
-        except Exception as e:
-            logger.error(f"Error generating content: {e}")
-            raise
+        
+        def call() -> str:
+            with span("model_call", model=model_name):
+                try:
+                    text = self.resilience.call(attempt, key=model_name)
+                except Exception:
+                    increment(MODEL_REQUESTS, model=model_name, status="error")
+                    raise
+            increment(MODEL_REQUESTS, model=model_name, status="ok")
+            return text
+        
+        if self.coalescer is None:
+            return call()
+        key = make_request_key(model_name, prompt, **kwargs)
+        return self.coalescer.do(key, call)
+    
+    def get_transport_stats(self) -> Dict[str, Any]:
+        """Get connection reuse counters of the backend's transport"""
+        return self.backend.transport_stats()
+    
+    def get_coalescing_stats(self) -> Dict[str, Any]:
+        """Get counters for coalesced identical in-flight requests"""
+        if self.coalescer is None:
+            return {"enabled": False}
+        stats = self.coalescer.get_stats()
+        stats["enabled"] = True
+        return stats
+    
+    def generate_content_stream(self, 
+                                prompt: str, 
+                                model_name: Optional[str] = None,
+                                schema: Optional[Dict[str, Any]] = None,
+                                **kwargs) -> Iterator[str]:
+        """
+        Generate content as a stream of text chunks
+        
+        Retries and hedging apply until the first chunk arrives; errors after that
+        are raised to the caller since partial output has already been consumed.
+        
+        Args:
+            prompt: The input prompt
+            model_name: Model to use (defaults to default_model; fallbacks apply until the first chunk)
+            schema: Optional example structure the streamed JSON must follow
+            **kwargs: Additional parameters for generation
+            
+        Returns:
+            Iterator of text chunks
+        """
+        models = self.model_chain(model_name)
+        if schema is not None and self.supports_json_mode:
+            kwargs["response_schema"] = to_response_schema(schema)
+        elif schema is not None:
+            prompt = f"{prompt}{format_instructions(schema)}"
+        
+        start = time.perf_counter()
+        for index, model_name in enumerate(models):
+            def open_stream():
+                stream = iter(self.backend.generate_stream(prompt, model_name, **kwargs))
+                return next(stream, None), stream
+            
+            try:
+                first_chunk, stream = self.resilience.call(open_stream, key=model_name)
+                break
+            except Exception as e:
+                increment(MODEL_REQUESTS, model=model_name, status="error")
+                if index + 1 < len(models) and should_fall_back(e):
+                    self.router.record_fallback(model_name, models[index + 1], e)
+                    continue
+                logger.error("Error starting content stream: %s", e)
+                raise
+        observe(TIME_TO_FIRST_CHUNK_SECONDS, time.perf_counter() - start, model=model_name)
+        
+        if first_chunk is None:
+            return
+        characters = len(first_chunk)
+        yield first_chunk
+        for chunk in stream:
+            characters += len(chunk)
+            yield chunk
+        
+        # Streams carry no usage metadata through the backend interface
+        self.usage.record(model_name, TokenUsage(estimate_tokens(prompt), characters // 4, estimated=True))
+        if metrics_enabled():
+            observe(STAGE_SECONDS, time.perf_counter() - start, stage="model_stream", model=model_name, status="ok")
+            increment(MODEL_REQUESTS, model=model_name, status="ok")
     
     def generate_structured_response(self, 
                                    prompt: str,
                                    output_format: str = "json",
-                                   model_name: Optional[str] = None) -> Dict[str, Any]:
+                                   model_name: Optional[str] = None,
+                                   schema: Optional[Dict[str, Any]] = None,
+                                   max_continuations: int = 1) -> Dict[str, Any]:
         """
         Generate structured response in specified format
         
+        With a schema and a backend that supports JSON mode, the schema is sent
+        as the response schema; otherwise the structure is requested in the
+        prompt. Either way the reply is parsed and coerced to the schema. Almost-valid JSON is repaired
+        locally; if the output was cut off, the model is asked to continue it
+        and only the missing tail is generated.
+        
         Args:
-            prompt: The input prompt
+            prompt: The input prompt (without output format instructions)
             output_format: Desired output format (json, markdown, etc.)
             model_name: Model to use
+            schema: Example structure (persona output format) the response must follow
+            max_continuations: Continuation requests allowed for truncated output
             
         Returns:
             Structured response
         """
-        # Add format instruction to prompt
-        if output_format.lower() == "json":
-            formatted_prompt = f"{prompt}\n\nIMPORTANT: Your response MUST be valid JSON. Do not include any text outside the JSON structure. Ensure all strings are properly quoted with double quotes, avoid trailing commas, and escape special characters correctly."
+        return self.generate_structured_reply(prompt, output_format, model_name, schema, max_continuations)[0]
+    
+    def generate_structured_reply(self, 
+                                  prompt: str,
+                                  output_format: str = "json",
+                                  model_name: Optional[str] = None,
+                                  schema: Optional[Dict[str, Any]] = None,
+                                  max_continuations: int = 1) -> Tuple[Dict[str, Any], str]:
+        """
+        Like generate_structured_response, also returning the model's reply text
+        
+        The reply length lets callers size later stages (such as whether to format
+        on a worker process) without serializing the structure again.
+        
+        Returns:
+            (structured response, reply text)
+        """
+        if output_format.lower() != "json":
+            response_text = self.generate_content(
+                f"{prompt}\n\nPlease respond in {output_format} format.", model_name
+            )
+            return {"response": response_text, "format": output_format}, response_text
+        
+        kwargs: Dict[str, Any] = {}
+        if schema is not None and self.supports_json_mode:
+            formatted_prompt = prompt
+            kwargs["response_schema"] = to_response_schema(schema)
+        elif schema is not None:
+            formatted_prompt = f"{prompt}{format_instructions(schema)}"
         else:
-            formatted_prompt = f"{prompt}\n\nPlease respond in {output_format} format."
+            formatted_prompt = f"{prompt}\n\n{JSON_INSTRUCTION}"
         
-        response_text = self.generate_content(formatted_prompt, model_name)
+        response_text = self.generate_content(formatted_prompt, model_name, **kwargs)
         
-        # Parse response based on format
-        if output_format.lower() == "json":
-            import json
-            import re
+        # JSON-mode output goes through the same parser, so schema drift is coerced and logged
+        with span("json_parse"):
+            parsed = self.parse_json(response_text, schema)
+        continuations = 0
+        while parsed.truncated and continuations < max_continuations:
+            continuations += 1
+            logger.info("Response JSON was truncated; requesting the missing tail")
             try:
-                # Try to extract JSON if it's embedded in text
-                json_match = re.search(r'```json\s*(.+?)\s*```', response_text, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group(1)
-                    return json.loads(json_str)
-                
-                # Try direct parsing
-                return json.loads(response_text)
-            except json.JSONDecodeError as e:
-                logger.warning(f"Failed to parse JSON response: {e}")
-                # Return a properly structured fallback response
-                return {
-                    "response": {
-                        "summary": "Response could not be structured as JSON",
-                        "action_items": [{
-                            "step": 1,
-                            "action": "Review the raw response below",
-                            "time_required": "N/A",
-                            "cost": "N/A"
-                        }],
-                        "tips": ["The AI generated an invalid JSON response"],
-                        "raw_response": response_text
-                    }
+                tail = self.continue_response(formatted_prompt, response_text, model_name)
+            except Exception as e:
+                logger.warning("Continuation request failed, keeping repaired output: %s", e)
+                break
+            response_text = merge_continuation(response_text, tail)
+            with span("json_parse"):
+                parsed = self.parse_json(response_text, schema)
+        
+        if not parsed.ok:
+            logger.warning("Failed to parse JSON response even after repair")
+            # Return a properly structured fallback response
+            return {
+                "response": {
+                    "summary": "Response could not be structured as JSON",
+                    "action_items": [{
+                        "step": 1,
+                        "action": "Review the raw response below",
+                        "time_required": "N/A",
+                        "cost": "N/A"
+                    }],
+                    "tips": ["The AI generated an invalid JSON response"],
+                    "raw_response": response_text
                 }
+            }, response_text
         
-        return {"response": response_text, "format": output_format}
+        if parsed.repairs and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Repaired response JSON: %s", ', '.join(sorted(set(parsed.repairs))))
+        if parsed.issues:
+            logger.warning("Response does not match the expected structure: %s", '; '.join(parsed.issues[:5]))
+        return parsed.value, response_text
+    
+    def continue_response(self, 
+                          prompt: str, 
+                          partial_response: str,
+                          model_name: Optional[str] = None) -> str:
+        """
+        Ask the model to continue a response that was cut off
+        
+        Args:
+            prompt: Prompt that produced the partial response
+            partial_response: Output received so far
+            model_name: Model to use
+            
+        Returns:
+            The missing tail of the response
+        """
+        return self.chat([
+            {"role": "user", "content": prompt},
+            {"role": "model", "content": partial_response},
+            {"role": "user", "content": CONTINUATION_PROMPT}
+        ], model_name)
     
     def chat(self, 
              messages: list,
-             model_name: Optional[str] = None) -> str:
+             model_name: Optional[str] = None,
+             session_id: Optional[str] = None) -> str:
         """
         Chat with the model using conversation history
         
+        Every call is a single round trip: prior turns are passed as history and
+        only the last message is sent. With a session_id the history is kept in
+        the client's session store, so callers only pass the new turn(s); once the
+        history exceeds the token budget its oldest turns are summarized.
+        
         Args:
             messages: List of message dictionaries with 'role' and 'content'
             model_name: Model to use
+            session_id: Optional id of a persistent chat session
             
         Returns:
             Model response
         """
+        if not messages:
+            raise ValueError("chat requires at least one message")
+        model_name = model_name or self.default_model
+        
         try:
-            model = self.get_model(model_name)
-            chat = model.start_chat(history=[])
-            
-            # Send all messages
-            for message in messages:
-                if message['role'] == 'user':
-                    response = chat.send_message(message['content'])
+            if session_id is None:
+                history = [
+                    {"role": normalize_role(m['role']), "content": m['content']}
+                    for m in messages[:-1]
+                ]
+                return self._chat_call(history, messages[-1]['content'], model_name)
             
-            return response.text
+            session = self.chat_sessions.get_or_create(session_id, lambda: ChatSession(session_id))
+            with session.lock:
+                for message in messages[:-1]:
+                    session.add_turn(message['role'], message['content'])
+                content = messages[-1]['content']
+                history = list(session.history)
+                reply = self._chat_call(history, content, model_name)
+                session.add_turn("user", content)
+                session.add_turn("model", reply)
+                try:
+                    session.compact(
+                        lambda prompt: self.generate_content(prompt, model_name),
+                        self.chat_token_budget
+                    )
+                except Exception as e:
+                    # The reply is already stored; compaction is retried on the next turn
+                    logger.warning("Could not compact chat session %s: %s", session_id, e)
+                return reply
         except Exception as e:
-            logger.error(f"Error in chat: {e}")
+            logger.error("Error in chat: %s", e)
             raise
-
+    
+    def _chat_call(self, history: list, message: str, model_name: str) -> str:
+        """Send one chat message with resilience and usage accounting"""
+        attribution = current_attribution()
+        
+        def attempt() -> str:
+            response = self.backend.chat(history, message, model_name)
+            prompt = "".join(turn["content"] for turn in history) + message
+            self.usage.record(model_name, TokenUsage.from_response(response, prompt), attribution)
+            return response.text
+        
+        return self.resilience.call(attempt, key=model_name)
+    
+    def end_chat(self, session_id: str):
+        """Discard a persistent chat session"""
+        self.chat_sessions.pop(session_id)
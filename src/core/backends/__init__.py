@@ -0,0 +1,23 @@
+"""
+Model backends for Vantage AI PersonaPilot
+"""
+
+from src.core.backends.base import ModelBackend, ModelResponse
+from src.core.backends.gemini import GeminiBackend
+from src.core.backends.gemini_rest import GeminiRestBackend, GeminiRestError
+from src.core.backends.stub import StubBackend, StubBackendError
+from src.core.backends.transport import TransportConfig
+from src.core.backends.factory import create_backend, create_backend_from_config
+
+__all__ = [
+    'ModelBackend',
+    'ModelResponse',
+    'GeminiBackend',
+    'GeminiRestBackend',
+    'GeminiRestError',
+    'StubBackend',
+    'StubBackendError',
+    'TransportConfig',
+    'create_backend',
+    'create_backend_from_config'
+]
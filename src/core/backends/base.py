@@ -0,0 +1,77 @@
+"""
+Base model backend interface for Vantage AI PersonaPilot
+"""
+
+from abc import ABC, abstractmethod
+from typing import Dict, Any, List, Iterator, Optional
+
+
+class ModelResponse:
+    """Backend-neutral result of a single model call"""
+    
+    __slots__ = ("text", "model_name", "raw")
+    
+    def __init__(self, text: str, model_name: str, raw: Any = None):
+        self.text = text
+        self.model_name = model_name
+        self.raw = raw
+    
+    def __repr__(self) -> str:
+        return f"ModelResponse(model_name={self.model_name!r}, text={self.text[:40]!r})"
+
+
+class ModelBackend(ABC):
+    """Abstract interface every model provider implements"""
+    
+    name = "base"
+    
+    # Whether generate()/generate_stream() accept a response_schema keyword and
+    # return JSON conforming to it
+    supports_json_mode = False
+    
+    @abstractmethod
+    def generate(self, prompt: str, model_name: str, **kwargs) -> ModelResponse:
+        """
+        Generate a complete response for a prompt
+        
+        Args:
+            prompt: The input prompt
+            model_name: Provider model identifier
+            **kwargs: Provider-specific generation parameters (response_schema
+                when supports_json_mode is set)
+        
+        Returns:
+            Model response
+        """
+        pass
+    
+    @abstractmethod
+    def generate_stream(self, prompt: str, model_name: str, **kwargs) -> Iterator[str]:
+        """Generate a response as an iterator of text chunks"""
+        pass
+    
+    @abstractmethod
+    def chat(self, 
+             history: List[Dict[str, str]], 
+             message: str, 
+             model_name: str) -> ModelResponse:
+        """
+        Send one message on top of an existing conversation
+        
+        Args:
+            history: Prior turns as dictionaries with 'role' ('user' or 'model') and 'content'
+            message: The new user message
+            model_name: Provider model identifier
+        
+        Returns:
+            Model response to the new message
+        """
+        pass
+    
+    def transport_stats(self) -> Dict[str, Any]:
+        """Connection counters of the backend's transport (empty if it keeps none)"""
+        return {}
+    
+    def get_model(self, model_name: Optional[str] = None) -> Any:
+        """Get the provider-native model object, if the backend has one"""
+        raise NotImplementedError(f"Backend '{self.name}' does not expose native model objects")
@@ -0,0 +1,42 @@
+"""
+Backend factory for Vantage AI PersonaPilot
+"""
+
+from typing import Dict, Type
+from src.core.backends.base import ModelBackend
+from src.core.backends.gemini import GeminiBackend
+from src.core.backends.gemini_rest import GeminiRestBackend
+from src.core.backends.stub import StubBackend
+from src.core.backends.transport import TransportConfig
+
+BACKENDS: Dict[str, Type[ModelBackend]] = {
+    "gemini": GeminiBackend,
+    "gemini_rest": GeminiRestBackend,
+    "stub": StubBackend
+}
+
+
+def create_backend(name: str, **options) -> ModelBackend:
+    """Create a backend by name"""
+    if name not in BACKENDS:
+        raise ValueError(f"Backend '{name}' not found. Available: {list(BACKENDS.keys())}")
+    return BACKENDS[name](**options)
+
+
+def create_backend_from_config(config) -> ModelBackend:
+    """Create the backend selected by a Config object"""
+    if config.model_backend == "stub":
+        return StubBackend(
+            latency_ms=config.stub_latency_ms,
+            latency_distribution=config.stub_latency_distribution,
+            latency_jitter_ms=config.stub_latency_jitter_ms,
+            chunk_size=config.stub_chunk_size,
+            error_rate=config.stub_error_rate,
+            seed=config.stub_seed
+        )
+    if config.model_backend in ("gemini", "gemini_rest"):
+        return BACKENDS[config.model_backend](
+            api_key=config.gemini_api_key,
+            transport=TransportConfig.from_config(config)
+        )
+    return create_backend(config.model_backend)
@@ -0,0 +1,130 @@
+"""
+Google Gemini backend for Vantage AI PersonaPilot
+"""
+
+from typing import Dict, Any, List, Iterator, Optional
+import os
+import logging
+import threading
+from src.core.backends.base import ModelBackend, ModelResponse
+from src.core.backends.transport import DEFAULT_ENDPOINT, TransportConfig
+from src.core.response_schema import JSON_MIME_TYPE
+
+logger = logging.getLogger(__name__)
+
+
+class GeminiBackend(ModelBackend):
+    """Backend calling the Gemini API through google.generativeai"""
+    
+    name = "gemini"
+    supports_json_mode = True
+    
+    def __init__(self, api_key: Optional[str] = None, transport: Optional[TransportConfig] = None):
+        """
+        Initialize the backend
+        
+        Create one instance per process and share it: model objects (and the
+        SDK client connections behind them) are cached and reused by all threads.
+        
+        Args:
+            api_key: Gemini API key (defaults to GEMINI_API_KEY)
+            transport: SDK transport and request timeout
+        """
+        self.api_key = api_key or os.getenv('GEMINI_API_KEY')
+        if not self.api_key:
+            raise ValueError("GEMINI_API_KEY not found in environment variables")
+        self.transport = transport or TransportConfig()
+        self._request_options = {"timeout": self.transport.read_timeout}
+        
+        # The SDK is imported and configured on first use, keeping startup cheap
+        self._genai = None
+        self._configure_lock = threading.Lock()
+        self._models: Dict[str, Any] = {}
+    
+    @property
+    def genai(self) -> Any:
+        """The configured google.generativeai module"""
+        if self._genai is None:
+            with self._configure_lock:
+                if self._genai is None:
+                    import google.generativeai as genai
+                    
+                    # Configure the API
+                    options: Dict[str, Any] = {"api_key": self.api_key, "transport": self.transport.transport}
+                    if self.transport.endpoint != DEFAULT_ENDPOINT:
+                        options["client_options"] = {"api_endpoint": self.transport.endpoint.split("://")[-1]}
+                    genai.configure(**options)
+                    self._genai = genai
+        return self._genai
+    
+    def get_model(self, model_name: Optional[str] = None) -> Any:
+        """Get a generative model instance (cached per model name)"""
+        model = self._models.get(model_name)
+        if model is None:
+            genai = self.genai
+            with self._configure_lock:
+                model = self._models.get(model_name)
+                if model is None:
+                    model = self._models[model_name] = genai.GenerativeModel(model_name)
+        return model
+    
+    def generate(self, prompt: str, model_name: str, **kwargs) -> ModelResponse:
+        """Generate a complete response"""
+        response = self.get_model(model_name).generate_content(prompt, **self._generation_kwargs(kwargs))
+        return ModelResponse(response.text, model_name, raw=response)
+    
+    def generate_stream(self, prompt: str, model_name: str, **kwargs) -> Iterator[str]:
+        """Generate a response as text chunks"""
+        response = self.get_model(model_name).generate_content(
+            prompt, stream=True, **self._generation_kwargs(kwargs)
+        )
+        for chunk in response:
+            # chunk.text raises on chunks without parts: the finish_reason-only
+            # final chunk, or a chunk the safety filters blocked
+            if chunk.parts:
+                if chunk.text:
+                    yield chunk.text
+                continue
+            reason = self._block_reason(chunk)
+            if reason:
+                logger.warning("Gemini stream for %s stopped early: %s", model_name, reason)
+    
+    @staticmethod
+    def _block_reason(chunk: Any) -> Optional[str]:
+        """Why a chunk carries no text, or None when it is an ordinary end of stream"""
+        feedback = getattr(chunk, "prompt_feedback", None)
+        block_reason = getattr(feedback, "block_reason", None)
+        if block_reason:
+            return f"prompt blocked ({getattr(block_reason, 'name', block_reason)})"
+        for candidate in getattr(chunk, "candidates", None) or ():
+            finish_reason = getattr(candidate, "finish_reason", None)
+            name = getattr(finish_reason, "name", str(finish_reason))
+            if finish_reason and name not in ("STOP", "FINISH_REASON_UNSPECIFIED", "MAX_TOKENS"):
+                return f"finish_reason {name}"
+        return None
+    
+    def _generation_kwargs(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply the request timeout and move response_schema into the SDK's generation_config (JSON mode)"""
+        kwargs.setdefault("request_options", self._request_options)
+        response_schema = kwargs.pop("response_schema", None)
+        if response_schema is None:
+            return kwargs
+        generation_config = dict(kwargs.pop("generation_config", None) or {})
+        generation_config["response_mime_type"] = JSON_MIME_TYPE
+        generation_config["response_schema"] = response_schema
+        kwargs["generation_config"] = generation_config
+        return kwargs
+    
+    def chat(self, 
+             history: List[Dict[str, str]], 
+             message: str, 
+             model_name: str) -> ModelResponse:
+        """Send one message on top of an existing conversation"""
+        sdk_history = [
+            {"role": "model" if turn["role"] in ("model", "assistant") else "user",
+             "parts": [turn["content"]]}
+            for turn in history
+        ]
+        chat = self.get_model(model_name).start_chat(history=sdk_history)
+        response = chat.send_message(message, request_options=self._request_options)
+        return ModelResponse(response.text, model_name, raw=response)
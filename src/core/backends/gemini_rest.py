@@ -0,0 +1,226 @@
+"""
+Gemini REST backend with a pooled HTTP session for Vantage AI PersonaPilot
+
+Calls the generateContent / streamGenerateContent endpoints directly through
+one requests.Session per backend. The session's connection pool (size, keep-
+alive, timeouts from TransportConfig) is shared by all threads, so after
+warm-up calls reuse open TLS connections instead of handshaking again.
+"""
+
+from typing import Dict, Any, List, Iterator, Optional
+from types import SimpleNamespace
+import json
+import logging
+import os
+import threading
+from src.core.backends.base import ModelBackend, ModelResponse
+from src.core.backends.transport import TransportConfig
+from src.core.response_schema import JSON_MIME_TYPE
+from src.utils.lazy_imports import require
+
+logger = logging.getLogger(__name__)
+
+API_VERSION = "v1beta"
+
+# HTTP statuses worth retrying (rate limits and server-side failures)
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class GeminiRestError(RuntimeError):
+    """Error returned by the Gemini REST API or its transport"""
+
+    def __init__(self, message: str, status: Optional[int] = None, retryable: bool = False):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+
+
+class _Counter:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def increment(self):
+        with self._lock:
+            self.value += 1
+
+
+class GeminiRestBackend(ModelBackend):
+    """Backend calling the Gemini REST API over a pooled keep-alive session"""
+
+    name = "gemini_rest"
+    supports_json_mode = True
+
+    def __init__(self, api_key: Optional[str] = None, transport: Optional[TransportConfig] = None):
+        """
+        Initialize the backend
+
+        Create one instance per process and share it between threads.
+
+        Args:
+            api_key: Gemini API key (defaults to GEMINI_API_KEY)
+            transport: Pool size, keep-alive, timeouts and endpoint
+        """
+        self.api_key = api_key or os.getenv('GEMINI_API_KEY')
+        if not self.api_key:
+            raise ValueError("GEMINI_API_KEY not found in environment variables")
+        self.transport = transport or TransportConfig(transport="rest")
+        self._timeout = (self.transport.connect_timeout, self.transport.read_timeout)
+        self._session = None
+        self._session_lock = threading.Lock()
+        # Requests sent and sockets opened, for transport_stats
+        self._requests = _Counter()
+        self._connects = _Counter()
+
+    @property
+    def session(self) -> Any:
+        """The shared requests.Session (created on first use)"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    requests = require("requests", "the Gemini REST backend")
+                    adapter = requests.adapters.HTTPAdapter(
+                        pool_connections=1,
+                        pool_maxsize=self.transport.pool_size,
+                        max_retries=0
+                    )
+                    self._count_connects(adapter)
+                    session = requests.Session()
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    session.headers.update({
+                        "x-goog-api-key": self.api_key,
+                        "Content-Type": "application/json",
+                        "Connection": "keep-alive" if self.transport.keepalive else "close"
+                    })
+                    self._session = session
+        return self._session
+    
+    def _count_connects(self, adapter: Any):
+        """Make the adapter's pools count every socket they open (including reconnects)"""
+        connectionpool = require("urllib3.connectionpool", "the Gemini REST backend")
+        connects = self._connects
+        pool_classes = {}
+        for scheme, pool_class in (("http", connectionpool.HTTPConnectionPool),
+                                   ("https", connectionpool.HTTPSConnectionPool)):
+            class CountingConnection(pool_class.ConnectionCls):
+                def connect(self):
+                    connects.increment()
+                    super().connect()
+            pool_classes[scheme] = type(f"Counting{pool_class.__name__}", (pool_class,),
+                                        {"ConnectionCls": CountingConnection})
+        adapter.poolmanager.pool_classes_by_scheme = pool_classes
+
+    def _url(self, model_name: str, method: str) -> str:
+        return f"{self.transport.endpoint}/{API_VERSION}/models/{model_name}:{method}"
+
+    @staticmethod
+    def _body(contents: List[Dict[str, Any]], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Request body; response_schema turns on JSON mode"""
+        body: Dict[str, Any] = {"contents": contents}
+        generation_config = dict(kwargs.get("generation_config") or {})
+        response_schema = kwargs.get("response_schema")
+        if response_schema is not None:
+            generation_config["responseMimeType"] = JSON_MIME_TYPE
+            generation_config["responseSchema"] = response_schema
+        if generation_config:
+            body["generationConfig"] = generation_config
+        return body
+
+    def _post(self, url: str, body: Dict[str, Any], stream: bool = False) -> Any:
+        requests = require("requests", "the Gemini REST backend")
+        self._requests.increment()
+        try:
+            # bytes, not str: http.client then sends headers and body in one write, avoiding
+            # the Nagle / delayed-ACK stall of a separate small body packet
+            response = self.session.post(url, data=json.dumps(body).encode("utf-8"),
+                                         timeout=self._timeout, stream=stream)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise GeminiRestError(f"Gemini API transport error: {e}", retryable=True) from e
+        if response.status_code >= 400:
+            try:
+                message = response.json().get("error", {}).get("message", response.text)
+            except ValueError:
+                message = response.text
+            finally:
+                response.close()
+            raise GeminiRestError(
+                f"Gemini API error {response.status_code}: {message}",
+                status=response.status_code,
+                retryable=response.status_code in RETRYABLE_STATUSES
+            )
+        return response
+
+    @staticmethod
+    def _text(payload: Dict[str, Any]) -> str:
+        candidates = payload.get("candidates") or []
+        if not candidates:
+            return ""
+        parts = (candidates[0].get("content") or {}).get("parts") or []
+        return "".join(part.get("text", "") for part in parts)
+
+    @staticmethod
+    def _raw(payload: Dict[str, Any]) -> Any:
+        """SDK-shaped usage metadata, so usage accounting treats both Gemini backends alike"""
+        usage = payload.get("usageMetadata") or {}
+        return SimpleNamespace(payload=payload, usage_metadata=SimpleNamespace(
+            prompt_token_count=usage.get("promptTokenCount"),
+            candidates_token_count=usage.get("candidatesTokenCount"),
+            cached_content_token_count=usage.get("cachedContentTokenCount")
+        ))
+
+    def generate(self, prompt: str, model_name: str, **kwargs) -> ModelResponse:
+        """Generate a complete response"""
+        body = self._body([{"role": "user", "parts": [{"text": prompt}]}], kwargs)
+        response = self._post(self._url(model_name, "generateContent"), body)
+        payload = response.json()
+        return ModelResponse(self._text(payload), model_name, raw=self._raw(payload))
+
+    def generate_stream(self, prompt: str, model_name: str, **kwargs) -> Iterator[str]:
+        """Generate a response as text chunks (server-sent events)"""
+        body = self._body([{"role": "user", "parts": [{"text": prompt}]}], kwargs)
+        response = self._post(self._url(model_name, "streamGenerateContent") + "?alt=sse", body, stream=True)
+        # Closing returns the connection to the pool, even if the consumer stops early
+        with response:
+            for line in response.iter_lines():
+                if not line.startswith(b"data:"):
+                    continue
+                text = self._text(json.loads(line[5:].decode("utf-8")))
+                if text:
+                    yield text
+
+    def chat(self,
+             history: List[Dict[str, str]],
+             message: str,
+             model_name: str) -> ModelResponse:
+        """Send one message on top of an existing conversation"""
+        contents = [
+            {"role": "model" if turn["role"] in ("model", "assistant") else "user",
+             "parts": [{"text": turn["content"]}]}
+            for turn in history
+        ]
+        contents.append({"role": "user", "parts": [{"text": message}]})
+        response = self._post(self._url(model_name, "generateContent"), self._body(contents, {}))
+        payload = response.json()
+        return ModelResponse(self._text(payload), model_name, raw=self._raw(payload))
+
+    def transport_stats(self) -> Dict[str, Any]:
+        """Requests sent, connections opened and the share of requests that reused a connection"""
+        requests_sent = self._requests.value
+        connections = self._connects.value
+        return {
+            "transport": "rest",
+            "requests": requests_sent,
+            "connections_opened": connections,
+            "reuse_rate": (1.0 - connections / requests_sent) if requests_sent else 0.0,
+            "pool_size": self.transport.pool_size
+        }
+
+    def close(self):
+        """Close pooled connections"""
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
@@ -0,0 +1,150 @@
+"""
+Deterministic local stub backend for Vantage AI PersonaPilot
+
+Used for load testing, benchmarks and offline capacity runs. Responses are a pure
+function of the prompt; latency and injected errors come from a seeded RNG.
+"""
+
+from typing import Dict, Any, List, Iterator, Optional, Callable
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+from src.core.backends.base import ModelBackend, ModelResponse
+from src.core.response_schema import sample_from_schema
+
+logger = logging.getLogger(__name__)
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+
+
+class StubBackendError(RuntimeError):
+    """Error injected by the stub backend"""
+    
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class StubBackend(ModelBackend):
+    """Offline backend with configurable latency, chunked streaming and error injection"""
+    
+    name = "stub"
+    supports_json_mode = True
+    
+    def __init__(self,
+                 latency_ms: float = 50.0,
+                 latency_distribution: str = "fixed",
+                 latency_jitter_ms: float = 0.0,
+                 chunk_size: int = 64,
+                 chunk_delay_ms: float = 0.0,
+                 error_rate: float = 0.0,
+                 error_retryable: bool = True,
+                 seed: int = 0,
+                 responder: Optional[Callable[[str], str]] = None):
+        """
+        Initialize the stub backend
+        
+        Args:
+            latency_ms: Mean time to a complete response (time to first chunk when streaming)
+            latency_distribution: One of fixed, uniform, normal, lognormal, exponential
+            latency_jitter_ms: Spread of the distribution (half-width for uniform, sigma otherwise)
+            chunk_size: Characters per streamed chunk
+            chunk_delay_ms: Delay between streamed chunks
+            error_rate: Probability that a call raises StubBackendError
+            error_retryable: Whether injected errors are marked retryable
+            seed: Seed for the latency and error RNG
+            responder: Optional function mapping a prompt to response text
+        """
+        if latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution '{latency_distribution}'. "
+                             f"Available: {list(LATENCY_DISTRIBUTIONS)}")
+        self.latency_ms = latency_ms
+        self.latency_distribution = latency_distribution
+        self.latency_jitter_ms = latency_jitter_ms
+        self.chunk_size = max(1, chunk_size)
+        self.chunk_delay_ms = chunk_delay_ms
+        self.error_rate = error_rate
+        self.error_retryable = error_retryable
+        self.responder = responder or self.default_response
+        self.call_count = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._scripted_failures: List[bool] = []
+    
+    def fail_next(self, count: int = 1, retryable: bool = True):
+        """Make the next `count` calls fail regardless of error_rate"""
+        with self._lock:
+            self._scripted_failures.extend([retryable] * count)
+    
+    def sample_latency(self) -> float:
+        """Sample a latency in seconds from the configured distribution"""
+        mean, spread = self.latency_ms, self.latency_jitter_ms
+        with self._lock:
+            if self.latency_distribution == "uniform":
+                value = self._rng.uniform(mean - spread, mean + spread)
+            elif self.latency_distribution == "normal":
+                value = self._rng.gauss(mean, spread)
+            elif self.latency_distribution == "lognormal":
+                # Parameterized so the median equals latency_ms; spread is sigma in ms
+                sigma = spread / mean if mean > 0 else 0.0
+                value = mean * self._rng.lognormvariate(0.0, sigma)
+            elif self.latency_distribution == "exponential":
+                value = self._rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+            else:
+                value = mean
+        return max(0.0, value) / 1000.0
+    
+    def _begin_call(self):
+        """Count the call, inject errors and simulate latency"""
+        with self._lock:
+            self.call_count += 1
+            if self._scripted_failures:
+                retryable = self._scripted_failures.pop(0)
+                raise StubBackendError("Injected stub failure", retryable=retryable)
+            fail = self.error_rate > 0 and self._rng.random() < self.error_rate
+        if fail:
+            raise StubBackendError("Injected stub failure", retryable=self.error_retryable)
+        delay = self.sample_latency()
+        if delay:
+            time.sleep(delay)
+    
+    @staticmethod
+    def default_response(prompt: str) -> str:
+        """Echo the JSON structure requested by the prompt, or a deterministic text reply"""
+        match = re.search(r'```json\s*(.+?)\s*```', prompt, re.DOTALL)
+        if match:
+            return match.group(1)
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:12]
+        return f"Stub response {digest} for: {prompt.strip().splitlines()[-1][:80] if prompt.strip() else ''}"
+    
+    def _respond(self, prompt: str, response_schema: Optional[Dict[str, Any]]) -> str:
+        """Response text, conforming to response_schema unless a custom responder is set"""
+        if response_schema is not None and self.responder == self.default_response:
+            return json.dumps(sample_from_schema(response_schema), indent=2)
+        return self.responder(prompt)
+    
+    def generate(self, prompt: str, model_name: str, **kwargs) -> ModelResponse:
+        """Generate a complete response"""
+        self._begin_call()
+        return ModelResponse(self._respond(prompt, kwargs.get("response_schema")), model_name)
+    
+    def generate_stream(self, prompt: str, model_name: str, **kwargs) -> Iterator[str]:
+        """Generate a response in chunk_size pieces"""
+        self._begin_call()
+        text = self._respond(prompt, kwargs.get("response_schema"))
+        for start in range(0, len(text), self.chunk_size):
+            if start and self.chunk_delay_ms:
+                time.sleep(self.chunk_delay_ms / 1000.0)
+            yield text[start:start + self.chunk_size]
+    
+    def chat(self, 
+             history: List[Dict[str, str]], 
+             message: str, 
+             model_name: str) -> ModelResponse:
+        """Reply to the new message; history only affects call accounting"""
+        self._begin_call()
+        return ModelResponse(self.responder(message), model_name)
@@ -0,0 +1,76 @@
+"""
+Transport settings for the Gemini backends of Vantage AI PersonaPilot
+
+A cold connection to the API costs a TCP and TLS handshake, which shows up
+in tail latency. Both Gemini backends are built to be created once per
+process and shared by every thread, so connections are reused:
+
+- GeminiBackend (SDK) picks the SDK transport (grpc multiplexes all calls
+  over one HTTP/2 channel; rest uses the SDK's HTTP session) and applies the
+  request timeout. The SDK does not expose pool or keep-alive settings.
+- GeminiRestBackend calls the REST API over a pooled requests.Session and
+  applies every setting here: pool size, keep-alive and connect/read timeouts.
+  It also reports how often pooled connections were reused.
+
+Both are synchronous and called from worker threads (the HTTP API runs model
+calls on its thread pool), so no client is bound to an event loop.
+"""
+
+from typing import Any, Dict
+
+TRANSPORTS = ("grpc", "rest")
+
+DEFAULT_ENDPOINT = "https://generativelanguage.googleapis.com"
+
+
+class TransportConfig:
+    """Connection settings for model API clients"""
+
+    def __init__(self,
+                 transport: str = "grpc",
+                 pool_size: int = 32,
+                 keepalive: bool = True,
+                 connect_timeout: float = 5.0,
+                 read_timeout: float = 60.0,
+                 endpoint: str = DEFAULT_ENDPOINT):
+        """
+        Initialize transport settings
+
+        Args:
+            transport: SDK transport (grpc or rest)
+            pool_size: Connections kept open per host (REST backend)
+            keepalive: Reuse connections between calls (REST backend)
+            connect_timeout: Seconds to establish a connection (REST backend)
+            read_timeout: Seconds to wait for a response
+            endpoint: API base URL
+        """
+        if transport not in TRANSPORTS:
+            raise ValueError(f"Transport '{transport}' not found. Available: {list(TRANSPORTS)}")
+        self.transport = transport
+        self.pool_size = max(1, pool_size)
+        self.keepalive = keepalive
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.endpoint = endpoint.rstrip("/")
+
+    @classmethod
+    def from_config(cls, config) -> 'TransportConfig':
+        """Create transport settings from a Config object"""
+        return cls(
+            transport=config.model_transport,
+            pool_size=config.model_pool_size,
+            keepalive=config.model_keepalive,
+            connect_timeout=config.model_connect_timeout,
+            read_timeout=config.model_read_timeout,
+            endpoint=config.model_endpoint
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "transport": self.transport,
+            "pool_size": self.pool_size,
+            "keepalive": self.keepalive,
+            "connect_timeout": self.connect_timeout,
+            "read_timeout": self.read_timeout,
+            "endpoint": self.endpoint
+        }
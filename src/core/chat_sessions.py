@@ -0,0 +1,85 @@
+"""
+Persistent multi-turn chat sessions for Vantage AI PersonaPilot
+"""
+
+from typing import Dict, List, Optional, Callable
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = """Summarize the following conversation so it can replace the original turns as context for continuing it. Keep facts, decisions, user preferences and open questions. Be concise.
+
+{transcript}"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token)"""
+    return max(1, len(text) // 4)
+
+
+def normalize_role(role: str) -> str:
+    """Map message roles onto the user/model roles used in chat history"""
+    return "model" if role in ("model", "assistant") else "user"
+
+
+class ChatSession:
+    """Conversation history for one session id"""
+    
+    __slots__ = ("session_id", "history", "token_count", "lock")
+    
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.history: List[Dict[str, str]] = []
+        self.token_count = 0
+        # Serializes turns within a session; different sessions proceed in parallel
+        self.lock = threading.Lock()
+    
+    def add_turn(self, role: str, content: str):
+        """Append a turn to the history"""
+        self.history.append({"role": normalize_role(role), "content": content})
+        self.token_count += estimate_tokens(content)
+    
+    def compact(self, 
+                summarize: Callable[[str], str],
+                token_budget: int,
+                keep_recent_turns: int = 4) -> bool:
+        """
+        Replace the oldest turns with a summary once history exceeds the token budget
+        
+        Args:
+            summarize: Function turning a transcript into a summary
+            token_budget: Maximum estimated history tokens
+            keep_recent_turns: Number of most recent turns never summarized
+        
+        Returns:
+            True if history was compacted
+        """
+        if self.token_count <= token_budget or len(self.history) <= keep_recent_turns:
+            return False
+        
+        # Summarize the oldest turns until what is left fits in half the budget
+        target = token_budget // 2
+        remaining = self.token_count
+        split = 0
+        while split < len(self.history) - keep_recent_turns and remaining > target:
+            remaining -= estimate_tokens(self.history[split]["content"])
+            split += 1
+        # Keep user/model alternation: the retained history must start with a user turn
+        while split < len(self.history) - 1 and self.history[split]["role"] != "user":
+            split += 1
+        if split == 0:
+            return False
+        
+        transcript = "\n".join(f"{turn['role']}: {turn['content']}" for turn in self.history[:split])
+        summary = summarize(SUMMARY_PROMPT.format(transcript=transcript))
+        
+        retained = self.history[split:]
+        self.history = []
+        self.token_count = 0
+        self.add_turn("user", f"Summary of our earlier conversation: {summary}")
+        self.add_turn("model", "Understood. I'll continue from that summary.")
+        for turn in retained:
+            self.add_turn(turn["role"], turn["content"])
+        logger.debug("Compacted chat session %s: %s turns summarized", self.session_id, split)
+        return True
@@ -0,0 +1,121 @@
+"""
+Request coalescing (single-flight) for Vantage AI PersonaPilot
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+from concurrent.futures import Future
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def make_request_key(*parts: Any, **options: Any) -> str:
+    """Build a stable coalescing key from request parts and options"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\x00")
+    for name in sorted(options):
+        digest.update(f"{name}={options[name]!r}".encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls that share a key into one execution"""
+    
+    def __init__(self):
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._async_in_flight: Dict[Hashable, "asyncio.Future"] = {}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "executions": 0, "coalesced": 0}
+    
+    def do(self, key: Hashable, func: Callable[[], T]) -> T:
+        """
+        Run `func` unless a call with the same key is already in flight
+        
+        Args:
+            key: Coalescing key
+            func: Zero-argument callable producing the result
+        
+        Returns:
+            Result of the shared execution (exceptions are shared too)
+        """
+        with self._lock:
+            self._stats["calls"] += 1
+            future = self._in_flight.get(key)
+            if future is not None:
+                self._stats["coalesced"] += 1
+                leader = False
+            else:
+                future = Future()
+                self._in_flight[key] = future
+                self._stats["executions"] += 1
+                leader = True
+        
+        if not leader:
+            return future.result()
+        
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+    
+    async def do_async(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """Asyncio variant of do(); coalesces callers on the same event loop"""
+        # Imported here: asyncio is costly to import and only async callers need it
+        import asyncio
+        
+        with self._lock:
+            self._stats["calls"] += 1
+            future = self._async_in_flight.get(key)
+            if future is not None and future.get_loop() is asyncio.get_running_loop():
+                self._stats["coalesced"] += 1
+                leader = False
+            else:
+                future = asyncio.get_running_loop().create_future()
+                self._async_in_flight[key] = future
+                self._stats["executions"] += 1
+                leader = True
+        
+        if not leader:
+            return await asyncio.shield(future)
+        
+        try:
+            result = await func()
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an exception nobody awaited is not logged as lost
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                if self._async_in_flight.get(key) is future:
+                    del self._async_in_flight[key]
+    
+    def in_flight(self) -> int:
+        """Number of distinct keys currently executing"""
+        with self._lock:
+            return len(self._in_flight) + len(self._async_in_flight)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing counters"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["in_flight"] = self.in_flight()
+        stats["coalesced_ratio"] = stats["coalesced"] / stats["calls"] if stats["calls"] else 0.0
+        return stats
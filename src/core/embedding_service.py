@@ -0,0 +1,266 @@
+"""
+Micro-batching embedding service for Vantage AI PersonaPilot
+
+Transformer encoders pay a large fixed cost per call, so encoding one text
+at a time wastes most of the CPU. EmbeddingService puts every encode request
+on a shared queue. A single background thread takes the first waiting text,
+collects more for up to max_wait_ms or until max_batch_size texts are
+queued, and encodes them as one batch. Texts that arrive while a batch is
+being encoded form the next one. Identical texts within a batch are encoded
+once.
+
+Callers get a concurrent.futures.Future from submit(). embed() blocks on it
+from a thread, and embed_async() awaits it on an event loop.
+
+The encoder is sentence-transformers (EMBEDDING_MODEL) when installed, and
+the hashed bag-of-words embedding from context_memory otherwise. Vectors are
+only comparable with vectors from the same encoder.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from concurrent.futures import Future, InvalidStateError
+import asyncio
+import logging
+import queue
+import threading
+import time
+
+from src.personas.context_memory import EMBEDDING_DIM, embed_text
+from src.utils.lazy_imports import optional_import, require
+from src.utils.metrics import EMBEDDING_BATCH_SIZE, observe
+
+logger = logging.getLogger(__name__)
+
+HASHED = "hashed"
+
+# Queue sentinel that stops the batching thread
+_STOP = None
+
+
+def _fail(batch: List[Tuple[str, Future]], error: BaseException):
+    """Fail every future of a batch that is not done yet"""
+    for _, future in batch:
+        try:
+            future.set_exception(error)
+        except InvalidStateError:
+            # Already resolved or cancelled
+            pass
+
+
+class HashedEncoder:
+    """Hashed bag-of-words embeddings (sparse dictionaries, no model needed)"""
+
+    name = HASHED
+    dimension = EMBEDDING_DIM
+
+    def encode(self, texts: Sequence[str]) -> List[Any]:
+        return [embed_text(text) for text in texts]
+
+
+class SentenceTransformerEncoder:
+    """Dense, normalized embeddings from a sentence-transformers model"""
+
+    name = "sentence_transformers"
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", device: Optional[str] = None):
+        """
+        Load the model
+
+        Args:
+            model_name: sentence-transformers model name or path
+            device: Torch device (chosen by sentence-transformers if None)
+        """
+        module = require("sentence_transformers", "transformer embeddings")
+        self.model_name = model_name
+        self.model = module.SentenceTransformer(model_name, device=device)
+
+    @property
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: Sequence[str]) -> List[Any]:
+        vectors = self.model.encode(
+            list(texts),
+            batch_size=len(texts),
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+        return list(vectors)
+
+
+def create_encoder(model_name: Optional[str] = None) -> Any:
+    """
+    Create the best available encoder
+
+    Args:
+        model_name: sentence-transformers model ("hashed" or None for hashed embeddings)
+
+    Returns:
+        SentenceTransformerEncoder, or HashedEncoder when sentence-transformers
+        is not installed or the model cannot be loaded
+    """
+    if not model_name or model_name == HASHED:
+        return HashedEncoder()
+    if optional_import("sentence_transformers") is None:
+        logger.info("sentence-transformers not installed; using hashed embeddings")
+        return HashedEncoder()
+    try:
+        return SentenceTransformerEncoder(model_name)
+    except Exception as e:
+        logger.warning("Could not load embedding model %s, using hashed embeddings: %s", model_name, e)
+        return HashedEncoder()
+
+
+class EmbeddingService:
+    """Shares one encoder between threads and coroutines, batching concurrent requests"""
+
+    def __init__(self,
+                 encoder: Optional[Any] = None,
+                 max_batch_size: int = 32,
+                 max_wait_ms: float = 5.0):
+        """
+        Initialize the service (the batching thread starts on first use)
+
+        Args:
+            encoder: Object with encode(texts) -> vectors (HashedEncoder by default)
+            max_batch_size: Most texts encoded in one call
+            max_wait_ms: How long the first text of a batch waits for others
+                (0 batches only what queued up during the previous batch)
+        """
+        self.encoder = encoder or HashedEncoder()
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: "queue.SimpleQueue[Optional[Tuple[str, Future]]]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self._batches = 0
+        self._texts = 0
+        self._encoded = 0
+
+    @classmethod
+    def from_config(cls, config) -> 'EmbeddingService':
+        """Create a service (and load its encoder) from a Config object"""
+        return cls(
+            encoder=create_encoder(config.embedding_model),
+            max_batch_size=config.embedding_batch_size,
+            max_wait_ms=config.embedding_max_wait_ms
+        )
+
+    @property
+    def dimension(self) -> int:
+        return self.encoder.dimension
+
+    def submit(self, text: str) -> "Future[Any]":
+        """Queue a text for encoding; the future resolves to its vector"""
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Embedding service is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._thread.start()
+            self._queue.put((text, future))
+        return future
+
+    def embed(self, text: str) -> Any:
+        """Encode one text (blocks until its batch is done)"""
+        return self.submit(text).result()
+
+    def embed_many(self, texts: Sequence[str]) -> List[Any]:
+        """Encode several texts; they share batches with any concurrent requests"""
+        futures = [self.submit(text) for text in texts]
+        return [future.result() for future in futures]
+
+    async def embed_async(self, text: str) -> Any:
+        """Encode one text without blocking the event loop"""
+        return await asyncio.wrap_future(self.submit(text))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                try:
+                    remaining = deadline - time.monotonic()
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            try:
+                self._encode(batch)
+            except Exception as e:
+                # The thread must survive: callers wait on these futures without a timeout
+                logger.error("Embedding batch failed: %s", e)
+                _fail(batch, e)
+            if stop:
+                return
+
+    def _encode(self, batch: List[Tuple[str, Future]]):
+        # Futures cancelled while queued are skipped
+        live = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+        if not live:
+            return
+        texts = list(dict.fromkeys(text for text, _ in live))
+        try:
+            vectors = list(self.encoder.encode(texts))
+            if len(vectors) != len(texts):
+                raise ValueError(f"Encoder returned {len(vectors)} vectors for {len(texts)} texts")
+        except Exception as e:
+            logger.error("Embedding batch of %s texts failed: %s", len(texts), e)
+            _fail(live, e)
+            return
+        by_text = dict(zip(texts, vectors))
+        for text, future in live:
+            future.set_result(by_text[text])
+        with self._lock:
+            self._batches += 1
+            self._texts += len(live)
+            self._encoded += len(texts)
+        observe(EMBEDDING_BATCH_SIZE, len(texts), encoder=self.encoder.name)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Batches run, texts requested and texts actually encoded"""
+        with self._lock:
+            return {
+                "encoder": self.encoder.name,
+                "batches": self._batches,
+                "texts": self._texts,
+                "encoded": self._encoded,
+                "mean_batch_size": self._encoded / self._batches if self._batches else 0.0
+            }
+
+    def close(self):
+        """Encode what is queued, then stop the batching thread"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+            if thread is not None:
+                self._queue.put(_STOP)
+        if thread is not None:
+            thread.join()
+
+
+_service: Optional[EmbeddingService] = None
+_service_lock = threading.Lock()
+
+
+def get_embedding_service() -> EmbeddingService:
+    """The process-wide embedding service, built from configuration on first use"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                from src.utils.config import get_config
+                _service = EmbeddingService.from_config(get_config())
+    return _service
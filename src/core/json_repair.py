@@ -0,0 +1,422 @@
+"""
+Tolerant parsing of model JSON output for Vantage AI PersonaPilot
+
+Models occasionally return almost-valid JSON: trailing commas, unescaped
+quotes or raw newlines inside strings, missing commas between members, Python
+literals, or output cut off by the token limit. repair_json() fixes these in
+a single pass over the text and reports whether the output was truncated, so
+the caller can ask the model for just the missing tail instead of re-running
+the whole request. validate_against_schema() checks the result against a
+persona's get_output_format() example structure.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import re
+
+CONTINUATION_PROMPT = (
+    "Your previous response was cut off before the JSON was complete. "
+    "Continue it from exactly the last character you wrote. Do not repeat "
+    "anything already written and do not add code fences or commentary."
+)
+
+_FENCED_JSON = re.compile(r'```(?:json)?\s*(.+?)\s*```', re.DOTALL)
+_OPEN_FENCE = re.compile(r'```(?:json)?\s*', re.DOTALL)
+_LITERALS = {"true": "true", "false": "false", "null": "null",
+             "True": "true", "False": "false", "None": "null"}
+_TOKEN_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789+-.")
+_NUMBER = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?$')
+_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+
+# Parser states within a container
+_KEY = "key"
+_COLON = "colon"
+_VALUE = "value"
+_COMMA = "comma"
+
+
+class ParsedResponse:
+    """Outcome of parsing a model's JSON output"""
+
+    __slots__ = ("value", "repairs", "issues", "truncated")
+
+    def __init__(self, value: Any, repairs: List[str], issues: List[str], truncated: bool):
+        self.value = value
+        self.repairs = repairs
+        self.issues = issues
+        self.truncated = truncated
+
+    @property
+    def ok(self) -> bool:
+        """True if a value was recovered"""
+        return self.value is not None
+
+
+def extract_json_text(text: str) -> str:
+    """Get the JSON part of a response (fenced block, unterminated fence, or first bracket on)"""
+    match = _FENCED_JSON.search(text)
+    if match:
+        return match.group(1)
+    match = _OPEN_FENCE.search(text)
+    if match:
+        # Truncated output may have lost its closing fence
+        text = text[match.end():]
+    starts = [index for index in (text.find("{"), text.find("[")) if index != -1]
+    return text[min(starts):] if starts else text.strip()
+
+
+def _strip_trailing_comma(out: List[str]) -> bool:
+    """Remove a trailing comma (and whitespace after it) from the output"""
+    index = len(out) - 1
+    while index >= 0 and out[index].isspace():
+        index -= 1
+    if index >= 0 and out[index] == ",":
+        del out[index:]
+        return True
+    return False
+
+
+def _closes_string(text: str, index: int, is_key: bool) -> bool:
+    """Decide whether the quote at `index` ends the current string"""
+    end = len(text)
+    j = index + 1
+    saw_newline = False
+    while j < end and text[j].isspace():
+        saw_newline = saw_newline or text[j] == "\n"
+        j += 1
+    if j == end:
+        return True
+    following = text[j]
+    if following in ",}]":
+        return True
+    if following == ":":
+        return is_key
+    # A quote on the next line starts a new member that is missing its comma
+    return following == '"' and saw_newline
+
+
+def repair_json(text: str) -> Tuple[str, List[str], bool]:
+    """
+    Repair almost-valid JSON
+
+    Args:
+        text: JSON text starting at its opening bracket
+
+    Returns:
+        Tuple of (repaired text, descriptions of the repairs made, truncated flag)
+    """
+    out: List[str] = []
+    repairs: List[str] = []
+    # Each open container: [bracket, state, output index where the current member starts]
+    stack: List[list] = []
+    end = len(text)
+    i = 0
+    done = False
+
+    def value_done():
+        nonlocal done
+        if stack:
+            stack[-1][1] = _COMMA
+        else:
+            done = True
+
+    def begin_value() -> bool:
+        """Prepare to emit a value; returns False if no value may start here"""
+        if not stack:
+            return not done
+        top = stack[-1]
+        if top[1] == _COMMA:
+            out.append(",")
+            repairs.append("inserted missing comma")
+            top[1] = _KEY if top[0] == "{" else _VALUE
+            top[2] = len(out)
+        if top[0] == "{" and top[1] == _COLON:
+            out.append(":")
+            repairs.append("inserted missing colon")
+            top[1] = _VALUE
+        return top[0] == "[" or top[1] in (_KEY, _VALUE)
+
+    while i < end and not done:
+        char = text[i]
+
+        if char.isspace():
+            out.append(char)
+            i += 1
+
+        elif char == '"':
+            if not begin_value():
+                repairs.append("dropped unexpected string")
+                i = text.find('"', i + 1) + 1 or end
+                continue
+            is_key = bool(stack) and stack[-1][0] == "{" and stack[-1][1] == _KEY
+            out.append('"')
+            i += 1
+            closed = False
+            while i < end:
+                char = text[i]
+                if char == "\\":
+                    if i + 1 >= end:
+                        i = end
+                        break
+                    out.append(text[i:i + 2])
+                    i += 2
+                elif char == '"':
+                    if _closes_string(text, i, is_key):
+                        out.append('"')
+                        i += 1
+                        closed = True
+                        break
+                    out.append('\\"')
+                    repairs.append("escaped quote inside string")
+                    i += 1
+                elif char in _ESCAPES:
+                    out.append(_ESCAPES[char])
+                    repairs.append("escaped control character inside string")
+                    i += 1
+                else:
+                    out.append(char)
+                    i += 1
+            if not closed:
+                # Truncated inside the string; handled after the loop
+                stack.append(["\"", _KEY if is_key else _VALUE, None])
+                break
+            if is_key:
+                stack[-1][1] = _COLON
+            else:
+                value_done()
+
+        elif char in "{[":
+            if not begin_value():
+                repairs.append(f"dropped unexpected '{char}'")
+                i += 1
+                continue
+            if stack and stack[-1][0] == "{" and stack[-1][1] == _KEY:
+                repairs.append("dropped member without a key")
+                out.append('""')
+                out.append(":")
+            out.append(char)
+            stack.append([char, _KEY if char == "{" else _VALUE, len(out)])
+            i += 1
+
+        elif char in "}]":
+            if not stack:
+                repairs.append(f"dropped unmatched '{char}'")
+                i += 1
+                continue
+            if _strip_trailing_comma(out):
+                repairs.append("removed trailing comma")
+            top = stack[-1]
+            if top[0] == "{" and top[1] in (_COLON, _VALUE):
+                del out[top[2]:]
+                _strip_trailing_comma(out)
+                repairs.append("dropped key without a value")
+            expected = "}" if top[0] == "{" else "]"
+            if char != expected:
+                repairs.append(f"replaced '{char}' with '{expected}'")
+            out.append(expected)
+            stack.pop()
+            value_done()
+            i += 1
+
+        elif char == ",":
+            if stack and stack[-1][1] == _COMMA:
+                out.append(",")
+                stack[-1][1] = _KEY if stack[-1][0] == "{" else _VALUE
+                stack[-1][2] = len(out)
+            else:
+                repairs.append("dropped extra comma")
+            i += 1
+
+        elif char == ":":
+            if stack and stack[-1][0] == "{" and stack[-1][1] == _COLON:
+                out.append(":")
+                stack[-1][1] = _VALUE
+            else:
+                repairs.append("dropped extra colon")
+            i += 1
+
+        elif char in _TOKEN_CHARS:
+            j = i
+            while j < end and text[j] in _TOKEN_CHARS:
+                j += 1
+            token = text[i:j]
+            literal = _LITERALS.get(token)
+            if literal is None and _NUMBER.match(token) is None:
+                if j == end:
+                    # Truncated in the middle of a literal or number
+                    i = j
+                    break
+                repairs.append(f"dropped invalid token '{token}'")
+                i = j
+                continue
+            if not begin_value() or (stack and stack[-1][0] == "{" and stack[-1][1] == _KEY):
+                repairs.append(f"dropped unexpected token '{token}'")
+                i = j
+                continue
+            if literal is not None and literal != token:
+                repairs.append(f"converted '{token}' to '{literal}'")
+            out.append(literal or token)
+            value_done()
+            i = j
+
+        else:
+            repairs.append(f"dropped unexpected character {char!r}")
+            i += 1
+
+    if done and text[i:].strip():
+        repairs.append("dropped text after the JSON value")
+
+    truncated = bool(stack)
+    if truncated:
+        if stack[-1][0] == '"':
+            _, role, _ = stack.pop()
+            if role == _KEY:
+                del out[stack[-1][2]:]
+            else:
+                out.append('"')
+                value_done()
+        if stack and stack[-1][0] == "{" and stack[-1][1] in (_COLON, _VALUE):
+            del out[stack[-1][2]:]
+        _strip_trailing_comma(out)
+        while stack:
+            out.append("}" if stack.pop()[0] == "{" else "]")
+        repairs.append("closed truncated output")
+
+    return "".join(out), repairs, truncated
+
+
+def _type_name(value: Any) -> str:
+    if isinstance(value, dict):
+        return "object"
+    if isinstance(value, list):
+        return "array"
+    return "string" if isinstance(value, str) else type(value).__name__
+
+
+def validate_against_schema(value: Any, schema: Any, path: str = "$") -> List[str]:
+    """
+    Check a value against an example output structure
+
+    Every key of an example object is expected; extra keys are allowed. Lists
+    are checked against their first example item.
+
+    Args:
+        value: Parsed response
+        schema: Example structure as returned by a persona's get_output_format()
+        path: Location of the value, for messages
+
+    Returns:
+        Problems found (empty if the value matches)
+    """
+    issues: List[str] = []
+    if isinstance(schema, dict):
+        if not isinstance(value, dict):
+            return [f"{path}: expected object, got {_type_name(value)}"]
+        for key, example in schema.items():
+            if key not in value:
+                issues.append(f"{path}.{key}: missing")
+            else:
+                issues.extend(validate_against_schema(value[key], example, f"{path}.{key}"))
+    elif isinstance(schema, list):
+        if not isinstance(value, list):
+            return [f"{path}: expected array, got {_type_name(value)}"]
+        if schema:
+            for index, item in enumerate(value):
+                issues.extend(validate_against_schema(item, schema[0], f"{path}[{index}]"))
+    elif isinstance(value, (dict, list)):
+        issues.append(f"{path}: expected a single value, got {_type_name(value)}")
+    return issues
+
+
+def coerce_to_schema(value: Any, schema: Any) -> Any:
+    """Fix shape mismatches that lose nothing (a single value where a list is expected)"""
+    if isinstance(schema, dict) and isinstance(value, dict):
+        return {
+            key: coerce_to_schema(item, schema[key]) if key in schema else item
+            for key, item in value.items()
+        }
+    if isinstance(schema, list):
+        if isinstance(value, list):
+            return [coerce_to_schema(item, schema[0]) for item in value] if schema else value
+        if value is not None:
+            return [coerce_to_schema(value, schema[0]) if schema else value]
+    return value
+
+
+def unwrap_response(value: Any, schema: Dict[str, Any]) -> Any:
+    """Look inside a {"response": {...}} wrapper when the schema has no such key"""
+    if (isinstance(value, dict) and "response" not in schema
+            and isinstance(value.get("response"), dict)):
+        return value["response"]
+    return value
+
+
+def _checked(value: Any, repairs: List[str], truncated: bool, schema: Optional[Dict[str, Any]]) -> ParsedResponse:
+    """Coerce a parsed value to the schema and collect the remaining mismatches"""
+    issues: List[str] = []
+    if value is not None and schema is not None:
+        value = coerce_to_schema(value, schema)
+        issues = validate_against_schema(unwrap_response(value, schema), schema)
+    return ParsedResponse(value, repairs, issues, truncated)
+
+
+def parse_valid_json(text: str, schema: Optional[Dict[str, Any]] = None) -> Optional[ParsedResponse]:
+    """
+    Parse a model response whose JSON needs no repair
+
+    Args:
+        text: Raw model output
+        schema: Optional example structure to validate against
+
+    Returns:
+        ParsedResponse, or None if the JSON part is not valid as is
+    """
+    try:
+        value = json.loads(extract_json_text(text))
+    except json.JSONDecodeError:
+        return None
+    return _checked(value, [], False, schema)
+
+
+def parse_json_response(text: str, schema: Optional[Dict[str, Any]] = None) -> ParsedResponse:
+    """
+    Parse a model response as JSON, repairing it if needed
+
+    Args:
+        text: Raw model output
+        schema: Optional example structure to validate against
+
+    Returns:
+        ParsedResponse (value is None if nothing could be recovered)
+    """
+    candidate = extract_json_text(text)
+    repairs: List[str] = []
+    truncated = False
+    try:
+        value = json.loads(candidate)
+    except json.JSONDecodeError:
+        repaired, repairs, truncated = repair_json(candidate)
+        try:
+            value = json.loads(repaired)
+        except json.JSONDecodeError:
+            value = None
+    return _checked(value, repairs, truncated, schema)
+
+
+def merge_continuation(previous: str, continuation: str) -> str:
+    """
+    Append a continuation to truncated output
+
+    Code fences around the continuation are dropped. If the model restarted
+    the JSON from the beginning instead of continuing, the restart is used.
+    """
+    continuation = continuation.strip()
+    continuation = re.sub(r'^```(?:json)?\s*', '', continuation)
+    continuation = re.sub(r'\s*```$', '', continuation)
+    if continuation.startswith(("{", "[")) and extract_json_text(previous).startswith(continuation[0]):
+        try:
+            json.loads(continuation)
+            return continuation
+        except json.JSONDecodeError:
+            pass
+    return previous + continuation
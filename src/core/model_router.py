@@ -0,0 +1,283 @@
+"""
+Query complexity classification and model routing for Vantage AI PersonaPilot
+
+Queries are scored locally with cheap text heuristics (length, number of
+questions, reasoning keywords, code, attached context) and bucketed as
+simple, medium or complex. An optional small-model classifier is consulted
+only for queries whose score is close to a bucket boundary.
+
+ModelRouter maps each complexity to a tier: an ordered list of models whose
+first entry serves the query and whose remaining entries (followed by the
+router's global fallbacks) are tried in order when a model fails. Most
+traffic is simple, so it goes to the cheapest, fastest tier.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from collections import Counter
+import logging
+import re
+import threading
+
+from .query_analysis import QueryAnalysis, analyze_query
+from .resilience import CircuitOpenError, is_retryable_error
+from src.utils.metrics import MODEL_FALLBACKS, MODEL_ROUTES, increment
+
+logger = logging.getLogger(__name__)
+
+# Complexity levels (the values PromptEngine.create_dynamic_prompt accepts)
+SIMPLE = "simple"
+MEDIUM = "medium"
+COMPLEX = "complex"
+LEVELS = (SIMPLE, MEDIUM, COMPLEX)
+
+_REASONING_RE = re.compile(
+    r"\b(compare|comparison|analy[sz]e|analysis|design|architect\w*|trade-?offs?|optimi[sz]e|"
+    r"strateg\w*|evaluate|pros and cons|step[- ]by[- ]step|debug|refactor|implement|migrat\w*|"
+    r"prove|derive|plan|roadmap|why)\b",
+    re.IGNORECASE
+)
+_SIMPLE_RE = re.compile(r"^\s*(hi|hello|hey|thanks|thank you|what is|what's|who is|define|when is|where is)\b",
+                        re.IGNORECASE)
+_CODE_RE = re.compile(r"```|\bdef \w+\(|\bclass \w+|\w+\([^)]*\)\s*[{;:]|=>|\bSELECT\b.+\bFROM\b")
+_LIST_RE = re.compile(r"(?m)^\s*(?:\d+[.)]|[-*])\s+")
+
+
+def should_fall_back(error: BaseException) -> bool:
+    """Whether a failed call should move on to the next model
+
+    Transient errors that outlasted the retries and open circuits say the
+    model is unavailable; other errors (bad request, auth) would fail on any
+    model.
+    """
+    return isinstance(error, CircuitOpenError) or is_retryable_error(error)
+
+
+class ComplexityResult:
+    """Complexity of one query with the score and signals behind it"""
+
+    __slots__ = ("level", "score", "signals")
+
+    def __init__(self, level: str, score: float, signals: List[str]):
+        self.level = level
+        self.score = score
+        self.signals = signals
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"level": self.level, "score": round(self.score, 2), "signals": self.signals}
+
+
+class ComplexityClassifier:
+    """Scores query complexity with local heuristics"""
+
+    def __init__(self,
+                 simple_threshold: float = 1.5,
+                 complex_threshold: float = 3.5,
+                 model: Optional[Callable[[str], Optional[str]]] = None,
+                 model_margin: float = 0.5):
+        """
+        Initialize the classifier
+
+        Args:
+            simple_threshold: Scores below this are simple
+            complex_threshold: Scores at or above this are complex
+            model: Optional small classifier returning simple, medium or complex
+                (or None to keep the heuristic level) for borderline queries
+            model_margin: Distance from a threshold within which the model is consulted
+        """
+        self.simple_threshold = simple_threshold
+        self.complex_threshold = complex_threshold
+        self.model = model
+        self.model_margin = model_margin
+
+    def score(self,
+              query: str,
+              context: Optional[str] = None,
+              analysis: Optional[QueryAnalysis] = None) -> Tuple[float, List[str]]:
+        """Heuristic complexity score of a query and the signals that contributed"""
+        signals = []
+        words = len((analysis or analyze_query(query)).tokens)
+        score = min(4.0, words / 25.0)
+        if words > 50:
+            signals.append("long")
+
+        questions = query.count("?")
+        if questions > 1:
+            score += 0.75 * (questions - 1)
+            signals.append("multiple_questions")
+
+        reasoning = len(_REASONING_RE.findall(query))
+        if reasoning:
+            score += min(3.0, float(reasoning))
+            signals.append("reasoning")
+
+        if _CODE_RE.search(query):
+            score += 1.5
+            signals.append("code")
+
+        if len(_LIST_RE.findall(query)) > 1 or query.count(",") > 3:
+            score += 0.5
+            signals.append("enumeration")
+
+        if context:
+            score += min(1.5, len(context) / 2000.0)
+            signals.append("context")
+
+        if _SIMPLE_RE.match(query) and words <= 12:
+            score -= 0.5
+            signals.append("short_lookup")
+
+        return max(0.0, score), signals
+
+    def _level(self, score: float) -> str:
+        if score < self.simple_threshold:
+            return SIMPLE
+        if score >= self.complex_threshold:
+            return COMPLEX
+        return MEDIUM
+
+    def classify(self,
+                 query: str,
+                 context: Optional[str] = None,
+                 analysis: Optional[QueryAnalysis] = None) -> ComplexityResult:
+        """
+        Classify a query as simple, medium or complex
+
+        Args:
+            query: User's query
+            context: Optional context sent with the query
+            analysis: Analysis of the query (looked up in the query cache if None)
+
+        Returns:
+            Complexity result
+        """
+        score, signals = self.score(query, context, analysis)
+        level = self._level(score)
+        if self.model is not None and self._borderline(score):
+            try:
+                predicted = self.model(query)
+            except Exception as e:
+                logger.warning("Complexity model failed, keeping heuristic level: %s", e)
+                predicted = None
+            if predicted in LEVELS:
+                level = predicted
+                signals.append("model")
+        return ComplexityResult(level, score, signals)
+
+    def _borderline(self, score: float) -> bool:
+        return (abs(score - self.simple_threshold) <= self.model_margin
+                or abs(score - self.complex_threshold) <= self.model_margin)
+
+
+class RoutingDecision:
+    """Model chosen for a query and the models to fall back to"""
+
+    __slots__ = ("complexity", "model", "fallbacks")
+
+    def __init__(self, complexity: ComplexityResult, model: str, fallbacks: Tuple[str, ...]):
+        self.complexity = complexity
+        self.model = model
+        self.fallbacks = fallbacks
+
+    @property
+    def models(self) -> Tuple[str, ...]:
+        """All models in the order they are tried"""
+        return (self.model,) + self.fallbacks
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"complexity": self.complexity.to_dict(), "model": self.model, "fallbacks": list(self.fallbacks)}
+
+
+class ModelRouter:
+    """Routes queries to model tiers by complexity"""
+
+    def __init__(self,
+                 tiers: Dict[str, Sequence[str]],
+                 classifier: Optional[ComplexityClassifier] = None,
+                 fallback_models: Sequence[str] = ()):
+        """
+        Initialize the router
+
+        Args:
+            tiers: Complexity level -> models, primary first then its fallbacks
+            classifier: Complexity classifier (heuristics only by default)
+            fallback_models: Models tried after a tier's own fallbacks
+        """
+        missing = [level for level in LEVELS if not tiers.get(level)]
+        if missing:
+            raise ValueError(f"Model tiers missing for: {missing}")
+        self.tiers = {level: tuple(tiers[level]) for level in LEVELS}
+        self.classifier = classifier or ComplexityClassifier()
+        self.fallback_models = tuple(fallback_models)
+        self._routes: Counter = Counter()
+        self._fallbacks: Counter = Counter()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config) -> 'ModelRouter':
+        """Create a router from a Config object"""
+        return cls(
+            tiers={
+                SIMPLE: config.routing_simple_models,
+                MEDIUM: config.routing_medium_models,
+                COMPLEX: config.routing_complex_models
+            },
+            classifier=ComplexityClassifier(
+                simple_threshold=config.routing_simple_threshold,
+                complex_threshold=config.routing_complex_threshold
+            ),
+            fallback_models=[config.default_model]
+        )
+
+    def chain(self, model_name: str) -> Tuple[str, ...]:
+        """Models to try for a call to model_name, starting with model_name itself"""
+        models = [model_name]
+        for tier in self.tiers.values():
+            if model_name in tier:
+                models.extend(tier[tier.index(model_name) + 1:])
+                break
+        models.extend(self.fallback_models)
+        return tuple(dict.fromkeys(models))
+
+    def route(self,
+              query: str,
+              context: Optional[str] = None,
+              analysis: Optional[QueryAnalysis] = None) -> RoutingDecision:
+        """
+        Classify a query and choose its model
+
+        Args:
+            query: User's query
+            context: Optional context sent with the query
+            analysis: Analysis of the query (looked up in the query cache if None)
+
+        Returns:
+            Routing decision
+        """
+        complexity = self.classifier.classify(query, context, analysis)
+        chain = self.chain(self.tiers[complexity.level][0])
+        decision = RoutingDecision(complexity, chain[0], chain[1:])
+        with self._lock:
+            self._routes[(complexity.level, decision.model)] += 1
+        increment(MODEL_ROUTES, complexity=complexity.level, model=decision.model)
+        logger.debug("Routed %s query (score %.2f, signals %s) to %s",
+                     complexity.level, complexity.score, complexity.signals, decision.model)
+        return decision
+
+    def record_fallback(self, failed_model: str, next_model: str, error: BaseException):
+        """Log and count a fallback from one model to the next"""
+        with self._lock:
+            self._fallbacks[(failed_model, next_model)] += 1
+        increment(MODEL_FALLBACKS, from_model=failed_model, to_model=next_model)
+        # While a circuit stays open every call falls back; only the first failure is news
+        level = logging.DEBUG if isinstance(error, CircuitOpenError) else logging.WARNING
+        logger.log(level, "Model %s failed (%s); falling back to %s", failed_model, error, next_model)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Routing and fallback counts"""
+        with self._lock:
+            return {
+                "routes": [{"complexity": level, "model": model, "count": count}
+                           for (level, model), count in self._routes.items()],
+                "fallbacks": [{"from": failed, "to": fallback, "count": count}
+                              for (failed, fallback), count in self._fallbacks.items()]
+            }
@@ -2,31 +2,44 @@
 Output Formatter for Vantage AI PersonaPilot
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterable, Iterator, List, Optional
 import json
 import logging
+import threading
+from .render_plan import ObjectPlan, compile_schema, get_target, render_with_plan
+from .stream_render import IncrementalJsonParser, StreamEvent, StreamingRenderer
 
 logger = logging.getLogger(__name__)
 
 class OutputFormatter:
-    """Format and structure AI responses for different personas"""
+    """Format and structure AI responses for different personas
     
-    def __init__(self):
+    Persona-specific formats are generated from each persona's
+    get_output_format() schema: the schema is compiled once into a render plan
+    and cached, so new personas are formatted correctly without code changes.
+    """
+    
+    def __init__(self, registry=None):
+        """
+        Initialize the formatter
+        
+        Args:
+            registry: Optional PersonaRegistry used to resolve persona names to schemas
+        """
+        self.registry = registry
         self.formatters = {
             "json": self._format_json,
             "markdown": self._format_markdown,
-            "structured_list": self._format_structured_list,
-            "itinerary": self._format_itinerary,
-            "technical_guide": self._format_technical_guide,
-            "business_plan": self._format_business_plan,
-            "story_outline": self._format_story_outline,
-            "business_strategy": self._format_business_strategy
+            "structured_list": self._format_structured_list
         }
+        self._plans: Dict[str, ObjectPlan] = {}
+        self._plans_lock = threading.Lock()
     
     def format_response(self, 
                        response_data: Any, 
                        format_type: str = "structured_list",
-                       persona_name: str = "default") -> str:
+                       persona_name: str = "default",
+                       target: str = "markdown") -> str:
         """
         Format response based on specified format type
         
@@ -34,18 +47,145 @@ class OutputFormatter:
             response_data: Raw response data
             format_type: Desired output format
             persona_name: Name of the persona for context
+            target: Render target for schema-driven formats (markdown, plain, html, ansi)
             
         Returns:
             Formatted response string
         """
-        formatter = self.formatters.get(format_type, self._format_default)
+        formatter = self.formatters.get(format_type)
         
         try:
-            return formatter(response_data, persona_name)
+            if formatter is not None:
+                return formatter(response_data, persona_name)
+            # Persona formats (itinerary, technical_guide, ...) come from the persona's schema
+            persona = self._lookup_persona(persona_name)
+            if persona is not None:
+                return self.format_for_persona(response_data, persona, target=target)
+            return self.render(response_data, target=target)
         except Exception as e:
-            logger.error(f"Error formatting response: {e}")
+            logger.error("Error formatting response: %s", e)
             return self._format_default(response_data, persona_name)
     
+    def format_for_persona(self, 
+                           response_data: Any, 
+                           persona, 
+                           target: str = "markdown",
+                           schema: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Format a response using the render plan compiled from a persona's schema
+        
+        Args:
+            response_data: Parsed response
+            persona: Persona whose output format describes the response
+            target: Render target (markdown, plain, html, ansi)
+            schema: Output format actually requested, if it differs per query
+            
+        Returns:
+            Formatted response string
+        """
+        if isinstance(response_data, dict) and isinstance(response_data.get("response"), dict):
+            response_data = response_data["response"]
+        plan = self.get_plan(schema if schema is not None else persona.get_output_format())
+        return render_with_plan(response_data, plan, get_target(target))
+    
+    def stream_events(self, 
+                      events: Iterable[StreamEvent], 
+                      persona=None,
+                      target: str = "markdown",
+                      schema: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """
+        Render structured events incrementally
+        
+        Args:
+            events: FieldStarted / ListItemCompleted / FieldCompleted events
+            persona: Persona whose schema drives the rendering (None renders generically)
+            target: Render target (markdown, plain, html, ansi)
+            schema: Output format actually requested, if it differs per query
+            
+        Returns:
+            Iterator of rendered text fragments, in arrival order
+        """
+        if schema is None and persona is not None:
+            schema = persona.get_output_format()
+        plan = self.get_plan(schema) if schema is not None else None
+        return StreamingRenderer(plan, get_target(target)).render_events(events)
+    
+    def stream_text(self, 
+                    chunks: Iterable[str], 
+                    persona=None,
+                    target: str = "markdown",
+                    schema: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """
+        Render a streamed JSON response as its sections complete
+        
+        Whatever could not be parsed (a response cut off mid-value, or text
+        that is not a JSON object) is shown as plain text at the end.
+        
+        Args:
+            chunks: Text chunks of a JSON response (e.g. from AIClient.generate_content_stream)
+            persona: Persona whose schema drives the rendering
+            target: Render target (markdown, plain, html, ansi)
+            schema: Output format actually requested, if it differs per query
+            
+        Returns:
+            Iterator of rendered text fragments
+        """
+        parser = IncrementalJsonParser()
+        
+        def events() -> Iterator[StreamEvent]:
+            for chunk in chunks:
+                yield from parser.feed(chunk)
+            yield from parser.close()
+        
+        rendered = False
+        for fragment in self.stream_events(events(), persona, target, schema):
+            rendered = True
+            yield fragment
+        if parser.complete:
+            return
+        if parser.error:
+            logger.warning("Streamed response is not valid JSON (%s); showing the rest as text", parser.error)
+        else:
+            logger.warning("Streamed response ended before the JSON object was complete")
+        raw = parser.pending_text().strip()
+        if raw:
+            text = get_target(target).text(raw, 0)
+            yield f"\n{text}" if rendered else text
+    
+    def get_plan(self, schema: Dict[str, Any]) -> ObjectPlan:
+        """Get the compiled render plan for a schema, compiling it on first use"""
+        key = json.dumps(schema, sort_keys=True)
+        plan = self._plans.get(key)
+        if plan is None:
+            with self._plans_lock:
+                plan = self._plans.get(key)
+                if plan is None:
+                    plan = compile_schema(schema)
+                    self._plans[key] = plan
+        return plan
+    
+    def _lookup_persona(self, persona_name: str):
+        """Resolve a persona name through the registry, if one is configured"""
+        if self.registry is None or persona_name not in self.registry:
+            return None
+        return self.registry.get(persona_name)
+    
+    def render(self, data: Any, target: str = "markdown") -> str:
+        """
+        Render a response of any nesting depth without a schema
+        
+        The response is walked once and lines are collected in a list that is
+        joined at the end, so the cost is linear in the size of the output.
+        
+        Args:
+            data: Response data (typically the parsed JSON dictionary)
+            target: Render target (markdown, plain, html, ansi)
+            
+        Returns:
+            Rendered text
+        """
+        return render_with_plan(data, None, get_target(target))
+    
     def _format_json(self, data: Any, persona_name: str) -> str:
         """Format as JSON"""
         if isinstance(data, str):
@@ -76,206 +216,6 @@ class OutputFormatter:
         else:
             return str(data)
     
-    def _format_itinerary(self, data: Any, persona_name: str) -> str:
-        """Format travel itinerary"""
-        if not isinstance(data, dict):
-            return str(data)
-        
-        output = []
-        
-        # Header
-        if "destination" in data:
-            output.append(f"🗺️ **Destination**: {data['destination']}")
-        if "total_budget" in data:
-            output.append(f"💰 **Total Budget**: {data['total_budget']}")
-        if "duration" in data:
-            output.append(f"⏱️ **Duration**: {data['duration']}")
-        
-        # Itinerary
-        if "itinerary" in data:
-            output.append("\n📅 **Daily Itinerary**:")
-            for day in data["itinerary"]:
-                output.append(f"\n**Day {day.get('day', '')}**:")
-                
-                # Activities
-                if "activities" in day:
-                    for activity in day["activities"]:
-                        time = activity.get("time", "")
-                        action = activity.get("activity", "")
-                        cost = activity.get("cost", "")
-                        location = activity.get("location", "")
-                        
-                        activity_line = f"  {time}: {action}"
-                        if cost:
-                            activity_line += f" (💰 {cost})"
-                        if location:
-                            activity_line += f" @ {location}"
-                        output.append(activity_line)
-                
-                # Accommodation
-                if "accommodation" in day:
-                    acc = day["accommodation"]
-                    output.append(f"  🏨 **Accommodation**: {acc.get('name', '')} (💰 {acc.get('cost', '')})")
-                
-                # Transportation
-                if "transportation" in day:
-                    trans = day["transportation"]
-                    output.append(f"  🚗 **Transport**: {trans.get('method', '')} (💰 {trans.get('cost', '')})")
-        
-        # Budget breakdown
-        if "budget_breakdown" in data:
-            output.append("\n💳 **Budget Breakdown**:")
-            for category, amount in data["budget_breakdown"].items():
-                output.append(f"  {category.title()}: {amount}")
-        
-        # Tips
-        if "money_saving_tips" in data:
-            output.append("\n💡 **Money-Saving Tips**:")
-            for tip in data["money_saving_tips"]:
-                output.append(f"  • {tip}")
-        
-        return "\n".join(output)
-    
-    def _format_technical_guide(self, data: Any, persona_name: str) -> str:
-        """Format technical guide"""
-        if not isinstance(data, dict):
-            return str(data)
-        
-        output = []
-        
-        # Problem analysis
-        if "problem_analysis" in data:
-            output.append(f"🔍 **Problem Analysis**: {data['problem_analysis']}")
-        
-        # Solution overview
-        if "solution_overview" in data:
-            output.append(f"💡 **Solution Overview**: {data['solution_overview']}")
-        
-        # Implementation steps
-        if "implementation" in data:
-            output.append("\n⚙️ **Implementation Steps**:")
-            for step in data["implementation"]:
-                output.append(f"\n**Step {step.get('step', '')}**: {step.get('description', '')}")
-                
-                if "code_example" in step:
-                    output.append(f"```\n{step['code_example']}\n```")
-                
-                if "explanation" in step:
-                    output.append(f"*Why*: {step['explanation']}")
-                
-                if "considerations" in step:
-                    output.append("**Considerations**:")
-                    for consideration in step["considerations"]:
-                        output.append(f"  • {consideration}")
-        
-        # Code examples
-        if "code_examples" in data:
-            output.append("\n💻 **Code Examples**:")
-            for example in data["code_examples"]:
-                output.append(f"\n**{example.get('language', '')}** ({example.get('filename', '')}):")
-                output.append(f"```{example.get('language', '')}\n{example.get('code', '')}\n```")
-                if "usage" in example:
-                    output.append(f"*Usage*: {example['usage']}")
-        
-        return "\n".join(output)
-    
-    def _format_business_plan(self, data: Any, persona_name: str) -> str:
-        """Format business plan"""
-        if not isinstance(data, dict):
-            return str(data)
-        
-        output = []
-        
-        # Market analysis
-        if "market_analysis" in data:
-            output.append("📊 **Market Analysis**:")
-            for key, value in data["market_analysis"].items():
-                output.append(f"  **{key.replace('_', ' ').title()}**: {value}")
-        
-        # Strategy
-        if "strategy" in data:
-            output.append("\n🎯 **Strategy**:")
-            for key, value in data["strategy"].items():
-                output.append(f"  **{key.replace('_', ' ').title()}**: {value}")
-        
-        # Execution plan
-        if "execution_plan" in data:
-            output.append("\n📋 **Execution Plan**:")
-            for phase in data["execution_plan"]:
-                output.append(f"\n**{phase.get('phase', '')}** ({phase.get('timeline', '')}):")
-                if "objectives" in phase:
-                    output.append("  **Objectives**:")
-                    for obj in phase["objectives"]:
-                        output.append(f"    • {obj}")
-                if "actions" in phase:
-                    output.append("  **Actions**:")
-                    for action in phase["actions"]:
-                        output.append(f"    • {action}")
-        
-        return "\n".join(output)
-    
-    def _format_story_outline(self, data: Any, persona_name: str) -> str:
-        """Format story outline"""
-        if not isinstance(data, dict):
-            return str(data)
-        
-        output = []
-        
-        # Story concept
-        if "story_concept" in data:
-            output.append("📖 **Story Concept**:")
-            for key, value in data["story_concept"].items():
-                if isinstance(value, list):
-                    output.append(f"  **{key.replace('_', ' ').title()}**: {', '.join(value)}")
-                else:
-                    output.append(f"  **{key.replace('_', ' ').title()}**: {value}")
-        
-        # World building
-        if "world_building" in data:
-            output.append("\n🌍 **World Building**:")
-            for key, value in data["world_building"].items():
-                output.append(f"  **{key.replace('_', ' ').title()}**: {value}")
-        
-        # Characters
-        if "characters" in data:
-            output.append("\n👥 **Characters**:")
-            for char in data["characters"]:
-                output.append(f"\n**{char.get('name', '')}** ({char.get('role', '')}):")
-                output.append(f"  Background: {char.get('background', '')}")
-                output.append(f"  Motivation: {char.get('motivation', '')}")
-                output.append(f"  Arc: {char.get('arc', '')}")
-        
-        return "\n".join(output)
-    
-    def _format_business_strategy(self, data: Any, persona_name: str) -> str:
-        """Format business strategy"""
-        if not isinstance(data, dict):
-            return str(data)
-        
-        output = []
-        
-        # Strategic overview
-        if "strategic_overview" in data:
-            output.append("🎯 **Strategic Overview**:")
-            for key, value in data["strategic_overview"].items():
-                output.append(f"  **{key.replace('_', ' ').title()}**: {value}")
-        
-        # Action plan
-        if "action_plan" in data:
-            output.append("\n📋 **Action Plan**:")
-            for phase in data["action_plan"]:
-                output.append(f"\n**{phase.get('phase', '')}** ({phase.get('timeline', '')}):")
-                if "objectives" in phase:
-                    output.append("  **Objectives**:")
-                    for obj in phase["objectives"]:
-                        output.append(f"    • {obj}")
-                if "actions" in phase:
-                    output.append("  **Actions**:")
-                    for action in phase["actions"]:
-                        output.append(f"    • {action}")
-        
-        return "\n".join(output)
-    
     def _format_dict_as_list(self, data: Dict[str, Any]) -> str:
         """Format dictionary as structured list"""
         output = []
@@ -2,61 +2,86 @@
 Persona Manager for Vantage AI PersonaPilot
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional
+from concurrent.futures import ThreadPoolExecutor
 import logging
 from .ai_client import AIClient
-from src.personas import (
-    CollegeStudent, BudgetTraveler, Developer, 
-    StartupFounder, SciFiWriter, Businessman
-)
+from .session_store import SessionStore
+from .output_formatter import OutputFormatter
+from .process_pool import ProcessWorkerPool
+from .query_analysis import analyze_query
+from .usage import attributed, usage_context
+from src.personas.persona_state import PersonaState
+from src.personas.registry import PersonaRegistry
+from src.utils.metrics import span
+from src.utils.profiling import profiled, profiled_batch
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_SESSION_ID = "default"
+
 class PersonaManager:
-    """Manages persona selection and interactions"""
+    """Manages persona selection and interactions
+    
+    Persona instances are shared read-only definitions. Per-user context lives in
+    PersonaState objects held in a session store, so one manager can serve many
+    concurrent sessions from multiple threads. With a worker pool, formatting
+    of structured responses runs on worker processes instead of holding the GIL.
+    """
     
-    def __init__(self, ai_client: AIClient):
+    def __init__(self, 
+                 ai_client: AIClient, 
+                 session_store: Optional[SessionStore] = None,
+                 registry: Optional[PersonaRegistry] = None,
+                 worker_pool: Optional[ProcessWorkerPool] = None,
+                 max_context: int = 10):
         self.ai_client = ai_client
-        self.personas = {}
+        self.worker_pool = worker_pool
+        # Context entries each PersonaState remembers
+        self.max_context = max_context
+        # Personas are discovered up front but only instantiated on first use
+        self.registry = registry if registry is not None else PersonaRegistry()
         self.active_persona = None
-        self._initialize_personas()
-    
-    def _initialize_personas(self):
-        """Initialize all available personas"""
-        persona_classes = [
-            CollegeStudent,
-            BudgetTraveler,
-            Developer,
-            StartupFounder,
-            SciFiWriter,
-            Businessman
-        ]
-        
-        for persona_class in persona_classes:
-            persona = persona_class()
-            self.personas[persona.name] = persona
-            logger.info(f"Initialized persona: {persona.name}")
+        # session id -> {persona name -> PersonaState}
+        self.sessions = session_store if session_store is not None else SessionStore()
+        self.output_formatter = OutputFormatter(registry=self.registry)
     
     def list_personas(self) -> List[str]:
         """Get list of available persona names"""
-        return list(self.personas.keys())
+        return self.registry.names()
     
     def get_persona(self, persona_name: str):
         """Get a specific persona by name"""
-        if persona_name not in self.personas:
+        try:
+            return self.registry.get(persona_name)
+        except KeyError:
             raise ValueError(f"Persona '{persona_name}' not found. Available: {self.list_personas()}")
-        return self.personas[persona_name]
     
     def set_active_persona(self, persona_name: str):
         """Set the active persona for the session"""
         self.active_persona = self.get_persona(persona_name)
-        logger.info(f"Active persona set to: {persona_name}")
+        logger.debug("Active persona set to: %s", persona_name)
+    
+    def get_session_state(self, persona_name: str, session_id: str = DEFAULT_SESSION_ID) -> PersonaState:
+        """Get (or create) the state of a persona within a session"""
+        persona = self.get_persona(persona_name)
+        session = self.sessions.get_or_create(session_id, dict)
+        state = session.get(persona_name)
+        if state is None:
+            # setdefault keeps the first state if two requests race to create it
+            state = session.setdefault(persona_name, persona.create_state(self.max_context))
+        return state
+    
+    def end_session(self, session_id: str):
+        """Discard all persona state for a session"""
+        self.sessions.pop(session_id)
     
     def get_response(self, 
                     persona_name: str, 
                     query: str, 
                     context: Optional[str] = None,
-                    output_format: str = "structured") -> str:
+                    output_format: str = "structured",
+                    session_id: str = DEFAULT_SESSION_ID) -> str:
         """
         Get a response from a specific persona
         
@@ -67,108 +92,150 @@ class PersonaManager:
             query: User's query (user prompt)
             context: Optional context information
             output_format: Desired output format
+            session_id: Session whose persona state (context memory) is used
             
         Returns:
             Persona's response
         """
-        # This method handles both system prompts (from persona) and user prompts (query)
-        persona = self.get_persona(persona_name)
-        
-        # Add context to persona's memory
-        if context:
-            persona.add_context(context)
-        
-        # Format the prompt for this persona
-        prompt = persona.format_prompt(query, context)
-        
-        try:
-            if output_format == "structured":
-                # Get structured response
-                response = self.ai_client.generate_structured_response(
-                    prompt, 
-                    output_format="json"
-                )
-                return self._format_structured_response(response, persona)
-            elif output_format == "raw":
-                # Get raw structured response without formatting
-                return self.ai_client.generate_structured_response(
-                    prompt, 
-                    output_format="json"
-                )
-            else:
-                # Get plain text response
-                return self.ai_client.generate_content(prompt)
-                
-        except Exception as e:
-            logger.error(f"Error getting response from {persona_name}: {e}")
-            return f"Sorry, I encountered an error while processing your request: {str(e)}"
-    
-    def _format_structured_response(self, response: Dict[str, Any], persona) -> str:
-        """Format structured response for better readability"""
-        try:
-            if "response" in response and isinstance(response["response"], dict):
-                data = response["response"]
-            else:
-                data = response
+        with profiled(persona_name), span("get_response", persona=persona_name), \
+                usage_context(persona_name, session_id):
+            # This method handles both system prompts (from persona) and user prompts (query)
+            persona = self.get_persona(persona_name)
+            state = self.get_session_state(persona_name, session_id)
+            # Tokens and embedding of the query, shared by recall and routing
+            analysis = analyze_query(query)
+            
+            # Add context to this session's memory
+            if context:
+                state.add_context(context)
             
-            # Format based on persona's output preferences
-            if persona.output_preferences.get("format") == "structured_list":
-                return self._format_as_list(data)
-            else:
-                return self._format_as_text(data)
+            # Format the prompt for this persona; for structured output the AI client
+            # supplies the output structure (as a response schema where supported)
+            structured = output_format in ("structured", "raw")
+            with span("prompt_build", persona=persona_name):
+                prompt = persona.format_prompt(query, context, state, include_format_instructions=not structured,
+                                               analysis=analysis)
+            
+            # Simple queries go to a cheaper, faster model when routing is configured
+            decision = self.ai_client.route(query, context, analysis)
+            model_name = decision.model if decision is not None else None
+            
+            try:
+                if output_format == "structured":
+                    # Get structured response
+                    schema = persona.get_output_format_for_query(query, state)
+                    response, reply = self.ai_client.generate_structured_reply(
+                        prompt, 
+                        output_format="json",
+                        model_name=model_name,
+                        schema=schema
+                    )
+                    with span("format", persona=persona_name):
+                        return self._format_structured_response(response, persona, schema, len(reply))
+                elif output_format == "raw":
+                    # Get raw structured response without formatting
+                    return self.ai_client.generate_structured_response(
+                        prompt, 
+                        output_format="json",
+                        model_name=model_name,
+                        schema=persona.get_output_format_for_query(query, state)
+                    )
+                else:
+                    # Get plain text response
+                    return self.ai_client.generate_content(prompt, model_name)
                 
-        except Exception as e:
-            logger.warning(f"Error formatting structured response: {e}")
-            return str(response)
+            except Exception as e:
+                logger.error("Error getting response from %s: %s", persona_name, e)
+                return f"Sorry, I encountered an error while processing your request: {str(e)}"
     
-    def _format_as_list(self, data: Dict[str, Any]) -> str:
-        """Format response as a structured list"""
-        output = []
-        
-        if "summary" in data:
-            output.append(f"📋 **Summary**: {data['summary']}")
+    def get_batch_responses(self, 
+                            requests: List[Dict[str, Any]], 
+                            max_workers: int = 8) -> List[Any]:
+        """
+        Get responses for a batch of queries concurrently
         
-        if "action_items" in data:
-            output.append("\n🎯 **Action Items**:")
-            for item in data["action_items"]:
-                step = f"  {item.get('step', '•')}. {item.get('action', '')}"
-                if item.get('time_required'):
-                    step += f" (⏱️ {item['time_required']})"
-                if item.get('cost'):
-                    step += f" (💰 {item['cost']})"
-                output.append(step)
-                
-                if item.get('resources'):
-                    resources = ", ".join(item['resources'])
-                    output.append(f"    📚 Resources: {resources}")
+        Args:
+            requests: Keyword arguments for get_response, one dictionary per query
+            max_workers: Maximum number of queries processed at once
+            
+        Returns:
+            Responses in the same order as the requests
+        """
+        if not requests:
+            return []
+        with profiled_batch(f"batch-{len(requests)}") as batch, \
+                ThreadPoolExecutor(max_workers=min(max_workers, len(requests)),
+                                   thread_name_prefix="persona-batch") as executor:
+            return list(executor.map(batch.wrap(lambda request: self.get_response(**request)), requests))
+    
+    def stream_response(self, 
+                        persona_name: str, 
+                        query: str, 
+                        context: Optional[str] = None,
+                        session_id: str = DEFAULT_SESSION_ID,
+                        target: str = "markdown") -> Iterator[str]:
+        """
+        Stream a formatted response from a specific persona
         
-        if "timeline" in data:
-            output.append(f"\n📅 **Timeline**: {data['timeline']}")
+        The model response is streamed and parsed incrementally, so the first
+        sections are rendered while the rest is still being generated.
         
-        if "tips" in data:
-            output.append("\n💡 **Tips**:")
-            for tip in data["tips"]:
-                output.append(f"  • {tip}")
+        Args:
+            persona_name: Name of the persona to use
+            query: User's query (user prompt)
+            context: Optional context information
+            session_id: Session whose persona state (context memory) is used
+            target: Render target (markdown, plain, html, ansi)
+            
+        Returns:
+            Iterator of rendered text fragments
+        """
+        persona = self.get_persona(persona_name)
+        state = self.get_session_state(persona_name, session_id)
         
-        if "next_steps" in data:
-            output.append(f"\n🚀 **Next Steps**: {data['next_steps']}")
+        if context:
+            state.add_context(context)
         
-        return "\n".join(output)
+        analysis = analyze_query(query)
+        prompt = persona.format_prompt(query, context, state, include_format_instructions=False, analysis=analysis)
+        schema = persona.get_output_format_for_query(query, state)
+        decision = self.ai_client.route(query, context, analysis)
+        chunks = self.ai_client.generate_content_stream(
+            prompt, decision.model if decision is not None else None, schema=schema
+        )
+        fragments = self.output_formatter.stream_text(chunks, persona, target=target, schema=schema)
+        # The stream runs lazily, wherever it is consumed
+        return attributed(fragments, persona_name, session_id)
     
-    def _format_as_text(self, data: Dict[str, Any]) -> str:
-        """Format response as plain text"""
-        if isinstance(data, str):
-            return data
-        
-        # Convert dict to readable text
-        output = []
-        for key, value in data.items():
-            if isinstance(value, list):
-                output.append(f"{key.title()}: {', '.join(map(str, value))}")
-            else:
-                output.append(f"{key.title()}: {value}")
+    def _format_structured_response(self, 
+                                    response: Dict[str, Any], 
+                                    persona,
+                                    schema: Optional[Dict[str, Any]] = None,
+                                    reply_chars: int = 0) -> str:
+        """Format structured response for better readability (reply_chars: length of the model reply)"""
+        try:
+            if self.worker_pool is not None:
+                formatted = self.worker_pool.format_for_persona(persona.name, response, reply_chars, schema)
+                if formatted is not None:
+                    return formatted
+            return self.output_formatter.format_for_persona(response, persona, schema=schema)
+        except Exception as e:
+            logger.warning("Error formatting structured response: %s", e)
+            return str(response)
+    
+    def get_usage(self, dimension: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get token and cost totals
         
-        return "\n".join(output)
+        Args:
+            dimension: persona, session or model (all dimensions if None)
+            
+        Returns:
+            Totals keyed by name (and by dimension when none is given)
+        """
+        if dimension is None:
+            return self.ai_client.usage.snapshot()
+        return self.ai_client.usage.totals(dimension)
     
     def get_persona_info(self, persona_name: str) -> Dict[str, Any]:
         """Get detailed information about a persona"""
@@ -182,8 +249,39 @@ class PersonaManager:
                             description: str,
                             personality_traits: List[str],
                             expertise_areas: List[str],
-                            communication_style: str) -> str:
-        """Create a custom persona (placeholder for future implementation)"""
-        # This would be implemented to allow users to create custom personas
-        logger.info(f"Custom persona creation requested: {name}")
-        return f"Custom persona '{name}' creation feature coming soon!"
+                            communication_style: str,
+                            system_prompt: Optional[str] = None,
+                            output_format: Optional[Dict[str, Any]] = None,
+                            example_queries: Optional[List[str]] = None,
+                            persist: bool = False) -> str:
+        """
+        Create a custom persona and make it available immediately
+        
+        Args:
+            name: Persona name
+            description: Short description of the persona
+            personality_traits: Personality traits
+            expertise_areas: Areas of expertise
+            communication_style: How the persona communicates
+            system_prompt: Optional explicit system prompt (built from the fields otherwise)
+            output_format: Optional JSON output structure (generic list format otherwise)
+            example_queries: Optional example queries
+            persist: Save the definition to the registry's data directory
+            
+        Returns:
+            Confirmation message
+        """
+        definition = {
+            "name": name,
+            "description": description,
+            "personality_traits": personality_traits,
+            "expertise_areas": expertise_areas,
+            "communication_style": communication_style,
+            "output_preferences": {"format": "structured_list"},
+            "system_prompt": system_prompt,
+            "output_format": output_format,
+            "example_queries": example_queries or []
+        }
+        self.registry.register_definition(definition, persist=persist)
+        logger.info("Custom persona created: %s", name)
+        return f"Custom persona '{name}' created successfully!"
@@ -0,0 +1,280 @@
+"""
+Process worker pool for CPU-bound pipeline stages of Vantage AI PersonaPilot
+
+Requests run on threads, so model calls (network I/O) overlap freely, but
+pure-Python CPU work such as repairing JSON, formatting responses and
+keyword retrieval holds the GIL and runs one request at a time. With a
+ProcessWorkerPool those stages move to worker processes. The request thread
+waits on the result without holding the GIL, so one API process can keep
+every core busy.
+
+Workers are pre-warmed: each one loads the persona registry (instantiating
+every persona) in its initializer, and start() waits until all of them are
+up. The RAG index is only opened by a worker when it first runs a retrieval
+task (the request pipeline itself does not retrieve). Before the first
+retrieval is offloaded, the index is brought up to date once in the parent,
+so workers only memory-map the full-precision vectors (shared through the
+page cache) and load the compressed codes. Replies that are valid JSON are
+parsed in the calling process, and shorter replies are also repaired (below
+min_offload_chars) and formatted (below FORMAT_OFFLOAD_FACTOR times that)
+there, where that is cheaper than a round trip to a worker
+(bench_pipeline.py --offload-sizes measures the crossover).
+
+Workers are started with forkserver (spawn where that is unavailable).
+Forking a process that already runs threads can deadlock the child.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+from concurrent.futures import Future
+import logging
+import os
+import signal
+import threading
+import time
+
+from .json_repair import ParsedResponse, parse_json_response, parse_valid_json
+from .rag_system import RAGSystem
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Reply length from which repairing JSON on a worker costs no more than in the
+# calling process (measured with bench_pipeline.py --offload-sizes)
+DEFAULT_MIN_OFFLOAD_CHARS = 16384
+
+# Formatting does about a tenth of the work of repair per reply character, so
+# it only breaks even with the round trip on replies this many times longer
+FORMAT_OFFLOAD_FACTOR = 8
+
+# State of the current worker process (set by _init_worker)
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(persona_data_dir: Optional[str],
+                 vector_db_path: Optional[str],
+                 rag_settings: Dict[str, Any]):
+    """Load everything the worker tasks need, once per worker process"""
+    from src.core.output_formatter import OutputFormatter
+    from src.personas.registry import PersonaRegistry
+
+    # Ctrl-C is handled by the parent, which shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    registry = PersonaRegistry(data_dir=persona_data_dir)
+    for name in registry.names():
+        try:
+            registry.get(name)
+        except Exception as e:
+            logger.warning("Worker could not load persona %s: %s", name, e)
+    _worker["registry"] = registry
+    _worker["formatter"] = OutputFormatter(registry=registry)
+    _worker["rag_args"] = (vector_db_path, rag_settings)
+
+
+def _rag() -> RAGSystem:
+    """The worker's RAG system, opened on the first retrieval task"""
+    rag = _worker.get("rag")
+    if rag is None:
+        vector_db_path, rag_settings = _worker["rag_args"]
+        rag = _worker["rag"] = RAGSystem(vector_db_path=vector_db_path, **rag_settings)
+    return rag
+
+
+def _warm(delay: float) -> int:
+    # Held briefly so that each warm-up task lands on a different worker
+    time.sleep(delay)
+    return os.getpid()
+
+
+def _parse_json(text: str, schema: Optional[Dict[str, Any]]) -> ParsedResponse:
+    return parse_json_response(text, schema)
+
+
+def _format_for_persona(persona_name: str, response: Any, schema: Optional[Dict[str, Any]]) -> Optional[str]:
+    try:
+        persona = _worker["registry"].get(persona_name)
+    except KeyError:
+        # Registered in the parent only (e.g. a custom persona that was not persisted)
+        return None
+    return _worker["formatter"].format_for_persona(response, persona, schema=schema)
+
+
+def _retrieve(query: str, top_k: int) -> List[Dict[str, Any]]:
+    return _rag().retrieve_relevant_documents(query, top_k)
+
+
+def _get_context(query: str, max_length: int) -> Optional[str]:
+    return _rag().get_context_for_query(query, max_length)
+
+
+def default_start_method() -> str:
+    """forkserver where available (POSIX), spawn otherwise"""
+    import multiprocessing
+    methods = multiprocessing.get_all_start_methods()
+    return "forkserver" if "forkserver" in methods else "spawn"
+
+
+class ProcessWorkerPool:
+    """Pre-warmed worker processes running the CPU-bound stages of the pipeline"""
+
+    def __init__(self,
+                 workers: Optional[int] = None,
+                 persona_data_dir: Optional[str] = None,
+                 vector_db_path: Optional[str] = None,
+                 min_offload_chars: int = DEFAULT_MIN_OFFLOAD_CHARS,
+                 start_method: Optional[str] = None,
+                 rag_settings: Optional[Dict[str, Any]] = None):
+        """
+        Initialize the pool (workers are started by start())
+
+        Args:
+            workers: Worker processes (defaults to the number of CPUs)
+            persona_data_dir: Persona definition directory loaded by each worker
+            vector_db_path: RAG index opened by workers on their first retrieval task
+            min_offload_chars: Shorter replies are repaired in the calling process
+            start_method: multiprocessing start method (forkserver or spawn by default)
+            rag_settings: RAGSystem keyword arguments (vector search settings)
+        """
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.persona_data_dir = persona_data_dir
+        self.vector_db_path = vector_db_path
+        self.min_offload_chars = min_offload_chars
+        self.start_method = start_method or default_start_method()
+        self.rag_settings = dict(rag_settings or {})
+        self.worker_pids: List[int] = []
+        self._executor = None
+        self._index_ready = False
+        self._lock = threading.Lock()
+        self._offloaded = 0
+        self._local = 0
+
+    @classmethod
+    def from_config(cls, config) -> 'ProcessWorkerPool':
+        """Create a pool from a Config object"""
+        return cls(
+            workers=config.cpu_workers if config.cpu_workers > 0 else None,
+            persona_data_dir=config.persona_data_dir,
+            vector_db_path=config.vector_db_path,
+            min_offload_chars=config.cpu_offload_min_chars,
+            rag_settings=RAGSystem.settings_from_config(config)
+        )
+
+    @property
+    def started(self) -> bool:
+        return self._executor is not None
+
+    def start(self, timeout: float = 60.0) -> 'ProcessWorkerPool':
+        """Start every worker and wait until they have loaded the personas"""
+        # Deferred: multiprocessing is only needed once the pool is used
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        with self._lock:
+            if self._executor is not None:
+                return self
+            started = time.perf_counter()
+            executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context(self.start_method),
+                initializer=_init_worker,
+                initargs=(self.persona_data_dir, self.vector_db_path, self.rag_settings)
+            )
+            warmups = [executor.submit(_warm, 0.05) for _ in range(self.workers)]
+            try:
+                self.worker_pids = sorted({future.result(timeout) for future in warmups})
+            except BaseException:
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+            self._executor = executor
+        logger.info("Started %s worker processes in %.2fs", len(self.worker_pids), time.perf_counter() - started)
+        return self
+
+    def submit(self, func: Callable[..., T], *args) -> "Future[T]":
+        """
+        Run a module-level function on a worker
+
+        Returns a concurrent.futures.Future; asyncio callers can await it
+        with asyncio.wrap_future.
+        """
+        if self._executor is None:
+            self.start()
+        with self._lock:
+            self._offloaded += 1
+        return self._executor.submit(func, *args)
+
+    def _run_locally(self):
+        with self._lock:
+            self._local += 1
+
+    def _prepare_index(self):
+        """Check that retrieval is available and build the vector index once, before any worker opens it"""
+        if not self.vector_db_path:
+            raise ValueError("Worker pool was created without a RAG index")
+        with self._lock:
+            if self._index_ready:
+                return
+            if self.rag_settings.get("vector_search"):
+                # Here rather than in every worker, which would race to build the same files
+                RAGSystem(vector_db_path=self.vector_db_path, **self.rag_settings)
+            self._index_ready = True
+
+    def parse_json_response(self, text: str, schema: Optional[Dict[str, Any]] = None) -> ParsedResponse:
+        """Parse and repair a model's JSON reply (same result as json_repair.parse_json_response)"""
+        # json.loads is fast enough that only the repair of a long reply is worth offloading
+        parsed = parse_valid_json(text, schema)
+        if parsed is None and len(text) >= self.min_offload_chars:
+            return self.submit(_parse_json, text, schema).result()
+        self._run_locally()
+        return parsed if parsed is not None else parse_json_response(text, schema)
+
+    def format_for_persona(self,
+                           persona_name: str,
+                           response: Any,
+                           reply_chars: int,
+                           schema: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """
+        Format a structured response for a persona on a worker
+
+        Args:
+            persona_name: Persona whose formatting applies
+            response: Parsed response
+            reply_chars: Length of the model reply it was parsed from, which
+                approximates the formatting work (and what is pickled)
+            schema: Output structure the response follows
+
+        Returns:
+            Formatted text, or None when the caller should format it itself
+            (a short reply, or a persona the workers do not know)
+        """
+        if reply_chars < self.min_offload_chars * FORMAT_OFFLOAD_FACTOR:
+            self._run_locally()
+            return None
+        return self.submit(_format_for_persona, persona_name, response, schema).result()
+
+    def retrieve(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """RAGSystem.retrieve_relevant_documents on a worker"""
+        self._prepare_index()
+        return self.submit(_retrieve, query, top_k).result()
+
+    def get_context(self, query: str, max_length: int = 1000) -> Optional[str]:
+        """RAGSystem.get_context_for_query on a worker"""
+        self._prepare_index()
+        return self.submit(_get_context, query, max_length).result()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Worker processes and how much work was offloaded"""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "worker_pids": list(self.worker_pids),
+                "start_method": self.start_method,
+                "offloaded": self._offloaded,
+                "local": self._local
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker processes"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self.worker_pids = []
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
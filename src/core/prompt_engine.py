@@ -77,10 +77,10 @@ class PromptEngine:
         # Format the prompt
         try:
             prompt = template.format(**variables)
-            logger.debug(f"Created {prompt_type} prompt")
+            logger.debug("Created %s prompt", prompt_type)
             return prompt
         except KeyError as e:
-            logger.error(f"Missing template variable: {e}")
+            logger.error("Missing template variable: %s", e)
             return self.prompt_templates["zero_shot"].format(**variables)
     
     def create_dynamic_prompt(self,
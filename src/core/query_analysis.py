@@ -0,0 +1,114 @@
+"""
+Shared query preprocessing for Vantage AI PersonaPilot
+
+Routing, context memory recall and retrieval all need the same things from
+a query: its normalized text, its tokens and its embedding. analyze_query()
+computes them once per distinct query string and keeps the result in an LRU
+cache. PersonaManager analyzes each query up front and passes the analysis
+down the pipeline; stages called on their own look the query up in the same
+cache, so a query is tokenized and embedded once however many stages see it.
+
+Analyses are shared between threads and requests and must be treated as
+read-only.
+"""
+
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+import functools
+
+from src.personas.context_memory import STOP_WORDS, embed_tokens, tokenize
+
+# Distinct query strings kept in the cache
+QUERY_CACHE_SIZE = 4096
+
+UNDETERMINED = "und"
+
+# Frequent function words per language, for telling Latin-script languages apart
+_LANGUAGE_WORDS: Dict[str, FrozenSet[str]] = {
+    "en": frozenset({"the", "and", "is", "are", "what", "how", "to", "of", "for", "with", "my",
+                     "i", "you", "can", "should", "do", "in", "on", "a", "it", "this", "that"}),
+    "es": frozenset({"el", "la", "los", "las", "de", "que", "y", "es", "en", "un", "una", "por",
+                     "para", "con", "como", "qué", "cómo", "mi", "puedo", "del"}),
+    "fr": frozenset({"le", "la", "les", "de", "des", "et", "est", "un", "une", "pour", "avec",
+                     "que", "qui", "comment", "je", "mon", "ma", "dans", "du", "vous"}),
+    "de": frozenset({"der", "die", "das", "und", "ist", "ein", "eine", "für", "mit", "wie",
+                     "was", "ich", "mein", "nicht", "zu", "den", "dem", "kann", "auf"}),
+    "pt": frozenset({"o", "a", "os", "as", "de", "que", "e", "é", "um", "uma", "para", "com",
+                     "como", "meu", "minha", "em", "do", "da", "não", "posso"}),
+    "it": frozenset({"il", "lo", "la", "gli", "le", "di", "che", "e", "è", "un", "una", "per",
+                     "con", "come", "mio", "mia", "in", "del", "della", "non"}),
+}
+
+# (first code point, last code point, language) for scripts used by one main language
+_SCRIPT_RANGES = (
+    (0x3040, 0x30FF, "ja"),   # Hiragana, Katakana
+    (0xAC00, 0xD7AF, "ko"),   # Hangul syllables
+    (0x4E00, 0x9FFF, "zh"),   # CJK ideographs (after kana, which marks Japanese)
+    (0x0400, 0x04FF, "ru"),   # Cyrillic
+    (0x0600, 0x06FF, "ar"),   # Arabic
+    (0x0900, 0x097F, "hi"),   # Devanagari
+    (0x0370, 0x03FF, "el"),   # Greek
+)
+
+
+def detect_language(text: str, tokens: Tuple[str, ...]) -> str:
+    """
+    Guess the language of a query (ISO 639-1 code, "und" if unclear)
+
+    Non-Latin scripts decide directly; Latin-script text is scored by how
+    many of its tokens are frequent function words of each language.
+    """
+    if not text.isascii():
+        code_points = [ord(char) for char in text if ord(char) >= 0x0370]
+        for first, last, language in _SCRIPT_RANGES:
+            if any(first <= point <= last for point in code_points):
+                return language
+    best, best_hits = UNDETERMINED, 0
+    for language, words in _LANGUAGE_WORDS.items():
+        hits = sum(1 for token in tokens if token in words)
+        if hits > best_hits:
+            best, best_hits = language, hits
+    return best
+
+
+class QueryAnalysis:
+    """Normalized text, tokens, embedding and language of one query"""
+
+    __slots__ = ("query", "normalized", "tokens", "terms", "language", "_embedding")
+
+    def __init__(self, query: str):
+        self.query = query
+        # Lowercase with whitespace runs collapsed
+        self.normalized = " ".join(query.lower().split())
+        self.tokens: Tuple[str, ...] = tuple(tokenize(self.normalized))
+        # Distinct tokens that carry meaning, in query order
+        self.terms: Tuple[str, ...] = tuple(dict.fromkeys(
+            token for token in self.tokens if token not in STOP_WORDS
+        ))
+        self.language = detect_language(query, self.tokens)
+        self._embedding: Optional[Dict[int, float]] = None
+
+    @property
+    def embedding(self) -> Dict[int, float]:
+        """Hashed bag-of-words vector (as context_memory.embed_text), computed on first use"""
+        if self._embedding is None:
+            self._embedding = embed_tokens(self.tokens)
+        return self._embedding
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "normalized": self.normalized,
+            "tokens": list(self.tokens),
+            "terms": list(self.terms),
+            "language": self.language
+        }
+
+
+@functools.lru_cache(maxsize=QUERY_CACHE_SIZE)
+def analyze_query(query: str) -> QueryAnalysis:
+    """Analysis of a query, computed once per distinct query string"""
+    return QueryAnalysis(query)
+
+
+def query_cache_info():
+    """Hits, misses and size of the query analysis cache"""
+    return analyze_query.cache_info()
@@ -1,24 +1,83 @@
 """
 RAG (Retrieval-Augmented Generation) System for Vantage AI PersonaPilot
+
+Retrieval matches query terms against document text. With vector search
+enabled, documents are embedded with the shared embedding service and
+retrieved from a quantized VectorStore kept under the vector DB path;
+keyword matching remains the fallback when numpy is not installed.
+
+The index records the encoder that built it and a digest of the indexed
+document texts. When either no longer matches (another embedding model, or
+documents.json edited or replaced), the index is rebuilt on open.
 """
 
 from typing import List, Dict, Any, Optional
+import hashlib
 import logging
 import os
 import json
+import threading
+from src.utils.metrics import span
+from .embedding_service import HASHED, EmbeddingService, get_embedding_service
+from .query_analysis import QueryAnalysis, analyze_query
 
 logger = logging.getLogger(__name__)
 
+INDEX_DIR = "index"
+
+# Documents embedded per call while (re)building the index
+INDEX_BATCH_SIZE = 256
+
 class RAGSystem:
     """Retrieval-Augmented Generation system for enhanced responses"""
     
-    def __init__(self, vector_db_path: str = "data/vector_db"):
+    def __init__(self, 
+                 vector_db_path: str = "data/vector_db",
+                 vector_search: bool = False,
+                 quantization: str = "int8",
+                 pq_subvectors: int = 32,
+                 rescore_factor: int = 4,
+                 embedding_service: Optional[EmbeddingService] = None):
+        """
+        Initialize the RAG system
+        
+        Args:
+            vector_db_path: Directory of the document store and vector index
+            vector_search: Retrieve by embedding similarity (keyword matching otherwise)
+            quantization: Vector index compression (none, int8 or pq)
+            pq_subvectors: Bytes per vector with pq (must divide the embedding dimension)
+            rescore_factor: Candidates per result re-scored at full precision (0 disables)
+            embedding_service: Encoder for documents and queries (the process-wide service by default)
+        """
         self.vector_db_path = vector_db_path
         self.documents = []
-        self.embeddings = None
+        self.embeddings = embedding_service
         self.vector_index = None
+        self.vector_search = vector_search
+        self.quantization = quantization
+        self.pq_subvectors = pq_subvectors
+        self.rescore_factor = rescore_factor
+        self._index_lock = threading.Lock()
+        # Running digest of the texts of the indexed documents
+        self._index_digest = hashlib.sha256()
         self._initialize_system()
     
+    @classmethod
+    def from_config(cls, config, embedding_service: Optional[EmbeddingService] = None) -> 'RAGSystem':
+        """Create a RAG system from a Config object"""
+        return cls(vector_db_path=config.vector_db_path, embedding_service=embedding_service,
+                   **cls.settings_from_config(config))
+    
+    @staticmethod
+    def settings_from_config(config) -> Dict[str, Any]:
+        """Vector search settings of a Config object (RAGSystem keyword arguments)"""
+        return {
+            "vector_search": config.vector_search,
+            "quantization": config.vector_quantization,
+            "pq_subvectors": config.vector_pq_subvectors,
+            "rescore_factor": config.vector_rescore_factor
+        }
+    
     def _initialize_system(self):
         """Initialize the RAG system"""
         try:
@@ -28,9 +87,12 @@ class RAGSystem:
             # Load existing documents if available
             self._load_documents()
             
+            if self.vector_search:
+                self._open_vector_index()
+            
             logger.info("RAG system initialized successfully")
         except Exception as e:
-            logger.error(f"Error initializing RAG system: {e}")
+            logger.error("Error initializing RAG system: %s", e)
     
     def _load_documents(self):
         """Load documents from storage"""
@@ -39,38 +101,119 @@ class RAGSystem:
             try:
                 with open(documents_file, 'r', encoding='utf-8') as f:
                     self.documents = json.load(f)
-                logger.info(f"Loaded {len(self.documents)} documents")
+                logger.info("Loaded %s documents", len(self.documents))
             except Exception as e:
-                logger.error(f"Error loading documents: {e}")
+                logger.error("Error loading documents: %s", e)
                 self.documents = []
     
-    def add_document(self, content: str, metadata: Optional[Dict[str, Any]] = None):
-        """Add a document to the knowledge base"""
+    def _open_vector_index(self):
+        """Open the vector index, rebuilding it if it does not match the documents"""
+        from .vector_store import VectorStore
+        
+        try:
+            self.embeddings = self.embeddings or get_embedding_service()
+            index = VectorStore(
+                os.path.join(self.vector_db_path, INDEX_DIR),
+                self.embeddings.dimension,
+                quantization=self.quantization,
+                pq_subvectors=self.pq_subvectors,
+                rescore_factor=self.rescore_factor
+            )
+        except (ImportError, ValueError) as e:
+            logger.error("Vector search unavailable, using keyword retrieval: %s", e)
+            return
+        encoder = self._encoder_id()
+        indexed = len(index)
+        if indexed:
+            self._digest_documents(self.documents[:indexed])
+        if indexed and (indexed > len(self.documents)
+                        or index.info.get("encoder") != encoder
+                        or index.info.get("documents") != self._index_digest.hexdigest()):
+            logger.warning("Vector index does not match the documents or the embedding model; rebuilding it")
+            index.reset()
+            self._index_digest = hashlib.sha256()
+        index.info["encoder"] = encoder
+        self.vector_index = index
+        if self._index_new_documents():
+            index.save()
+    
+    def _encoder_id(self) -> str:
+        """Identifies the embedding model, so vectors from another model are never mixed in"""
+        encoder = self.embeddings.encoder
+        model = getattr(encoder, "model_name", None)
+        return f"{encoder.name}:{model}" if model else encoder.name
+    
+    def _digest_documents(self, documents: List[Dict[str, Any]]):
+        for doc in documents:
+            self._index_digest.update(doc["content"].encode("utf-8"))
+            self._index_digest.update(b"\0")
+    
+    def _embed(self, texts: List[str]) -> Any:
+        from .vector_store import to_dense
+        
+        dimension = self.embeddings.dimension
+        return [to_dense(vector, dimension) for vector in self.embeddings.embed_many(texts)]
+    
+    def _index_new_documents(self) -> int:
+        """Embed and index documents added since the last call; returns how many"""
+        if self.vector_index is None:
+            return 0
+        with self._index_lock:
+            start = len(self.vector_index)
+            if start >= len(self.documents):
+                return 0
+            if start == 0 and len(self.documents) > INDEX_BATCH_SIZE:
+                logger.info("Building vector index for %s documents", len(self.documents))
+            for offset in range(start, len(self.documents), INDEX_BATCH_SIZE):
+                batch = self.documents[offset:offset + INDEX_BATCH_SIZE]
+                self.vector_index.add(self._embed([doc["content"] for doc in batch]))
+                self._digest_documents(batch)
+            self.vector_index.info["documents"] = self._index_digest.hexdigest()
+            return len(self.documents) - start
+    
+    def add_document(self, content: str, metadata: Optional[Dict[str, Any]] = None, save: bool = True):
+        """
+        Add a document to the knowledge base
+
+        Args:
+            content: Document text
+            metadata: Optional metadata stored with the document
+            save: Write documents.json and the vector index now (bulk loaders save
+                once at the end, embedding the new documents in batches)
+        """
         document = {
             "id": len(self.documents),
             "content": content,
             "metadata": metadata or {}
         }
         self.documents.append(document)
-        self._save_documents()
-        logger.info(f"Added document {document['id']}")
+        if save:
+            self._save_documents()
+        logger.debug("Added document %s", document['id'])
     
     def _save_documents(self):
-        """Save documents to storage"""
+        """Save documents (and the vector index) to storage"""
         documents_file = os.path.join(self.vector_db_path, "documents.json")
         try:
             with open(documents_file, 'w', encoding='utf-8') as f:
                 json.dump(self.documents, f, indent=2, ensure_ascii=False)
+            if self.vector_index is not None:
+                self._index_new_documents()
+                self.vector_index.save()
         except Exception as e:
-            logger.error(f"Error saving documents: {e}")
+            logger.error("Error saving documents: %s", e)
     
-    def retrieve_relevant_documents(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+    def retrieve_relevant_documents(self, 
+                                    query: str, 
+                                    top_k: int = 5,
+                                    analysis: Optional[QueryAnalysis] = None) -> List[Dict[str, Any]]:
         """
         Retrieve relevant documents for a query
         
         Args:
             query: Search query
             top_k: Number of documents to retrieve
+            analysis: Analysis of the query (looked up in the query cache if None)
             
         Returns:
             List of relevant documents
@@ -78,36 +221,55 @@ class RAGSystem:
         if not self.documents:
             return []
         
-        # Simple keyword-based retrieval (placeholder for vector search)
-        relevant_docs = []
-        query_terms = query.lower().split()
+        if self.vector_index is not None:
+            with span("retrieval"):
+                return self._vector_search(query, top_k, analysis or analyze_query(query))
         
-        for doc in self.documents:
-            content = doc["content"].lower()
-            relevance_score = sum(1 for term in query_terms if term in content)
+        with span("retrieval"):
+            # Simple keyword-based retrieval
+            relevant_docs = []
+            query_terms = (analysis or analyze_query(query)).terms
             
-            if relevance_score > 0:
-                relevant_docs.append({
-                    "document": doc,
-                    "relevance_score": relevance_score
-                })
-        
-        # Sort by relevance and return top_k
-        relevant_docs.sort(key=lambda x: x["relevance_score"], reverse=True)
-        return [doc["document"] for doc in relevant_docs[:top_k]]
+            for doc in self.documents:
+                content = doc["content"].lower()
+                relevance_score = sum(1 for term in query_terms if term in content)
+            
+                if relevance_score > 0:
+                    relevant_docs.append({
+                        "document": doc,
+                        "relevance_score": relevance_score
+                    })
+            
+            # Sort by relevance and return top_k
+            relevant_docs.sort(key=lambda x: x["relevance_score"], reverse=True)
+            return [doc["document"] for doc in relevant_docs[:top_k]]
+    
+    def _vector_search(self, query: str, top_k: int, analysis: QueryAnalysis) -> List[Dict[str, Any]]:
+        self._index_new_documents()
+        if self.embeddings.encoder.name == HASHED:
+            # Same vector the hashed encoder would produce, already computed for the query
+            query_vector = analysis.embedding
+        else:
+            query_vector = self.embeddings.embed(query)
+        hits = self.vector_index.search(query_vector, top_k)
+        return [self.documents[row] for row, score in hits if score > 0]
     
-    def get_context_for_query(self, query: str, max_length: int = 1000) -> Optional[str]:
+    def get_context_for_query(self, 
+                              query: str, 
+                              max_length: int = 1000,
+                              analysis: Optional[QueryAnalysis] = None) -> Optional[str]:
         """
         Get context for a query by retrieving relevant documents
         
         Args:
             query: User query
             max_length: Maximum context length
+            analysis: Analysis of the query (looked up in the query cache if None)
             
         Returns:
             Context string or None
         """
-        relevant_docs = self.retrieve_relevant_documents(query)
+        relevant_docs = self.retrieve_relevant_documents(query, analysis=analysis)
         
         if not relevant_docs:
             return None
@@ -132,10 +294,11 @@ class RAGSystem:
     def add_knowledge_base(self, knowledge_base_path: str):
         """Add documents from a knowledge base directory"""
         if not os.path.exists(knowledge_base_path):
-            logger.error(f"Knowledge base path does not exist: {knowledge_base_path}")
+            logger.error("Knowledge base path does not exist: %s", knowledge_base_path)
             return
         
         # Process files in the knowledge base directory
+        added = 0
         for filename in os.listdir(knowledge_base_path):
             file_path = os.path.join(knowledge_base_path, filename)
             
@@ -149,17 +312,24 @@ class RAGSystem:
                         "file_path": file_path
                     }
                     
-                    self.add_document(content, metadata)
-                    logger.info(f"Added document from {filename}")
+                    self.add_document(content, metadata, save=False)
+                    added += 1
                     
                 except Exception as e:
-                    logger.error(f"Error processing {filename}: {e}")
+                    logger.error("Error processing %s: %s", filename, e)
+        
+        if added:
+            self._save_documents()
+        logger.info("Added %s documents from %s", added, knowledge_base_path)
     
     def get_statistics(self) -> Dict[str, Any]:
         """Get RAG system statistics"""
-        return {
+        statistics = {
             "total_documents": len(self.documents),
             "vector_db_path": self.vector_db_path,
             "system_ready": self.vector_index is not None
         }
+        if self.vector_index is not None:
+            statistics["vector_index"] = self.vector_index.get_stats()
+        return statistics
 
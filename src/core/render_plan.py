@@ -0,0 +1,334 @@
+"""
+Schema-driven render plans for Vantage AI PersonaPilot
+
+A persona's get_output_format() example structure is compiled once into a
+plan of fields (display titles and value kinds precomputed). Rendering a
+response is then a single loop over the plan, emitting lines through a
+pluggable target (markdown, plain text, HTML, ANSI). Values that do not match
+the schema, and keys the schema does not know about, fall back to a generic
+recursive renderer so nothing is dropped.
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+import functools
+import html
+
+SCALAR_TYPES = (str, int, float, bool, type(None))
+
+# Field kinds
+SCALAR = "scalar"
+CODE = "code"
+SCALAR_LIST = "scalar_list"
+OBJECT = "object"
+OBJECT_LIST = "object_list"
+
+
+@functools.lru_cache(maxsize=1024)
+def display_key(key: str) -> str:
+    """Turn a snake_case key into a display title"""
+    return str(key).replace('_', ' ').title()
+
+
+class RenderTarget:
+    """Markdown output; other targets override the line builders"""
+    
+    name = "markdown"
+    
+    def section(self, title: str) -> List[str]:
+        return ["", f"## {title}"]
+    
+    def field(self, title: str, value: Any, depth: int, bullet: bool = False) -> str:
+        return f"{self._prefix(depth, bullet)}**{title}**: {value}"
+    
+    def label(self, title: str, depth: int, bullet: bool = False) -> str:
+        return f"{self._prefix(depth, bullet)}**{title}**:"
+    
+    def item(self, value: Any, depth: int) -> str:
+        return f"{'  ' * depth}- {value}"
+    
+    def text(self, value: Any, depth: int) -> str:
+        return f"{'  ' * depth}{value}"
+    
+    def code(self, title: str, value: Any, depth: int, bullet: bool = False) -> List[str]:
+        return [self.label(title, depth, bullet), f"```\n{value}\n```"]
+    
+    def join(self, lines: List[str]) -> str:
+        return "\n".join(lines)
+    
+    def _prefix(self, depth: int, bullet: bool) -> str:
+        if bullet:
+            return f"{'  ' * (depth - 1)}- "
+        return "  " * depth
+
+
+class PlainTextTarget(RenderTarget):
+    """Plain text without markup"""
+    
+    name = "plain"
+    
+    def section(self, title: str) -> List[str]:
+        return ["", title.upper()]
+    
+    def field(self, title: str, value: Any, depth: int, bullet: bool = False) -> str:
+        return f"{self._prefix(depth, bullet)}{title}: {value}"
+    
+    def label(self, title: str, depth: int, bullet: bool = False) -> str:
+        return f"{self._prefix(depth, bullet)}{title}:"
+    
+    def item(self, value: Any, depth: int) -> str:
+        return f"{'  ' * depth}• {value}"
+    
+    def code(self, title: str, value: Any, depth: int, bullet: bool = False) -> List[str]:
+        indent = "  " * (depth + 1)
+        return [self.label(title, depth, bullet)] + [f"{indent}{line}" for line in str(value).splitlines()]
+    
+    def _prefix(self, depth: int, bullet: bool) -> str:
+        if bullet:
+            return f"{'  ' * (depth - 1)}• "
+        return "  " * depth
+
+
+class AnsiTarget(PlainTextTarget):
+    """Terminal output with ANSI bold/colour escapes"""
+    
+    name = "ansi"
+    
+    BOLD = "\x1b[1m"
+    CYAN = "\x1b[36m"
+    DIM = "\x1b[2m"
+    RESET = "\x1b[0m"
+    
+    def section(self, title: str) -> List[str]:
+        return ["", f"{self.BOLD}{self.CYAN}{title}{self.RESET}"]
+    
+    def field(self, title: str, value: Any, depth: int, bullet: bool = False) -> str:
+        return f"{self._prefix(depth, bullet)}{self.BOLD}{title}{self.RESET}: {value}"
+    
+    def label(self, title: str, depth: int, bullet: bool = False) -> str:
+        return f"{self._prefix(depth, bullet)}{self.BOLD}{title}{self.RESET}:"
+    
+    def code(self, title: str, value: Any, depth: int, bullet: bool = False) -> List[str]:
+        indent = "  " * (depth + 1)
+        return [self.label(title, depth, bullet)] + [
+            f"{indent}{self.DIM}{line}{self.RESET}" for line in str(value).splitlines()
+        ]
+
+
+class HtmlTarget(RenderTarget):
+    """HTML fragments; nesting is expressed with a depth class per line"""
+    
+    name = "html"
+    
+    def section(self, title: str) -> List[str]:
+        return [f"<h2>{html.escape(title)}</h2>"]
+    
+    def field(self, title: str, value: Any, depth: int, bullet: bool = False) -> str:
+        return (f'<div class="{self._classes(depth, bullet)}"><strong>{html.escape(title)}</strong>: '
+                f'{html.escape(str(value))}</div>')
+    
+    def label(self, title: str, depth: int, bullet: bool = False) -> str:
+        return f'<div class="{self._classes(depth, bullet)}"><strong>{html.escape(title)}</strong>:</div>'
+    
+    def item(self, value: Any, depth: int) -> str:
+        return f'<div class="{self._classes(depth + 1, True)}">{html.escape(str(value))}</div>'
+    
+    def text(self, value: Any, depth: int) -> str:
+        return f'<p class="depth-{depth}">{html.escape(str(value))}</p>'
+    
+    def code(self, title: str, value: Any, depth: int, bullet: bool = False) -> List[str]:
+        return [self.label(title, depth, bullet), f"<pre><code>{html.escape(str(value))}</code></pre>"]
+    
+    def _classes(self, depth: int, bullet: bool) -> str:
+        return f"depth-{depth} item" if bullet else f"depth-{depth}"
+
+
+TARGETS: Dict[str, RenderTarget] = {
+    target.name: target for target in (RenderTarget(), PlainTextTarget(), AnsiTarget(), HtmlTarget())
+}
+
+
+def get_target(name: str) -> RenderTarget:
+    """Get a render target by name"""
+    if name not in TARGETS:
+        raise ValueError(f"Render target '{name}' not found. Available: {list(TARGETS.keys())}")
+    return TARGETS[name]
+
+
+class FieldPlan:
+    """Precomputed rendering of one schema field"""
+    
+    __slots__ = ("key", "title", "kind", "children")
+    
+    def __init__(self, key: str, kind: str, children: Optional["ObjectPlan"] = None):
+        self.key = key
+        self.title = display_key(key)
+        self.kind = kind
+        self.children = children
+
+
+class ObjectPlan:
+    """Precomputed rendering of one schema object"""
+    
+    __slots__ = ("fields", "known_keys")
+    
+    def __init__(self, fields: Tuple[FieldPlan, ...]):
+        self.fields = fields
+        self.known_keys = frozenset(field.key for field in fields)
+
+
+def _is_code_key(key: str) -> bool:
+    return key == "code" or key.startswith("code_") or key.endswith("_code")
+
+
+def compile_schema(schema: Dict[str, Any]) -> ObjectPlan:
+    """
+    Compile an example output structure into a render plan
+    
+    Args:
+        schema: Example structure as returned by a persona's get_output_format()
+    
+    Returns:
+        Object plan for the top level of the response
+    """
+    fields = []
+    for key, example in schema.items():
+        if isinstance(example, dict):
+            fields.append(FieldPlan(key, OBJECT, compile_schema(example)))
+        elif isinstance(example, list):
+            if example and isinstance(example[0], dict):
+                fields.append(FieldPlan(key, OBJECT_LIST, compile_schema(example[0])))
+            else:
+                fields.append(FieldPlan(key, SCALAR_LIST))
+        elif _is_code_key(key):
+            fields.append(FieldPlan(key, CODE))
+        else:
+            fields.append(FieldPlan(key, SCALAR))
+    return ObjectPlan(tuple(fields))
+
+
+def render_generic(value: Any, depth: int, lines: List[str], target: RenderTarget, bullet: bool = False):
+    """Render a value without a schema (used for unknown keys and mismatches)"""
+    if isinstance(value, dict):
+        for key, sub_value in value.items():
+            _render_generic_field(display_key(key), sub_value, depth, lines, target, bullet)
+            bullet = False
+    elif isinstance(value, list):
+        for item in value:
+            if isinstance(item, SCALAR_TYPES):
+                lines.append(target.item(item, depth))
+            else:
+                render_generic(item, depth + 1, lines, target, bullet=True)
+    else:
+        lines.append(target.text(value, depth))
+
+
+def _render_generic_field(title: str, value: Any, depth: int, lines: List[str],
+                          target: RenderTarget, bullet: bool):
+    if isinstance(value, SCALAR_TYPES):
+        lines.append(target.field(title, value, depth, bullet))
+    elif not value:
+        lines.append(target.field(title, "-", depth, bullet))
+    elif isinstance(value, list) and all(isinstance(item, SCALAR_TYPES) for item in value):
+        lines.append(target.field(title, ", ".join(map(str, value)), depth, bullet))
+    else:
+        lines.append(target.label(title, depth, bullet))
+        render_generic(value, depth + 1, lines, target)
+
+
+def _render_object(data: Dict[str, Any], plan: ObjectPlan, depth: int, lines: List[str],
+                   target: RenderTarget, bullet: bool = False):
+    """Render a dictionary field by field following its plan"""
+    for field in plan.fields:
+        if field.key not in data:
+            continue
+        value = data[field.key]
+        kind = field.kind
+        if kind == CODE and isinstance(value, str):
+            lines.extend(target.code(field.title, value, depth, bullet))
+        elif kind == OBJECT and isinstance(value, dict) and value:
+            lines.append(target.label(field.title, depth, bullet))
+            _render_object(value, field.children, depth + 1, lines, target)
+        elif kind == OBJECT_LIST and isinstance(value, list) and value:
+            lines.append(target.label(field.title, depth, bullet))
+            _render_object_list(value, field.children, depth + 1, lines, target)
+        else:
+            _render_generic_field(field.title, value, depth, lines, target, bullet)
+        bullet = False
+    
+    if not plan.known_keys.issuperset(data):
+        for key, value in data.items():
+            if key not in plan.known_keys:
+                _render_generic_field(display_key(key), value, depth, lines, target, bullet)
+                bullet = False
+
+
+def _render_object_list(items: List[Any], plan: ObjectPlan, depth: int, lines: List[str],
+                        target: RenderTarget):
+    for item in items:
+        if isinstance(item, dict):
+            _render_object(item, plan, depth + 1, lines, target, bullet=True)
+        elif isinstance(item, SCALAR_TYPES):
+            lines.append(target.item(item, depth))
+        else:
+            render_generic(item, depth + 1, lines, target, bullet=True)
+
+
+def section_header(key: str, field: Optional[FieldPlan], target: RenderTarget) -> List[str]:
+    """Render the title lines of a top-level section"""
+    return target.section(field.title if field else display_key(key))
+
+
+def render_section(key: str, value: Any, field: Optional[FieldPlan], target: RenderTarget) -> List[str]:
+    """Render one top-level key of a response as a titled section"""
+    lines = section_header(key, field, target)
+    if field is not None and field.kind == OBJECT and isinstance(value, dict):
+        _render_object(value, field.children, 0, lines, target)
+    elif field is not None and field.kind == OBJECT_LIST and isinstance(value, list):
+        _render_object_list(value, field.children, 0, lines, target)
+    elif field is not None and field.kind == CODE and isinstance(value, str):
+        lines.extend(target.code(field.title, value, 0))
+    elif isinstance(value, SCALAR_TYPES):
+        lines.append(target.text(value, 0))
+    else:
+        render_generic(value, 0, lines, target)
+    return lines
+
+
+def render_list_item(item: Any, field: Optional[FieldPlan], target: RenderTarget) -> List[str]:
+    """Render one element of a top-level list section (used when streaming)"""
+    lines: List[str] = []
+    if field is not None and field.kind == OBJECT_LIST:
+        _render_object_list([item], field.children, 0, lines, target)
+    else:
+        render_generic([item], 0, lines, target)
+    return lines
+
+
+def render_with_plan(data: Any, plan: Optional[ObjectPlan], target: RenderTarget) -> str:
+    """
+    Render a response following a compiled plan
+    
+    Args:
+        data: Parsed response
+        plan: Compiled plan (None renders generically)
+        target: Output target
+    
+    Returns:
+        Rendered text
+    """
+    if not isinstance(data, dict):
+        return target.text(str(data), 0)
+    
+    lines: List[str] = []
+    fields = plan.fields if plan is not None else ()
+    for field in fields:
+        if field.key in data:
+            lines.extend(render_section(field.key, data[field.key], field, target))
+    known = plan.known_keys if plan is not None else frozenset()
+    for key, value in data.items():
+        if key not in known:
+            lines.extend(render_section(key, value, None, target))
+    # Drop the spacer the first section starts with
+    if lines and not lines[0]:
+        del lines[0]
+    return target.join(lines)
@@ -0,0 +1,306 @@
+"""
+Resilience primitives (retry, hedging, circuit breaking) for Vantage AI PersonaPilot
+"""
+
+from typing import Callable, Dict, Optional, TypeVar, Deque
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Exception class names raised by google-api-core / the Gemini SDK for transient failures.
+# Matched by name so this module does not need to import the SDK.
+RETRYABLE_ERROR_NAMES = {
+    "ServiceUnavailable",
+    "TooManyRequests",
+    "ResourceExhausted",
+    "DeadlineExceeded",
+    "InternalServerError",
+    "GatewayTimeout",
+    "Aborted",
+}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a call is rejected because the circuit breaker is open"""
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """Return True if the error is transient and the call may be retried"""
+    retryable = getattr(error, "retryable", None)
+    if retryable is not None:
+        return bool(retryable)
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return any(cls.__name__ in RETRYABLE_ERROR_NAMES for cls in type(error).__mro__)
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter for retryable errors"""
+    
+    def __init__(self,
+                 max_attempts: int = 3,
+                 base_delay: float = 0.5,
+                 max_delay: float = 8.0,
+                 multiplier: float = 2.0,
+                 retryable: Callable[[BaseException], bool] = is_retryable_error):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.retryable = retryable
+    
+    def get_delay(self, attempt: int) -> float:
+        """Get the jittered sleep before retry number `attempt` (1-based)"""
+        ceiling = min(self.max_delay, self.base_delay * (self.multiplier ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+    
+    def should_retry(self, error: BaseException, attempt: int) -> bool:
+        """Check whether another attempt should be made after `attempt` failed"""
+        return attempt < self.max_attempts and self.retryable(error)
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a half-open probe"""
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self) -> str:
+        """Current breaker state"""
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+    
+    def allow_request(self) -> bool:
+        """Check whether a call may proceed"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            # Half-open: let a single probe through
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+    
+    def record_success(self):
+        """Record a successful call"""
+        with self._lock:
+            self._failures = 0
+            self._probe_in_flight = False
+            if self._state != self.CLOSED:
+                logger.info("Circuit breaker closed")
+            self._state = self.CLOSED
+    
+    def record_failure(self):
+        """Record a failed call"""
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning("Circuit breaker opened after %s failures", self._failures)
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Rolling window of call latencies used to pick the hedging delay"""
+    
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+    
+    def record(self, latency: float):
+        """Record a call latency in seconds"""
+        with self._lock:
+            self._samples.append(latency)
+    
+    def percentile(self, pct: float) -> Optional[float]:
+        """Get the latency percentile, or None until enough samples are collected"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class ResilientCaller:
+    """Run calls with retry, optional hedging and a circuit breaker"""
+    
+    def __init__(self,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 hedge: bool = False,
+                 hedge_percentile: float = 95.0,
+                 latency_tracker: Optional[LatencyTracker] = None,
+                 max_hedge_workers: int = 16):
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.latency_tracker = latency_tracker or LatencyTracker()
+        self._max_hedge_workers = max_hedge_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        # Breakers of keyed calls (one per model), cloned from circuit_breaker's settings
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._breakers_lock = threading.Lock()
+        self.stats = {"calls": 0, "retries": 0, "hedged": 0, "hedge_wins": 0, "rejected": 0}
+        # Counters are bumped from request and hedge threads
+        self._stats_lock = threading.Lock()
+    
+    @classmethod
+    def from_config(cls, config) -> 'ResilientCaller':
+        """Create a caller from a Config object"""
+        return cls(
+            retry_policy=RetryPolicy(
+                max_attempts=config.max_retries,
+                base_delay=config.retry_base_delay,
+                max_delay=config.retry_max_delay
+            ),
+            circuit_breaker=CircuitBreaker(
+                failure_threshold=config.circuit_failure_threshold,
+                reset_timeout=config.circuit_reset_timeout
+            ),
+            hedge=config.hedge_requests,
+            hedge_percentile=config.hedge_percentile
+        )
+    
+    def breaker_for(self, key: Optional[str] = None) -> Optional[CircuitBreaker]:
+        """Circuit breaker guarding calls with this key (the shared breaker for None)"""
+        if key is None or self.circuit_breaker is None:
+            return self.circuit_breaker
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            with self._breakers_lock:
+                breaker = self._breakers.get(key)
+                if breaker is None:
+                    breaker = self._breakers[key] = CircuitBreaker(
+                        self.circuit_breaker.failure_threshold,
+                        self.circuit_breaker.reset_timeout
+                    )
+        return breaker
+    
+    def call(self, func: Callable[[], T], key: Optional[str] = None) -> T:
+        """
+        Call `func` with the configured resilience policies
+        
+        Args:
+            func: Zero-argument callable performing one attempt
+            key: Calls with different keys (e.g. models) trip separate circuit breakers
+        
+        Returns:
+            Result of the first successful attempt
+        """
+        self._count("calls")
+        circuit_breaker = self.breaker_for(key)
+        attempt = 0
+        while True:
+            attempt += 1
+            if circuit_breaker and not circuit_breaker.allow_request():
+                self._count("rejected")
+                raise CircuitOpenError("Circuit breaker is open; backend calls are failing fast")
+            try:
+                result = self._attempt(func)
+            except Exception as e:
+                if circuit_breaker:
+                    if is_retryable_error(e):
+                        circuit_breaker.record_failure()
+                    else:
+                        # Caller errors (bad request, auth) say nothing about backend health
+                        circuit_breaker.record_success()
+                if not self.retry_policy.should_retry(e, attempt):
+                    raise
+                delay = self.retry_policy.get_delay(attempt)
+                self._count("retries")
+                logger.warning("Retryable error on attempt %s: %s; retrying in %.2fs", attempt, e, delay)
+                time.sleep(delay)
+                continue
+            if circuit_breaker:
+                circuit_breaker.record_success()
+            return result
+    
+    def _count(self, name: str):
+        with self._stats_lock:
+            self.stats[name] += 1
+    
+    def _attempt(self, func: Callable[[], T]) -> T:
+        """Run a single (possibly hedged) attempt"""
+        hedge_delay = self.latency_tracker.percentile(self.hedge_percentile) if self.hedge else None
+        if hedge_delay is None:
+            start = time.perf_counter()
+            result = func()
+            self.latency_tracker.record(time.perf_counter() - start)
+            return result
+        return self._hedged_attempt(func, hedge_delay)
+    
+    def _hedged_attempt(self, func: Callable[[], T], hedge_delay: float) -> T:
+        """Fire a backup request if the primary is slower than `hedge_delay`"""
+        executor = self._get_executor()
+        start = time.perf_counter()
+        primary = executor.submit(func)
+        done, _ = wait([primary], timeout=hedge_delay)
+        if done:
+            self.latency_tracker.record(time.perf_counter() - start)
+            return primary.result()
+        
+        self._count("hedged")
+        backup = executor.submit(func)
+        pending = {primary, backup}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self.latency_tracker.record(time.perf_counter() - start)
+                    if future is backup:
+                        self._count("hedge_wins")
+                    # The loser keeps running in the pool; its result is discarded
+                    return future.result()
+                error = future.exception()
+        raise error
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Lazily create the executor used for hedged attempts"""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self._max_hedge_workers,
+                        thread_name_prefix="ai-hedge"
+                    )
+        return self._executor
+    
+    def shutdown(self):
+        """Release the hedging thread pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,89 @@
+"""
+Response schemas for native JSON output in Vantage AI PersonaPilot
+
+Persona output formats are example structures whose leaf values describe the
+expected content. to_response_schema() turns one into the OpenAPI-style schema
+accepted by Gemini's response_schema (OBJECT / ARRAY / STRING ...), with the
+example text kept as each field's description, so the model is constrained
+to the structure without the example being pasted into the prompt.
+"""
+
+from typing import Any, Dict
+import functools
+import json
+
+JSON_MIME_TYPE = "application/json"
+
+JSON_INSTRUCTION = (
+    "IMPORTANT: Your response MUST be valid JSON. Ensure all strings are properly quoted with "
+    "double quotes, avoid trailing commas, and escape special characters correctly. Do not "
+    "include any text outside the JSON structure."
+)
+
+
+def format_instructions(output_format: Dict[str, Any]) -> str:
+    """Prompt text asking for JSON matching an example structure (for backends without JSON mode)"""
+    return f"""
+\nPlease provide your response in valid JSON format exactly matching this structure:
+```json
+{json.dumps(output_format, indent=2)}
+```
+
+{JSON_INSTRUCTION}"""
+
+
+def _schema_for(example: Any) -> Dict[str, Any]:
+    if isinstance(example, dict):
+        if not example:
+            # OBJECT schemas need at least one property
+            return {"type": "STRING", "description": "Free-form text"}
+        return {
+            "type": "OBJECT",
+            "properties": {key: _schema_for(value) for key, value in example.items()},
+            "required": list(example)
+        }
+    if isinstance(example, list):
+        return {"type": "ARRAY", "items": _schema_for(example[0] if example else "")}
+    if isinstance(example, bool):
+        return {"type": "BOOLEAN"}
+    if isinstance(example, int):
+        return {"type": "INTEGER"}
+    if isinstance(example, float):
+        return {"type": "NUMBER"}
+    if example is None:
+        return {"type": "STRING", "nullable": True}
+    return {"type": "STRING", "description": str(example)}
+
+
+@functools.lru_cache(maxsize=256)
+def _cached_schema(encoded_example: str) -> str:
+    return json.dumps(_schema_for(json.loads(encoded_example)))
+
+
+def to_response_schema(output_format: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a persona output format into a response schema
+
+    Args:
+        output_format: Example structure as returned by get_output_format()
+
+    Returns:
+        Schema dictionary (a fresh copy; compiled schemas are cached)
+    """
+    return json.loads(_cached_schema(json.dumps(output_format)))
+
+
+def sample_from_schema(schema: Dict[str, Any]) -> Any:
+    """Build a deterministic value conforming to a response schema"""
+    kind = schema.get("type", "STRING")
+    if kind == "OBJECT":
+        return {key: sample_from_schema(sub) for key, sub in schema.get("properties", {}).items()}
+    if kind == "ARRAY":
+        return [sample_from_schema(schema.get("items", {}))]
+    if kind == "BOOLEAN":
+        return True
+    if kind == "INTEGER":
+        return 1
+    if kind == "NUMBER":
+        return 1.0
+    return schema.get("description", "")
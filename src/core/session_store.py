@@ -0,0 +1,117 @@
+"""
+Session storage with LRU and TTL eviction for Vantage AI PersonaPilot
+"""
+
+from typing import Any, Callable, Dict, Generic, Hashable, Optional, TypeVar
+from collections import OrderedDict
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+
+class SessionStore(Generic[V]):
+    """Thread-safe map of session key to state, bounded by size and idle time"""
+    
+    def __init__(self, max_sessions: int = 10000, ttl_seconds: Optional[float] = 3600.0):
+        """
+        Initialize the store
+        
+        Args:
+            max_sessions: Maximum number of live sessions; least recently used are evicted
+            ttl_seconds: Idle time after which a session expires (None disables expiry)
+        """
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._items: "OrderedDict[Hashable, list]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evicted": 0, "expired": 0}
+    
+    def _is_expired(self, last_access: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - last_access > self.ttl_seconds
+    
+    def get(self, key: Hashable) -> Optional[V]:
+        """Get a session, refreshing its recency, or None if missing or expired"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            if self._is_expired(entry[1], now):
+                del self._items[key]
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            entry[1] = now
+            self._items.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[0]
+    
+    def get_or_create(self, key: Hashable, factory: Callable[[], V]) -> V:
+        """Get a session or create it with `factory`"""
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            # Another thread may have created it since get()
+            entry = self._items.get(key)
+            if entry is not None:
+                return entry[0]
+            value = factory()
+            self._items[key] = [value, time.monotonic()]
+            self._evict_locked()
+            return value
+    
+    def put(self, key: Hashable, value: V):
+        """Insert or replace a session"""
+        with self._lock:
+            self._items[key] = [value, time.monotonic()]
+            self._items.move_to_end(key)
+            self._evict_locked()
+    
+    def pop(self, key: Hashable) -> Optional[V]:
+        """Remove and return a session"""
+        with self._lock:
+            entry = self._items.pop(key, None)
+        return entry[0] if entry else None
+    
+    def _evict_locked(self):
+        """Drop least recently used sessions over capacity (lock must be held)"""
+        while len(self._items) > self.max_sessions:
+            self._items.popitem(last=False)
+            self._stats["evicted"] += 1
+    
+    def purge_expired(self) -> int:
+        """Remove all expired sessions and return how many were removed"""
+        if self.ttl_seconds is None:
+            return 0
+        now = time.monotonic()
+        removed = 0
+        with self._lock:
+            # Entries are in access order, so expired ones are at the front
+            while self._items:
+                key, entry = next(iter(self._items.items()))
+                if not self._is_expired(entry[1], now):
+                    break
+                del self._items[key]
+                removed += 1
+            self._stats["expired"] += removed
+        return removed
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+    
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key) is not None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get store counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["sessions"] = len(self._items)
+        return stats
@@ -0,0 +1,369 @@
+"""
+Incremental (streaming) rendering for Vantage AI PersonaPilot
+
+A streamed model response is turned into structured events by an incremental
+JSON parser, and a streaming renderer turns each event into a text fragment as
+soon as it is complete. Concatenating the fragments gives the same output as
+rendering the finished response (sections appear in the order the model
+writes them).
+"""
+
+from typing import Any, Iterable, Iterator, List, Optional
+import json
+import logging
+import re
+from .render_plan import (
+    ObjectPlan, RenderTarget, render_list_item, render_section, section_header
+)
+
+logger = logging.getLogger(__name__)
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+# Characters that matter while scanning for the end of a value, outside and inside strings
+_STRUCTURAL = re.compile(r'["{}\[\]]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+# A bare number or literal ends at the first delimiter
+_SCALAR_END = re.compile(r'[,\]}\s]')
+
+
+class StreamEvent:
+    """Base class of structured response events"""
+    
+    __slots__ = ("key",)
+    
+    def __init__(self, key: str):
+        self.key = key
+    
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.key!r})"
+
+
+class FieldStarted(StreamEvent):
+    """A top-level field's value has started"""
+    
+    __slots__ = ("is_list",)
+    
+    def __init__(self, key: str, is_list: bool = False):
+        super().__init__(key)
+        self.is_list = is_list
+
+
+class ListItemCompleted(StreamEvent):
+    """One element of a top-level list field is complete"""
+    
+    __slots__ = ("index", "item")
+    
+    def __init__(self, key: str, index: int, item: Any):
+        super().__init__(key)
+        self.index = index
+        self.item = item
+
+
+class FieldCompleted(StreamEvent):
+    """A top-level field's value is complete"""
+    
+    __slots__ = ("value",)
+    
+    def __init__(self, key: str, value: Any):
+        super().__init__(key)
+        self.value = value
+
+
+class IncrementalJsonParser:
+    """Parse a streamed JSON object into field/list-item events
+    
+    Only the top level is tracked incrementally: each field emits FieldStarted
+    when its value begins, ListItemCompleted for every finished element of a
+    list value, and FieldCompleted once the value is done. Text before the
+    opening brace (such as a ```json fence) is ignored.
+    
+    Each value is scanned once, tracking string and bracket state across
+    chunks, and decoded when it closes. A closed value that is not valid JSON
+    is reported as its raw text. If the object itself is malformed, parsing
+    stops (see error) and the rest of the input is kept; text left unparsed
+    when the stream ends is available from pending_text().
+    """
+    
+    _SEEK, _KEY, _COLON, _VALUE, _SCALAR, _ITEM, _DONE, _FAILED = range(8)
+    
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._state = self._SEEK
+        self._key: Optional[str] = None
+        self._items: List[Any] = []
+        self._closing = False
+        self._seek = 0
+        # Scan state of the value at the cursor. While it is open, chunks are
+        # scanned on their own and held in _parts instead of growing the buffer.
+        self._open = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._end: Optional[int] = None
+        self._parts: List[str] = []
+        self._parts_length = 0
+        self.error: Optional[str] = None
+        self.value: dict = {}
+    
+    @property
+    def complete(self) -> bool:
+        """True once the closing brace of the top-level object was parsed"""
+        return self._state == self._DONE
+    
+    def feed(self, chunk: str) -> List[StreamEvent]:
+        """Add a chunk of text and return the events it completed"""
+        if self._state == self._FAILED:
+            self._parts.append(chunk)
+            return []
+        if self._open and self._end is None:
+            end = self._scan(chunk, 0)
+            if end is None and not self._closing:
+                self._parts.append(chunk)
+                self._parts_length += len(chunk)
+                return []
+            if end is not None:
+                self._end = len(self._buffer) + self._parts_length + end
+        if self._parts:
+            chunk = "".join(self._parts) + chunk
+            self._parts, self._parts_length = [], 0
+        self._buffer += chunk
+        events: List[StreamEvent] = []
+        try:
+            while self._step(events):
+                pass
+        except ValueError as e:
+            self.error = str(e)
+            self._state = self._FAILED
+        # Drop consumed text so the buffer only holds the unfinished value
+        if self._pos > 4096 and self._state not in (self._SEEK, self._FAILED):
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+        return events
+    
+    def close(self) -> List[StreamEvent]:
+        """Signal end of input and return any events still pending"""
+        self._closing = True
+        return self.feed("")
+    
+    def pending_text(self) -> str:
+        """Input not turned into events yet (what is left of an incomplete or malformed response)"""
+        if self._state == self._DONE:
+            return ""
+        return (self._buffer[self._pos:] + "".join(self._parts)).lstrip(_WHITESPACE + ",")
+    
+    def _skip(self, chars: str) -> Optional[str]:
+        """Skip characters in `chars` and return the next one (None if out of input)"""
+        buffer, pos = self._buffer, self._pos
+        while pos < len(buffer) and buffer[pos] in chars:
+            pos += 1
+        self._pos = pos
+        return buffer[pos] if pos < len(buffer) else None
+    
+    def _scan(self, text: str, pos: int) -> Optional[int]:
+        """Continue scanning the open value through text[pos:]
+        
+        Returns the offset in `text` just past the end of the value, or None
+        if it continues beyond the text.
+        """
+        if self._escape:
+            if pos >= len(text):
+                return None
+            self._escape = False
+            pos += 1
+        if not self._in_string and not self._depth:
+            match = _SCALAR_END.search(text, pos)
+            return match.start() if match is not None else None
+        while True:
+            if self._in_string:
+                match = _STRING_SPECIAL.search(text, pos)
+                if match is None:
+                    return None
+                pos = match.end()
+                if match.group() == "\\":
+                    if pos >= len(text):
+                        self._escape = True
+                        return None
+                    pos += 1
+                    continue
+                self._in_string = False
+                if not self._depth:
+                    return pos
+                continue
+            match = _STRUCTURAL.search(text, pos)
+            if match is None:
+                return None
+            pos = match.end()
+            char = match.group()
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if not self._depth:
+                    return pos
+    
+    def _decode(self) -> Optional[tuple]:
+        """Decode the value at the cursor once it is complete, or None if more input is needed"""
+        if not self._open:
+            opener = self._buffer[self._pos]
+            self._open = True
+            self._in_string = opener == '"'
+            self._depth = 1 if opener in "{[" else 0
+            self._escape = False
+            scalar = not self._in_string and not self._depth
+            self._end = self._scan(self._buffer, self._pos if scalar else self._pos + 1)
+        end = self._end
+        if end is None:
+            if not self._closing:
+                return None
+            if self._in_string or self._depth:
+                # Cut off mid-value: left for pending_text()
+                return None
+            # A bare number or literal may end with the input
+            end = len(self._buffer)
+        self._open, self._end = False, None
+        try:
+            value, stop = _DECODER.raw_decode(self._buffer, self._pos)
+            if stop == end:
+                return value, end
+        except json.JSONDecodeError:
+            pass
+        raw = self._buffer[self._pos:end].strip()
+        logger.warning("Value of field %r is not valid JSON; keeping its raw text", self._key)
+        return raw, end
+    
+    def _step(self, events: List[StreamEvent]) -> bool:
+        """Advance the state machine; returns False when more input is needed"""
+        state = self._state
+        if state in (self._DONE, self._FAILED):
+            return False
+        
+        if state == self._SEEK:
+            # The cursor stays put so non-JSON text can still be shown as it is
+            index = self._buffer.find("{", self._seek)
+            if index < 0:
+                self._seek = len(self._buffer)
+                return False
+            self._pos = index + 1
+            self._state = self._KEY
+            return True
+        
+        if state == self._KEY:
+            char = self._skip(_WHITESPACE + ",")
+            if char is None:
+                return False
+            if char == "}":
+                self._pos += 1
+                self._state = self._DONE
+                return False
+            if char != '"':
+                raise ValueError(f"Unexpected character {char!r} while reading a field name")
+            try:
+                key, end = json.decoder.scanstring(self._buffer, self._pos + 1)
+            except json.JSONDecodeError:
+                return False
+            self._key, self._pos = key, end
+            self._state = self._COLON
+            return True
+        
+        if state == self._COLON:
+            char = self._skip(_WHITESPACE)
+            if char is None:
+                return False
+            if char != ":":
+                raise ValueError(f"Expected ':' after field {self._key!r}")
+            self._pos += 1
+            self._state = self._VALUE
+            return True
+        
+        if state == self._VALUE:
+            char = self._skip(_WHITESPACE)
+            if char is None:
+                return False
+            events.append(FieldStarted(self._key, is_list=char == "["))
+            if char == "[":
+                self._pos += 1
+                self._items = []
+                self._state = self._ITEM
+            else:
+                self._state = self._SCALAR
+            return True
+        
+        if state == self._SCALAR:
+            decoded = self._decode()
+            if decoded is None:
+                return False
+            value, self._pos = decoded
+            self.value[self._key] = value
+            events.append(FieldCompleted(self._key, value))
+            self._state = self._KEY
+            return True
+        
+        # state == self._ITEM
+        char = self._skip(_WHITESPACE + ",")
+        if char is None:
+            return False
+        if char == "]":
+            self._pos += 1
+            self.value[self._key] = self._items
+            events.append(FieldCompleted(self._key, self._items))
+            self._state = self._KEY
+            return True
+        decoded = self._decode()
+        if decoded is None:
+            return False
+        item, self._pos = decoded
+        events.append(ListItemCompleted(self._key, len(self._items), item))
+        self._items.append(item)
+        return True
+
+
+class StreamingRenderer:
+    """Turn structured events into rendered text fragments"""
+    
+    def __init__(self, plan: Optional[ObjectPlan], target: RenderTarget):
+        self.target = target
+        self._fields = {field.key: field for field in plan.fields} if plan is not None else {}
+        self._started = False
+        self._list_fields = set()
+    
+    def _emit(self, lines: List[str]) -> str:
+        if not self._started:
+            # Drop the spacer the first section starts with
+            if lines and not lines[0]:
+                lines = lines[1:]
+            self._started = True
+            return self.target.join(lines)
+        return "\n" + self.target.join(lines)
+    
+    def feed(self, event: StreamEvent) -> str:
+        """Render one event; returns an empty string if it produces no output"""
+        field = self._fields.get(event.key)
+        
+        if isinstance(event, FieldStarted):
+            # List sections are shown as soon as they start; items follow one by one
+            if not event.is_list:
+                return ""
+            self._list_fields.add(event.key)
+            return self._emit(section_header(event.key, field, self.target))
+        
+        if isinstance(event, ListItemCompleted):
+            return self._emit(render_list_item(event.item, field, self.target))
+        
+        if isinstance(event, FieldCompleted):
+            if event.key in self._list_fields:
+                return ""
+            return self._emit(render_section(event.key, event.value, field, self.target))
+        
+        return ""
+    
+    def render_events(self, events: Iterable[StreamEvent]) -> Iterator[str]:
+        """Render a sequence of events, skipping empty fragments"""
+        for event in events:
+            fragment = self.feed(event)
+            if fragment:
+                yield fragment
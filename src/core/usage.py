@@ -0,0 +1,276 @@
+"""
+Token and cost accounting for Vantage AI PersonaPilot
+
+Every model call's token usage is attributed to the persona and session that
+caused it. Attribution travels in a context variable set by PersonaManager, so
+the AI client does not need persona or session parameters. Totals are kept
+per persona, per session and per model in a sharded ledger: each thread
+writes to its own shard (assigned round-robin on first use) so concurrent calls rarely
+contend on a lock, and shards are merged only when queried.
+"""
+
+from typing import Any, Dict, Iterator, List, Optional
+from contextlib import contextmanager
+import contextvars
+import itertools
+import threading
+
+from .chat_sessions import estimate_tokens
+from src.utils.metrics import MODEL_TOKENS, TOKENS_TOTAL, increment, metrics_enabled, observe
+
+# Dimensions usage is aggregated by
+PERSONA = "persona"
+SESSION = "session"
+MODEL = "model"
+DIMENSIONS = (PERSONA, SESSION, MODEL)
+
+UNATTRIBUTED = "unattributed"
+
+# Counter slots of a ledger entry
+_FIELDS = ("calls", "input_tokens", "output_tokens", "cached_tokens", "estimated_calls", "cost")
+
+_attribution: contextvars.ContextVar = contextvars.ContextVar("usage_attribution", default=None)
+
+
+class TokenUsage:
+    """Token counts of one model call"""
+
+    __slots__ = ("input_tokens", "output_tokens", "cached_tokens", "estimated")
+
+    def __init__(self, input_tokens: int, output_tokens: int, cached_tokens: int = 0, estimated: bool = False):
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.cached_tokens = cached_tokens
+        self.estimated = estimated
+
+    @classmethod
+    def from_response(cls, response, prompt: str) -> 'TokenUsage':
+        """Read usage_metadata from a ModelResponse's raw SDK response, estimating if absent"""
+        usage = getattr(getattr(response, "raw", None), "usage_metadata", None)
+        input_tokens = getattr(usage, "prompt_token_count", None)
+        output_tokens = getattr(usage, "candidates_token_count", None)
+        if input_tokens is None or output_tokens is None:
+            return cls.estimate(prompt, response.text)
+        return cls(input_tokens, output_tokens, getattr(usage, "cached_content_token_count", None) or 0)
+
+    @classmethod
+    def estimate(cls, prompt: str, output: str) -> 'TokenUsage':
+        """Estimate usage from text lengths (for backends and streams without metadata)"""
+        return cls(estimate_tokens(prompt), estimate_tokens(output) if output else 0, 0, estimated=True)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cached_tokens": self.cached_tokens,
+            "estimated": self.estimated
+        }
+
+
+def current_attribution() -> Dict[str, str]:
+    """Persona and session the current model calls are attributed to"""
+    return _attribution.get() or {}
+
+
+@contextmanager
+def usage_context(persona: Optional[str] = None, session: Optional[str] = None) -> Iterator[None]:
+    """
+    Attribute model calls made inside the block to a persona and session
+
+    Usage:
+        with usage_context(persona="developer", session=session_id):
+            ai_client.generate_content(prompt)
+    """
+    attribution = dict(current_attribution())
+    if persona is not None:
+        attribution[PERSONA] = persona
+    if session is not None:
+        attribution[SESSION] = session
+    token = _attribution.set(attribution)
+    try:
+        yield
+    finally:
+        _attribution.reset(token)
+
+
+def attributed(iterator: Iterator[Any], persona: Optional[str] = None,
+               session: Optional[str] = None) -> Iterator[Any]:
+    """
+    Wrap a lazy iterator (e.g. a stream) so the calls it makes while iterating are attributed
+
+    Each step runs in a copied context holding the attribution, so it does not
+    leak into the consumer's context even if the consumer is another thread.
+    """
+    attribution = dict(current_attribution())
+    if persona is not None:
+        attribution[PERSONA] = persona
+    if session is not None:
+        attribution[SESSION] = session
+    context = contextvars.copy_context()
+    context.run(_attribution.set, attribution)
+    while True:
+        try:
+            item = context.run(next, iterator)
+        except StopIteration:
+            return
+        yield item
+
+
+class _Shard:
+    __slots__ = ("lock", "entries")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # (dimension, name) -> counter slots
+        self.entries: Dict[tuple, List[float]] = {}
+
+
+class UsageLedger:
+    """Sharded token and cost totals per persona, session and model"""
+
+    def __init__(self,
+                 pricing: Optional[Dict[str, Dict[str, float]]] = None,
+                 shards: int = 16,
+                 max_sessions: int = 100000):
+        """
+        Initialize the ledger
+
+        Args:
+            pricing: Model name -> {"input", "output", "cached"} price per million tokens
+            shards: Number of independently locked shards
+            max_sessions: Session entries kept per ledger; the oldest are dropped beyond this
+        """
+        self.pricing = pricing or {}
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+        self._local = threading.local()
+        self._next_shard = itertools.count()
+        # A session's totals can be spread over several shards, so the cap is
+        # enforced on this ledger-wide list of session ids (oldest first)
+        self.max_sessions = max(1, max_sessions)
+        self._sessions: Dict[str, None] = {}
+        self._sessions_lock = threading.Lock()
+
+    def _shard(self) -> _Shard:
+        """The calling thread's shard, assigned round-robin on its first call"""
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = self._shards[next(self._next_shard) % len(self._shards)]
+        return shard
+
+    def cost(self, model_name: str, usage: TokenUsage) -> float:
+        """Price of a call under the configured pricing (0 for unpriced models)"""
+        prices = self.pricing.get(model_name)
+        if not prices:
+            return 0.0
+        billable_input = usage.input_tokens - usage.cached_tokens
+        return (billable_input * prices.get("input", 0.0)
+                + usage.cached_tokens * prices.get("cached", prices.get("input", 0.0))
+                + usage.output_tokens * prices.get("output", 0.0)) / 1_000_000
+
+    def record(self, model_name: str, usage: TokenUsage, attribution: Optional[Dict[str, str]] = None):
+        """
+        Add one call's usage to the totals
+
+        Args:
+            model_name: Model that served the call
+            usage: Token counts of the call
+            attribution: Persona/session of the call (defaults to the current usage_context)
+        """
+        if attribution is None:
+            attribution = current_attribution()
+        persona = attribution.get(PERSONA, UNATTRIBUTED)
+        session = attribution.get(SESSION)
+        cost = self.cost(model_name, usage)
+        increments = (1, usage.input_tokens, usage.output_tokens, usage.cached_tokens,
+                      1 if usage.estimated else 0, cost)
+        keys = [(PERSONA, persona), (MODEL, model_name)]
+        if session is not None:
+            keys.append((SESSION, session))
+
+        shard = self._shard()
+        new_session = False
+        with shard.lock:
+            entries = shard.entries
+            for key in keys:
+                entry = entries.get(key)
+                if entry is None:
+                    entry = entries[key] = [0, 0, 0, 0, 0, 0.0]
+                    new_session = key[0] == SESSION
+                for slot, amount in enumerate(increments):
+                    entry[slot] += amount
+        if new_session:
+            # Outside the shard lock: eviction locks every shard
+            self._track_session(session)
+
+        if metrics_enabled():
+            observe(MODEL_TOKENS, usage.input_tokens, model=model_name, direction="input")
+            observe(MODEL_TOKENS, usage.output_tokens, model=model_name, direction="output")
+            for direction, amount in (("input", usage.input_tokens), ("output", usage.output_tokens),
+                                      ("cached", usage.cached_tokens)):
+                if amount:
+                    increment(TOKENS_TOTAL, amount, model=model_name, persona=persona, direction=direction)
+
+    def _track_session(self, session_id: str):
+        """Count a session against max_sessions, dropping the oldest session beyond it"""
+        with self._sessions_lock:
+            if session_id in self._sessions:
+                return
+            self._sessions[session_id] = None
+            if len(self._sessions) <= self.max_sessions:
+                return
+            oldest = next(iter(self._sessions))
+            del self._sessions[oldest]
+        self._drop_session(oldest)
+
+    def _drop_session(self, session_id: str):
+        key = (SESSION, session_id)
+        for shard in self._shards:
+            with shard.lock:
+                shard.entries.pop(key, None)
+
+    def totals(self, dimension: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Totals for every name within a dimension
+
+        Args:
+            dimension: persona, session or model
+
+        Returns:
+            Name -> {"calls", "input_tokens", "output_tokens", "cached_tokens", "estimated_calls", "cost"}
+        """
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"Usage dimension '{dimension}' not found. Available: {list(DIMENSIONS)}")
+        merged: Dict[str, List[float]] = {}
+        for shard in self._shards:
+            with shard.lock:
+                snapshot = [(key[1], list(entry)) for key, entry in shard.entries.items() if key[0] == dimension]
+            for name, entry in snapshot:
+                total = merged.get(name)
+                if total is None:
+                    merged[name] = entry
+                else:
+                    for slot, amount in enumerate(entry):
+                        total[slot] += amount
+        return {name: dict(zip(_FIELDS, entry)) for name, entry in merged.items()}
+
+    def get(self, dimension: str, name: str) -> Optional[Dict[str, Any]]:
+        """Totals for one persona, session or model (None if it has no usage)"""
+        return self.totals(dimension).get(name)
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Totals for every dimension"""
+        return {dimension: self.totals(dimension) for dimension in DIMENSIONS}
+
+    def forget_session(self, session_id: str):
+        """Drop the totals of a session"""
+        with self._sessions_lock:
+            self._sessions.pop(session_id, None)
+        self._drop_session(session_id)
+
+    def reset(self):
+        """Clear all totals"""
+        with self._sessions_lock:
+            self._sessions.clear()
+        for shard in self._shards:
+            with shard.lock:
+                shard.entries.clear()
@@ -0,0 +1,465 @@
+"""
+Quantized vector index for the RAG system of Vantage AI PersonaPilot
+
+Embeddings are kept twice:
+
+- compressed codes in memory, scanned for every query:
+  - int8: each vector scaled to [-127, 127] with its own scale (4x smaller
+    than float32)
+  - pq: product quantization; each of pq_subvectors slices is replaced by
+    the id of its nearest of 256 centroids, one byte per slice (dimension * 4 /
+    pq_subvectors times smaller)
+  - none: no compression; the float32 vectors are scanned directly
+- full-precision float32 vectors in vectors.f32, opened with mmap and never
+  read as a whole
+
+PQ codebooks need enough vectors to train on. Until PQ_MIN_TRAINING_VECTORS
+have been added, a pq index scores the float32 vectors exactly; the
+codebooks are then trained on every vector added so far and all rows are
+encoded.
+
+The vector, code and scale files are raw rows that only grow: save() appends
+the rows added since the last save and then replaces meta.json, which holds
+the row count. Rows beyond that count (left by an interrupted save) are
+ignored and overwritten. After reset() the files are written anew and
+swapped in, so maps held by other processes stay valid.
+
+A search scores every vector from its codes, keeps the best
+top_k * rescore_factor candidates and re-scores only those rows with the
+float32 vectors read from disk. The factor trades a few page reads per query
+for recall: 0 returns the approximate ranking as is. Worker processes that
+open the same index share the mapped file through the page cache.
+
+Scores are inner products, i.e. cosine similarity for normalized embeddings.
+numpy is an optional dependency (the "rag" extra).
+"""
+
+from typing import Any, Dict, List, Tuple
+import json
+import logging
+import os
+import threading
+
+from src.utils.lazy_imports import require
+
+logger = logging.getLogger(__name__)
+
+NONE = "none"
+INT8 = "int8"
+PQ = "pq"
+QUANTIZATIONS = (NONE, INT8, PQ)
+
+PQ_CENTROIDS = 256
+# Vectors needed before PQ codebooks are trained (full centroids in every subspace)
+PQ_MIN_TRAINING_VECTORS = 4 * PQ_CENTROIDS
+# Rows encoded per step while (re)encoding with PQ, bounding the distance matrix
+PQ_ENCODE_ROWS = 8192
+
+# Bytes of float32 rows scored per step, bounding the temporary copy of the codes
+SEARCH_CHUNK_BYTES = 32 << 20
+
+META_FILE = "meta.json"
+VECTORS_FILE = "vectors.f32"
+CODES_FILE = "codes.bin"
+SCALES_FILE = "scales.f32"
+CODEBOOKS_FILE = "codebooks.npy"
+# Version of the file layout above, stored in meta.json
+LAYOUT = 2
+
+
+def _numpy() -> Any:
+    return require("numpy", "the vector index")
+
+
+def to_dense(vector: Any, dimension: int) -> Any:
+    """float32 array of a vector (dense sequence/array or sparse {index: value} dictionary)"""
+    np = _numpy()
+    if isinstance(vector, dict):
+        dense = np.zeros(dimension, dtype=np.float32)
+        if vector:
+            indices = np.fromiter(vector.keys(), dtype=np.int64, count=len(vector))
+            dense[indices] = np.fromiter(vector.values(), dtype=np.float32, count=len(vector))
+        return dense
+    return np.asarray(vector, dtype=np.float32).reshape(dimension)
+
+
+def train_product_quantizer(vectors: Any,
+                            subvectors: int,
+                            centroids: int = PQ_CENTROIDS,
+                            iterations: int = 12,
+                            sample: int = 20000,
+                            seed: int = 0) -> Any:
+    """
+    Learn product quantization codebooks with k-means in each subspace
+
+    Args:
+        vectors: Training vectors (n, dimension)
+        subvectors: Number of subspaces (must divide the dimension)
+        centroids: Centroids per subspace (at most 256, fewer if n is smaller)
+        iterations: k-means iterations
+        sample: Most training vectors used
+        seed: Random seed
+
+    Returns:
+        Codebooks of shape (subvectors, centroids, dimension / subvectors)
+    """
+    np = _numpy()
+    rng = np.random.default_rng(seed)
+    if len(vectors) > sample:
+        vectors = vectors[rng.choice(len(vectors), sample, replace=False)]
+    count, dimension = vectors.shape
+    centroids = min(centroids, count)
+    width = dimension // subvectors
+    codebooks = np.empty((subvectors, centroids, width), dtype=np.float32)
+    for index in range(subvectors):
+        data = np.ascontiguousarray(vectors[:, index * width:(index + 1) * width], dtype=np.float32)
+        means = data[rng.choice(count, centroids, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = _nearest(data, means)
+            sums = np.zeros_like(means)
+            np.add.at(sums, assignment, data)
+            sizes = np.bincount(assignment, minlength=centroids)
+            filled = sizes > 0
+            # Empty clusters keep their previous centroid
+            means[filled] = sums[filled] / sizes[filled, None]
+        codebooks[index] = means
+    return codebooks
+
+
+def _append_rows(buffer: Any, used: int, rows: Any) -> Any:
+    """Copy rows after the first `used` rows of a buffer, doubling its capacity when full"""
+    np = _numpy()
+    needed = used + len(rows)
+    if buffer is None or needed > len(buffer):
+        capacity = max(needed, 2 * (len(buffer) if buffer is not None else 0), 1024)
+        grown = np.empty((capacity,) + rows.shape[1:], dtype=rows.dtype)
+        if used:
+            grown[:used] = buffer[:used]
+        buffer = grown
+    buffer[used:needed] = rows
+    return buffer
+
+
+def _nearest(data: Any, means: Any) -> Any:
+    """Index of the nearest mean (L2) for each row"""
+    np = _numpy()
+    distances = (means * means).sum(axis=1)[None, :] - 2.0 * (data @ means.T)
+    return np.argmin(distances, axis=1)
+
+
+class VectorStore:
+    """Append-only vector index with compressed in-memory codes and full vectors on disk"""
+
+    def __init__(self,
+                 path: str,
+                 dimension: int,
+                 quantization: str = INT8,
+                 pq_subvectors: int = 32,
+                 rescore_factor: int = 4):
+        """
+        Open (or create) an index
+
+        Args:
+            path: Directory holding the index files
+            dimension: Vector dimension
+            quantization: none, int8 or pq
+            pq_subvectors: Product quantization slices (bytes per vector; must divide dimension)
+            rescore_factor: Candidates re-scored at full precision per result (0 disables)
+        """
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Quantization '{quantization}' not found. Available: {list(QUANTIZATIONS)}")
+        if quantization == PQ and dimension % pq_subvectors:
+            raise ValueError(f"pq_subvectors ({pq_subvectors}) must divide the dimension ({dimension})")
+        self.path = path
+        self.dimension = dimension
+        self.quantization = quantization
+        self.pq_subvectors = pq_subvectors
+        self.rescore_factor = max(0, rescore_factor)
+        self.codebooks = None
+        # Saved with the index; owners record what the rows were built from
+        self.info: Dict[str, Any] = {}
+        # Saved float32 vectors (memory-mapped) and rows added since the last save
+        self._saved = None
+        self._saved_count = 0
+        self._pending: List[Any] = []
+        # Codes (and int8 scales) of every row, with spare capacity for appends
+        self._codes = None
+        self._scales = None
+        # Rows whose codes are already on disk
+        self._codes_written = 0
+        self._count = 0
+        self._lock = threading.RLock()
+        self._load()
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def compressed(self) -> bool:
+        """Whether searches scan codes (False for none, and for pq until the codebooks are trained)"""
+        return self.quantization == INT8 or (self.quantization == PQ and self.codebooks is not None)
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _code_width(self) -> int:
+        return self.pq_subvectors if self.quantization == PQ else self.dimension
+
+    def _code_dtype(self) -> Any:
+        np = _numpy()
+        return np.uint8 if self.quantization == PQ else np.int8
+
+    def _load(self):
+        """Open a saved index whose settings match; anything else starts empty"""
+        np = _numpy()
+        try:
+            with open(self._file(META_FILE), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return
+        settings = (meta.get("layout"), meta.get("dimension"), meta.get("quantization"), meta.get("pq_subvectors"))
+        if settings != (LAYOUT, self.dimension, self.quantization, self.pq_subvectors):
+            logger.info("Vector index settings changed (%s); the index will be rebuilt", settings)
+            return
+        count = int(meta.get("count", 0))
+        try:
+            if meta.get("trained"):
+                self.codebooks = np.load(self._file(CODEBOOKS_FILE))
+            saved = np.memmap(self._file(VECTORS_FILE), dtype=np.float32, mode="r",
+                              shape=(count, self.dimension)) if count else None
+            if self.compressed:
+                codes = np.fromfile(self._file(CODES_FILE), dtype=self._code_dtype(),
+                                    count=count * self._code_width())
+                if len(codes) != count * self._code_width():
+                    raise ValueError(f"{CODES_FILE} is shorter than {count} rows")
+                self._codes = codes.reshape(count, self._code_width())
+            if self.quantization == INT8:
+                scales = np.fromfile(self._file(SCALES_FILE), dtype=np.float32, count=count)
+                if len(scales) != count:
+                    raise ValueError(f"{SCALES_FILE} is shorter than {count} rows")
+                self._scales = scales
+        except (OSError, ValueError) as e:
+            logger.error("Error loading vector index: %s", e)
+            self._codes = self._scales = self.codebooks = None
+            return
+        self._saved = saved
+        self._saved_count = self._codes_written = self._count = count
+        self.info = dict(meta.get("info") or {})
+
+    def add(self, vectors: Any):
+        """
+        Add vectors (rows get the next ids, starting at len(store))
+
+        With pq, the codebooks are trained once PQ_MIN_TRAINING_VECTORS rows
+        have been added, on all of them; later batches are encoded with the
+        same codebooks.
+        """
+        np = _numpy()
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimension)
+        if not len(vectors):
+            return
+        with self._lock:
+            used = self._count
+            self._pending.append(vectors)
+            self._count += len(vectors)
+            if self.quantization == INT8:
+                codes, scales = self._encode_int8(vectors)
+                self._codes = _append_rows(self._codes, used, codes)
+                self._scales = _append_rows(self._scales, used, scales)
+            elif self.quantization == PQ:
+                if self.codebooks is not None:
+                    self._codes = _append_rows(self._codes, used, self._encode_pq(vectors))
+                elif self._count >= PQ_MIN_TRAINING_VECTORS:
+                    self._train_pq()
+
+    def _train_pq(self):
+        """Train the codebooks on every row and encode all of them"""
+        rows = self._full_rows(0, self._count)
+        logger.info("Training product quantizer on %s vectors", len(rows))
+        self.codebooks = train_product_quantizer(rows, self.pq_subvectors)
+        self._codes = self._encode_pq(rows)
+        # Every code is new, so the codes file is rewritten on the next save
+        self._codes_written = 0
+
+    def _encode_int8(self, vectors: Any) -> Tuple[Any, Any]:
+        np = _numpy()
+        peaks = np.abs(vectors).max(axis=1)
+        scales = np.where(peaks > 0, peaks / 127.0, 1.0).astype(np.float32)
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales
+
+    def _encode_pq(self, vectors: Any) -> Any:
+        np = _numpy()
+        width = self.dimension // self.pq_subvectors
+        codes = np.empty((len(vectors), self.pq_subvectors), dtype=np.uint8)
+        for start in range(0, len(vectors), PQ_ENCODE_ROWS):
+            block = vectors[start:start + PQ_ENCODE_ROWS]
+            for index in range(self.pq_subvectors):
+                data = block[:, index * width:(index + 1) * width]
+                codes[start:start + len(block), index] = _nearest(data, self.codebooks[index])
+        return codes
+
+    def reset(self):
+        """Remove every vector (and the PQ codebooks)"""
+        with self._lock:
+            self._saved = None
+            self._saved_count = 0
+            self._pending = []
+            self._codes = self._scales = None
+            self._codes_written = 0
+            self.codebooks = None
+            self._count = 0
+
+    def save(self):
+        """Append the rows added since the last save and map the full vectors from disk"""
+        np = _numpy()
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            saved = self._saved_count
+            if self._pending or not saved:
+                pending = self._pending_rows()
+                self._append(VECTORS_FILE, pending, saved * self.dimension * 4)
+            if self.compressed:
+                start, stop = self._codes_written, self._count
+                codes = self._codes[start:stop]
+                self._append(CODES_FILE, codes, start * codes.itemsize * self._code_width())
+                if self.quantization == INT8:
+                    self._append(SCALES_FILE, self._scales[start:stop], start * 4)
+                if self.quantization == PQ and start == 0:
+                    self._replace(CODEBOOKS_FILE, lambda f: np.save(f, self.codebooks))
+            meta = {
+                "layout": LAYOUT,
+                "dimension": self.dimension,
+                "quantization": self.quantization,
+                "pq_subvectors": self.pq_subvectors,
+                "trained": self.codebooks is not None,
+                "count": self._count,
+                "info": self.info
+            }
+            # Replaced last: the rows appended above only count once it names them
+            self._replace(META_FILE, lambda f: f.write(json.dumps(meta).encode("utf-8")))
+            self._saved = np.memmap(self._file(VECTORS_FILE), dtype=np.float32, mode="r",
+                                    shape=(self._count, self.dimension)) if self._count else None
+            self._saved_count = self._codes_written = self._count
+            self._pending = []
+
+    def _append(self, name: str, rows: Any, offset: int):
+        """Write rows at a byte offset of a file, dropping anything after it"""
+        if not offset:
+            self._replace(name, rows.tofile)
+            return
+        with open(self._file(name), 'r+b') as f:
+            f.truncate(offset)
+            f.seek(offset)
+            rows.tofile(f)
+
+    def _replace(self, name: str, write):
+        """Write a file beside the current one and swap it in, so open maps stay valid"""
+        # Per process, in case several processes save the same index
+        temporary = self._file(f".{name}.{os.getpid()}.tmp")
+        with open(temporary, 'wb') as f:
+            write(f)
+        os.replace(temporary, self._file(name))
+
+    def _pending_rows(self) -> Any:
+        np = _numpy()
+        if not self._pending:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        if len(self._pending) > 1:
+            self._pending = [np.concatenate(self._pending)]
+        return self._pending[0]
+
+    def _full_rows(self, start: int, stop: int) -> Any:
+        """float32 vectors of rows [start, stop)"""
+        np = _numpy()
+        saved = self._saved_count
+        parts = []
+        if start < saved:
+            parts.append(self._saved[start:min(stop, saved)])
+        if stop > saved and self._pending:
+            parts.append(self._pending_rows()[max(0, start - saved):stop - saved])
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def _exact_scores(self, ids: Any, query: Any) -> Any:
+        np = _numpy()
+        order = np.argsort(ids)
+        sorted_ids = ids[order]
+        saved = self._saved_count
+        rows = np.empty((len(ids), self.dimension), dtype=np.float32)
+        on_disk = sorted_ids < saved
+        if on_disk.any():
+            # Reads only the pages of the candidate rows
+            rows[on_disk] = self._saved[sorted_ids[on_disk]]
+        if not on_disk.all():
+            rows[~on_disk] = self._pending_rows()[sorted_ids[~on_disk] - saved]
+        scores = np.empty(len(ids), dtype=np.float32)
+        scores[order] = rows @ query
+        return scores
+
+    def _approximate_scores(self, query: Any) -> Any:
+        np = _numpy()
+        scores = np.empty(self._count, dtype=np.float32)
+        compressed = self.compressed
+        if self.quantization == PQ and compressed:
+            width = self.dimension // self.pq_subvectors
+            table = np.einsum("mkd,md->mk", self.codebooks, query.reshape(self.pq_subvectors, width))
+            columns = np.arange(self.pq_subvectors)
+        codes, scales = self._codes, self._scales
+        step = max(1024, SEARCH_CHUNK_BYTES // (self.dimension * 4))
+        for start in range(0, self._count, step):
+            stop = min(start + step, self._count)
+            if not compressed:
+                scores[start:stop] = self._full_rows(start, stop) @ query
+            elif self.quantization == INT8:
+                scores[start:stop] = (codes[start:stop].astype(np.float32) @ query) * scales[start:stop]
+            else:
+                scores[start:stop] = table[columns, codes[start:stop]].sum(axis=1)
+        return scores
+
+    def search(self, query: Any, top_k: int = 5) -> List[Tuple[int, float]]:
+        """
+        Find the vectors most similar to a query
+
+        Args:
+            query: Query vector (dense or sparse dictionary)
+            top_k: Number of results
+
+        Returns:
+            (row id, score) pairs, best first
+        """
+        np = _numpy()
+        query = to_dense(query, self.dimension)
+        with self._lock:
+            if not self._count or top_k <= 0:
+                return []
+            scores = self._approximate_scores(query)
+            rescore = self.compressed and self.rescore_factor > 0
+            keep = min(self._count, top_k * self.rescore_factor if rescore else top_k)
+            candidates = np.argpartition(-scores, keep - 1)[:keep] if keep < self._count else np.arange(self._count)
+            candidate_scores = self._exact_scores(candidates, query) if rescore else scores[candidates]
+        best = np.argsort(-candidate_scores)[:top_k]
+        return [(int(candidates[index]), float(candidate_scores[index])) for index in best]
+
+    def memory_bytes(self) -> int:
+        """Bytes scanned from memory per query (the float32 vectors when not compressed)"""
+        with self._lock:
+            if not self.compressed:
+                return self._count * self.dimension * 4
+            total = self._count * self._code_width() * self._codes.itemsize
+            if self._scales is not None:
+                total += self._count * self._scales.itemsize
+            if self.codebooks is not None:
+                total += self.codebooks.nbytes
+            return total
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "vectors": self._count,
+            "dimension": self.dimension,
+            "quantization": self.quantization,
+            "pq_subvectors": self.pq_subvectors if self.quantization == PQ else None,
+            "compressed": self.compressed,
+            "rescore_factor": self.rescore_factor,
+            "memory_bytes": self.memory_bytes(),
+            "full_precision_bytes": self._count * self.dimension * 4
+        }
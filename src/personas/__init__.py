@@ -1,21 +1,36 @@
 """
 Persona definitions for Vantage AI PersonaPilot
+
+Persona classes are imported lazily on attribute access so that importing the
+package (or one persona) does not load every persona module.
 """
 
-from src.personas.base_persona import BasePersona
-from src.personas.college_student import CollegeStudent
-from src.personas.budget_traveler import BudgetTraveler
-from src.personas.developer import Developer
-from src.personas.startup_founder import StartupFounder
-from src.personas.sci_fi_writer import SciFiWriter
-from src.personas.businessman import Businessman
-
-__all__ = [
-    'BasePersona',
-    'CollegeStudent',
-    'BudgetTraveler', 
-    'Developer',
-    'StartupFounder',
-    'SciFiWriter',
-    'Businessman'
-]
+import importlib
+
+_EXPORTS = {
+    'BasePersona': 'src.personas.base_persona',
+    'PersonaState': 'src.personas.persona_state',
+    'ContextMemory': 'src.personas.context_memory',
+    'DefinedPersona': 'src.personas.defined_persona',
+    'PersonaRegistry': 'src.personas.registry',
+    'CollegeStudent': 'src.personas.college_student',
+    'BudgetTraveler': 'src.personas.budget_traveler',
+    'Developer': 'src.personas.developer',
+    'StartupFounder': 'src.personas.startup_founder',
+    'SciFiWriter': 'src.personas.sci_fi_writer',
+    'Businessman': 'src.personas.businessman'
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
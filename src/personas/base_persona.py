@@ -4,11 +4,17 @@ Base Persona class for Vantage AI PersonaPilot
 
 from abc import ABC, abstractmethod
 from typing import Dict, Any, List, Optional
-import json
 import os
+from src.core.query_analysis import QueryAnalysis
+from src.core.response_schema import format_instructions
+from src.personas.persona_state import PersonaState
 
 class BasePersona(ABC):
-    """Abstract base class for all personas"""
+    """Abstract base class for all personas
+    
+    A persona instance is a read-only definition shared by every session;
+    per-session context and preferences live in a PersonaState.
+    """
     
     def __init__(self, name: str, description: str):
         self.name = name
@@ -17,7 +23,6 @@ class BasePersona(ABC):
         self.expertise_areas = []
         self.communication_style = ""
         self.output_preferences = {}
-        self.context_memory = []
         
     @abstractmethod
     def get_system_prompt(self) -> str:
@@ -34,41 +39,45 @@ class BasePersona(ABC):
         """Get preferred output format for this persona"""
         pass
     
-    def add_context(self, context: str):
-        """Add context to persona's memory"""
-        self.context_memory.append(context)
-        # Keep only last 10 contexts
-        if len(self.context_memory) > 10:
-            self.context_memory = self.context_memory[-10:]
+    def create_state(self, max_context: int = 10) -> PersonaState:
+        """Create fresh per-session state for this persona, remembering up to max_context entries"""
+        return PersonaState(self.name, self.output_preferences, max_context)
     
-    def get_context_summary(self) -> str:
-        """Get summary of recent context"""
-        if not self.context_memory:
-            return ""
-        return f"Recent context: {'; '.join(self.context_memory[-3:])}"
+    def get_output_format_for_query(self, query: str, state: Optional[PersonaState] = None) -> Dict[str, Any]:
+        """Get the output format to request for a query (override to adapt per query)"""
+        return self.get_output_format()
     
-    def format_prompt(self, query: str, context: Optional[str] = None) -> str:
-        """Format a complete prompt for this persona"""
+    def format_prompt(self, 
+                      query: str, 
+                      context: Optional[str] = None,
+                      state: Optional[PersonaState] = None,
+                      include_format_instructions: bool = True,
+                      analysis: Optional[QueryAnalysis] = None) -> str:
+        """
+        Format a complete prompt for this persona
+        
+        Args:
+            query: User's query
+            context: Optional context information
+            state: Per-session state providing context memory
+            include_format_instructions: Append the JSON output structure; leave
+                this off when the model is given the structure as a response schema
+            analysis: Analysis of the query, reused for context memory recall
+        """
         system_prompt = self.get_system_prompt()
         
         # Add context if provided
         context_part = ""
         if context:
             context_part = f"\n\nContext: {context}"
-        elif self.context_memory:
-            context_part = f"\n\n{self.get_context_summary()}"
+        elif state is not None and state.context_memory:
+            context_part = f"\n\n{state.get_context_summary(query, analysis)}"
         
-        # Add output format instructions with clear JSON formatting guidelines
-        output_format = self.get_output_format()
-        format_instructions = f"""
-\nPlease provide your response in valid JSON format exactly matching this structure: 
-```json
-{json.dumps(output_format, indent=2)}
-```
-
-IMPORTANT: Your response MUST be valid JSON. Ensure all strings are properly quoted with double quotes, avoid trailing commas, and escape special characters correctly. Do not include any text outside the JSON structure."""
+        format_part = ""
+        if include_format_instructions:
+            format_part = format_instructions(self.get_output_format_for_query(query, state))
         
-        return f"{system_prompt}{context_part}\n\nUser Query: {query}{format_instructions}"
+        return f"{system_prompt}{context_part}\n\nUser Query: {query}{format_part}"
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert persona to dictionary"""
@@ -3,8 +3,8 @@ College Student Persona for Vantage AI PersonaPilot
 """
 
 from typing import Dict, Any, List, Optional
-import json
 from src.personas.base_persona import BasePersona
+from src.personas.persona_state import PersonaState
 
 class CollegeStudent(BasePersona):
     """College Student persona - focused on academic and personal development"""
@@ -77,17 +77,22 @@ IMPORTANT: Your response format will be dynamically adjusted based on the user's
             "Plan my week to balance classes and part-time work"
         ]
     
-    def _analyze_query_for_preferences(self, query: str) -> None:
+    def _analyze_query_for_preferences(self, query: str) -> Dict[str, Any]:
         """Analyze the user query to determine if time and cost details are requested"""
         # Check for time-related keywords
         time_keywords = ["time", "duration", "how long", "timeline", "schedule", "when", "hours", "minutes", "days"]
         cost_keywords = ["cost", "price", "budget", "money", "expense", "spend", "cheap", "affordable", "free"]
         
-        # Set preferences based on query content
-        self.output_preferences["include_time_estimates"] = any(keyword in query.lower() for keyword in time_keywords)
-        self.output_preferences["include_cost_estimates"] = any(keyword in query.lower() for keyword in cost_keywords)
+        # Derive preferences for this query without touching the shared definition
+        query_lower = query.lower()
+        preferences = dict(self.output_preferences)
+        preferences["include_time_estimates"] = any(keyword in query_lower for keyword in time_keywords)
+        preferences["include_cost_estimates"] = any(keyword in query_lower for keyword in cost_keywords)
+        return preferences
     
-    def get_output_format(self) -> Dict[str, Any]:
+    def get_output_format(self, preferences: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        preferences = preferences or self.output_preferences
+        
         # Base format that's always included
         output_format = {
             "summary": "Brief overview of the solution",
@@ -103,41 +108,22 @@ IMPORTANT: Your response format will be dynamically adjusted based on the user's
         }
         
         # Add optional fields based on preferences
-        if self.output_preferences.get("include_time_estimates", False):
+        if preferences.get("include_time_estimates", False):
             for item in output_format["action_items"]:
                 item["time_required"] = "Estimated time"
                 
-        if self.output_preferences.get("include_cost_estimates", False):
+        if preferences.get("include_cost_estimates", False):
             for item in output_format["action_items"]:
                 item["cost"] = "Estimated cost (if any)"
                 
-        if self.output_preferences.get("include_time_estimates", False):
+        if preferences.get("include_time_estimates", False):
             output_format["timeline"] = "Suggested timeline for implementation"
             
         return output_format
         
-    def format_prompt(self, query: str, context: Optional[str] = None) -> str:
-        """Format a complete prompt for this persona"""
-        # Analyze query to set appropriate preferences
-        self._analyze_query_for_preferences(query)
-        
-        system_prompt = self.get_system_prompt()
-        
-        # Add context if provided
-        context_part = ""
-        if context:
-            context_part = f"\n\nContext: {context}"
-        elif self.context_memory:
-            context_part = f"\n\n{self.get_context_summary()}"
-        
-        # Add output format instructions with clear JSON formatting guidelines
-        output_format = self.get_output_format()
-        format_instructions = f"""
-\nPlease provide your response in valid JSON format exactly matching this structure: 
-```json
-{json.dumps(output_format, indent=2)}
-```
-
-IMPORTANT: Your response MUST be valid JSON. Ensure all strings are properly quoted with double quotes, avoid trailing commas, and escape special characters correctly. Do not include any text outside the JSON structure."""
-        
-        return f"{system_prompt}{context_part}\n\nUser Query: {query}{format_instructions}"
+    def get_output_format_for_query(self, query: str, state: Optional[PersonaState] = None) -> Dict[str, Any]:
+        """Get the output format with time/cost fields only when the query asks for them"""
+        preferences = self._analyze_query_for_preferences(query)
+        if state is not None:
+            state.output_preferences = preferences
+        return self.get_output_format(preferences)
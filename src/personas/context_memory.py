@@ -0,0 +1,171 @@
+"""
+Bounded context memory with relevance-based recall for Vantage AI PersonaPilot
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from collections import deque
+import math
+import re
+import zlib
+from src.core.chat_sessions import estimate_tokens
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Words too common to say anything about relevance
+STOP_WORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "can", "do", "for", "from",
+    "how", "i", "in", "is", "it", "me", "my", "of", "on", "or", "so", "that", "the",
+    "this", "to", "was", "we", "what", "with", "you", "your"
+})
+
+EMBEDDING_DIM = 1 << 12
+
+# Smallest leftover budget worth filling with a truncated context
+MIN_TRUNCATED_TOKENS = 16
+
+
+def truncate_to_tokens(text: str, tokens: int) -> str:
+    """Cut text to about `tokens` estimated tokens, ending with an ellipsis if shortened"""
+    max_chars = tokens * 4
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars - 1]
+    # Prefer ending on a word boundary when one is reasonably close
+    space = cut.rfind(" ")
+    if space > max_chars // 2:
+        cut = cut[:space]
+    return cut.rstrip() + "…"
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens of a text"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def embed_text(text: str) -> Dict[int, float]:
+    """Embed text as a normalized hashed bag-of-words sparse vector"""
+    return embed_tokens(tokenize(text))
+
+
+def embed_tokens(tokens: Iterable[str]) -> Dict[int, float]:
+    """Embed already tokenized (lowercase) text; see embed_text"""
+    counts: Dict[int, float] = {}
+    for token in tokens:
+        if token in STOP_WORDS:
+            continue
+        bucket = zlib.crc32(token.encode("utf-8")) & (EMBEDDING_DIM - 1)
+        counts[bucket] = counts.get(bucket, 0.0) + 1.0
+    norm = math.sqrt(sum(value * value for value in counts.values()))
+    if norm:
+        for bucket in counts:
+            counts[bucket] /= norm
+    return counts
+
+
+def cosine_similarity(left: Dict[int, float], right: Dict[int, float]) -> float:
+    """Cosine similarity of two normalized sparse vectors"""
+    if len(left) > len(right):
+        left, right = right, left
+    return sum(value * right.get(bucket, 0.0) for bucket, value in left.items())
+
+
+class MemoryEntry:
+    """One remembered context with its embedding"""
+    
+    __slots__ = ("sequence", "text", "vector", "tokens")
+    
+    def __init__(self, sequence: int, text: str):
+        self.sequence = sequence
+        self.text = text
+        self.vector = embed_text(text)
+        self.tokens = estimate_tokens(text)
+
+
+class ContextMemory:
+    """Fixed-capacity ring buffer of contexts with a small embedding index
+    
+    Appending never copies: once full, the oldest entry is dropped in O(1).
+    Recall ranks entries by similarity to the query and packs the best ones
+    into a token budget.
+    """
+    
+    __slots__ = ("capacity", "_entries", "_sequence")
+    
+    def __init__(self, capacity: int = 10):
+        self.capacity = capacity
+        self._entries: "deque[MemoryEntry]" = deque(maxlen=capacity)
+        self._sequence = 0
+    
+    def add(self, text: str):
+        """Remember a context, evicting the oldest one when full"""
+        self._entries.append(MemoryEntry(self._sequence, text))
+        self._sequence += 1
+    
+    def recent(self, count: int) -> List[str]:
+        """Get the `count` most recent contexts, oldest first"""
+        if count <= 0:
+            return []
+        start = max(0, len(self._entries) - count)
+        return [self._entries[i].text for i in range(start, len(self._entries))]
+    
+    def recall(self, 
+               query: Optional[str] = None, 
+               token_budget: int = 256,
+               max_items: int = 3,
+               analysis: Optional[Any] = None) -> List[str]:
+        """
+        Get the contexts most relevant to a query within a token budget
+        
+        Contexts are taken best first. One that does not fit in what is left
+        of the budget is truncated to fill it rather than left out.
+        
+        Args:
+            query: Query to rank contexts against (None ranks by recency only)
+            token_budget: Maximum estimated tokens of returned contexts
+            max_items: Maximum number of contexts returned
+            analysis: QueryAnalysis of the query, whose embedding is reused
+        
+        Returns:
+            Selected contexts in the order they were added
+        """
+        if not self._entries:
+            return []
+        
+        if query:
+            query_vector = analysis.embedding if analysis is not None else embed_text(query)
+            ranked: List[Tuple[float, int, MemoryEntry]] = [
+                (cosine_similarity(query_vector, entry.vector), entry.sequence, entry)
+                for entry in self._entries
+            ]
+            # Most similar first; recency breaks ties (including all-zero scores)
+            ranked.sort(key=lambda item: (item[0], item[1]), reverse=True)
+            candidates = [entry for _, _, entry in ranked]
+        else:
+            candidates = list(reversed(self._entries))
+        
+        selected: List[Tuple[int, str]] = []
+        used = 0
+        for entry in candidates:
+            if len(selected) >= max_items:
+                break
+            remaining = token_budget - used
+            if entry.tokens <= remaining:
+                selected.append((entry.sequence, entry.text))
+                used += entry.tokens
+            elif remaining >= MIN_TRUNCATED_TOKENS:
+                # A context too long for what is left is cut to fit, filling the budget
+                selected.append((entry.sequence, truncate_to_tokens(entry.text, remaining)))
+                break
+        
+        selected.sort()
+        return [text for _, text in selected]
+    
+    def clear(self):
+        """Forget all contexts"""
+        self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __iter__(self) -> Iterator[str]:
+        return (entry.text for entry in self._entries)
@@ -0,0 +1,67 @@
+"""
+Data-defined persona for Vantage AI PersonaPilot
+"""
+
+from typing import Dict, Any, List
+import copy
+from src.personas.base_persona import BasePersona
+
+DEFAULT_OUTPUT_FORMAT = {
+    "summary": "Brief overview of the answer",
+    "action_items": [
+        {
+            "step": "Numbered step",
+            "action": "Specific action to take"
+        }
+    ],
+    "tips": ["Practical tips"],
+    "next_steps": "What to do next"
+}
+
+
+class DefinedPersona(BasePersona):
+    """Persona built from a JSON/YAML definition instead of a Python class"""
+    
+    def __init__(self, definition: Dict[str, Any]):
+        super().__init__(
+            name=definition["name"],
+            description=definition.get("description", "")
+        )
+        
+        self.personality_traits = list(definition.get("personality_traits", []))
+        self.expertise_areas = list(definition.get("expertise_areas", []))
+        self.communication_style = definition.get("communication_style", "")
+        self.output_preferences = dict(definition.get("output_preferences", {"format": "structured_list"}))
+        
+        self._system_prompt = definition.get("system_prompt") or self._build_system_prompt()
+        self._example_queries = list(definition.get("example_queries", []))
+        self._output_format = definition.get("output_format") or DEFAULT_OUTPUT_FORMAT
+    
+    def _build_system_prompt(self) -> str:
+        """Build a system prompt from the descriptive fields"""
+        lines = [f"You are a {self.name.replace('_', ' ')} persona - {self.description}."]
+        if self.personality_traits:
+            lines.append(f"\nYour characteristics: {', '.join(self.personality_traits)}.")
+        if self.expertise_areas:
+            lines.append(f"Your areas of expertise: {', '.join(self.expertise_areas)}.")
+        if self.communication_style:
+            lines.append(f"Communication style: {self.communication_style}.")
+        return "\n".join(lines)
+    
+    def get_system_prompt(self) -> str:
+        return self._system_prompt
+    
+    def get_example_queries(self) -> List[str]:
+        return list(self._example_queries)
+    
+    def get_output_format(self) -> Dict[str, Any]:
+        # Callers may mutate the returned structure; keep the definition intact
+        return copy.deepcopy(self._output_format)
+    
+    def to_definition(self) -> Dict[str, Any]:
+        """Convert back to a definition that can be saved and reloaded"""
+        definition = self.to_dict()
+        definition["system_prompt"] = self._system_prompt
+        definition["example_queries"] = self.get_example_queries()
+        definition["output_format"] = self.get_output_format()
+        return definition
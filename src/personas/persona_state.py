@@ -0,0 +1,40 @@
+"""
+Per-session persona state for Vantage AI PersonaPilot
+"""
+
+from typing import Dict, Any, Optional
+from src.core.query_analysis import QueryAnalysis, analyze_query
+from src.personas.context_memory import ContextMemory
+
+
+class PersonaState:
+    """Mutable state of one persona within one user session
+    
+    Persona instances are shared, read-only definitions; everything that changes
+    while a user talks to a persona lives here instead.
+    """
+    
+    __slots__ = ("persona_name", "context_memory", "output_preferences", "context_token_budget")
+    
+    def __init__(self, 
+                 persona_name: str, 
+                 output_preferences: Dict[str, Any], 
+                 max_context: int = 10,
+                 context_token_budget: int = 256):
+        self.persona_name = persona_name
+        self.context_memory = ContextMemory(max_context)
+        self.output_preferences = dict(output_preferences)
+        self.context_token_budget = context_token_budget
+    
+    def add_context(self, context: str):
+        """Add context to this session's memory"""
+        self.context_memory.add(context)
+    
+    def get_context_summary(self, query: Optional[str] = None, analysis: Optional[QueryAnalysis] = None) -> str:
+        """Get the remembered context most relevant to the query"""
+        if query and analysis is None:
+            analysis = analyze_query(query)
+        recalled = self.context_memory.recall(query, self.context_token_budget, analysis=analysis)
+        if not recalled:
+            return ""
+        return f"Recent context: {'; '.join(recalled)}"
@@ -0,0 +1,234 @@
+"""
+Lazy persona registry with plugin discovery for Vantage AI PersonaPilot
+"""
+
+from typing import Dict, Any, Callable, List, Optional, Union
+import importlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from src.personas.base_persona import BasePersona
+
+logger = logging.getLogger(__name__)
+
+# Built-in personas as "module:Class" specs, imported on first use
+BUILTIN_PERSONAS = {
+    "college_student": "src.personas.college_student:CollegeStudent",
+    "budget_traveler": "src.personas.budget_traveler:BudgetTraveler",
+    "developer": "src.personas.developer:Developer",
+    "startup_founder": "src.personas.startup_founder:StartupFounder",
+    "sci_fi_writer": "src.personas.sci_fi_writer:SciFiWriter",
+    "businessman": "src.personas.businessman:Businessman"
+}
+
+# Installed packages can expose personas under this entry point group
+ENTRY_POINT_GROUP = "vantage_ai.personas"
+
+DEFINITION_EXTENSIONS = (".json", ".yaml", ".yml")
+
+# Names of defined personas double as file names in the data directory
+PERSONA_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+
+# Minimum seconds between rescans triggered by unknown persona names
+MISS_RESCAN_INTERVAL = 1.0
+
+PersonaFactory = Callable[[], BasePersona]
+
+
+def load_spec(spec: str) -> Any:
+    """Import an object from a "module:attribute" spec"""
+    module_name, _, attribute = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def load_definition_file(path: str) -> Dict[str, Any]:
+    """Read a persona definition from a JSON or YAML file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith(".json"):
+            return json.load(f)
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError(f"PyYAML is required to load persona definition {path}")
+        return yaml.safe_load(f)
+
+
+class PersonaRegistry:
+    """Registry of persona factories, instantiated lazily and cached
+    
+    Sources, in listing order: built-in personas, entry point plugins and
+    definition files in the data directory. The data directory is rescanned on
+    refresh() and when an unknown persona is requested (at most once per
+    MISS_RESCAN_INTERVAL), so new definitions are picked up without a restart.
+    """
+    
+    def __init__(self, 
+                 data_dir: Optional[str] = None,
+                 include_builtins: bool = True,
+                 discover_entry_points: bool = True):
+        self.data_dir = data_dir
+        self._factories: Dict[str, PersonaFactory] = {}
+        self._instances: Dict[str, BasePersona] = {}
+        self._file_mtimes: Dict[str, float] = {}
+        self._lock = threading.RLock()
+        # Entry point discovery imports importlib.metadata and scans installed
+        # distributions, so it is deferred until a listing or unknown name needs it
+        self._entry_points_pending = discover_entry_points
+        self._last_miss_scan = float("-inf")
+        
+        if include_builtins:
+            for name, spec in BUILTIN_PERSONAS.items():
+                self.register(name, spec)
+        self._scan_data_dir()
+    
+    def register(self, name: str, factory: Union[str, PersonaFactory], replace: bool = True):
+        """
+        Register a persona factory
+        
+        Args:
+            name: Persona name
+            factory: Zero-argument callable or "module:Class" spec returning a persona
+            replace: Replace an existing registration (drops its cached instance)
+        """
+        if isinstance(factory, str):
+            spec = factory
+            factory = lambda: load_spec(spec)()
+        with self._lock:
+            if name in self._factories and not replace:
+                return
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+    
+    def register_definition(self, definition: Dict[str, Any], persist: bool = False) -> str:
+        """
+        Register a persona from a definition dictionary
+        
+        Args:
+            definition: Persona definition (name, description, system_prompt, output_format, ...)
+            persist: Also save the definition as JSON in the data directory
+        
+        Returns:
+            Registered persona name
+        """
+        from src.personas.defined_persona import DefinedPersona
+        
+        if not definition.get("name"):
+            raise ValueError("Persona definition requires a 'name'")
+        name = definition["name"]
+        if not isinstance(name, str) or not PERSONA_NAME_PATTERN.match(name):
+            raise ValueError(
+                f"Invalid persona name {name!r}: use only letters, digits, '_' and '-'"
+            )
+        
+        if persist:
+            if not self.data_dir:
+                raise ValueError("Cannot persist persona definition without a data directory")
+            os.makedirs(self.data_dir, exist_ok=True)
+            path = os.path.join(self.data_dir, f"{name}.json")
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(definition, f, indent=2, ensure_ascii=False)
+            with self._lock:
+                self._file_mtimes[path] = os.path.getmtime(path)
+        
+        self.register(name, lambda: DefinedPersona(definition))
+        logger.info("Registered persona definition: %s", name)
+        return name
+    
+    def _discover_entry_points(self):
+        """Register personas exposed by installed packages (once)"""
+        if not self._entry_points_pending:
+            return
+        self._entry_points_pending = False
+        try:
+            from importlib.metadata import entry_points
+            discovered = entry_points()
+            if hasattr(discovered, "select"):
+                group = discovered.select(group=ENTRY_POINT_GROUP)
+            else:
+                group = discovered.get(ENTRY_POINT_GROUP, [])
+        except Exception as e:
+            logger.warning("Persona entry point discovery failed: %s", e)
+            return
+        
+        for entry_point in group:
+            # Bind the entry point now; loading it is deferred until first use
+            self.register(entry_point.name, lambda ep=entry_point: ep.load()(), replace=False)
+    
+    def _scan_data_dir(self) -> int:
+        """Register new or changed definition files; returns how many were loaded"""
+        if not self.data_dir or not os.path.isdir(self.data_dir):
+            return 0
+        
+        loaded = 0
+        for filename in sorted(os.listdir(self.data_dir)):
+            if not filename.endswith(DEFINITION_EXTENSIONS):
+                continue
+            path = os.path.join(self.data_dir, filename)
+            try:
+                mtime = os.path.getmtime(path)
+                if self._file_mtimes.get(path) == mtime:
+                    continue
+                definition = load_definition_file(path)
+                self._file_mtimes[path] = mtime
+                self.register_definition(definition)
+                loaded += 1
+            except Exception as e:
+                logger.error("Error loading persona definition %s: %s", filename, e)
+        return loaded
+    
+    def refresh(self) -> int:
+        """Pick up new or changed definition files without a restart"""
+        with self._lock:
+            self._discover_entry_points()
+            return self._scan_data_dir()
+    
+    def names(self) -> List[str]:
+        """Get the names of all registered personas (without instantiating them)"""
+        with self._lock:
+            self._discover_entry_points()
+            return list(self._factories.keys())
+    
+    def _rescan_on_miss(self):
+        """Rescan for an unknown name, rate limited so repeated misses stay cheap (caller holds the lock)"""
+        now = time.monotonic()
+        if now - self._last_miss_scan < MISS_RESCAN_INTERVAL:
+            return
+        self._last_miss_scan = now
+        self._discover_entry_points()
+        self._scan_data_dir()
+    
+    def __contains__(self, name: str) -> bool:
+        if name in self._factories:
+            return True
+        with self._lock:
+            if name not in self._factories:
+                # Same discovery as get(), so a definition file added at runtime is found
+                self._rescan_on_miss()
+            return name in self._factories
+    
+    def is_loaded(self, name: str) -> bool:
+        """Check whether a persona has been instantiated"""
+        with self._lock:
+            return name in self._instances
+    
+    def get(self, name: str) -> BasePersona:
+        """Get a persona, instantiating it on first use"""
+        persona = self._instances.get(name)
+        if persona is not None:
+            return persona
+        
+        with self._lock:
+            persona = self._instances.get(name)
+            if persona is not None:
+                return persona
+            if name not in self._factories:
+                self._rescan_on_miss()
+            if name not in self._factories:
+                raise KeyError(name)
+            persona = self._factories[name]()
+            self._instances[name] = persona
+            logger.info("Initialized persona: %s", name)
+            return persona
@@ -2,10 +2,11 @@
 Utility modules for Vantage AI PersonaPilot
 """
 
-from src.utils.config import Config
+from src.utils.config import Config, get_config
 from src.utils.logger import setup_logger
 
 __all__ = [
     'Config',
+    'get_config',
     'setup_logger'
 ]
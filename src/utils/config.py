@@ -3,36 +3,138 @@ Configuration management for Vantage AI PersonaPilot
 """
 
 import os
-from typing import Dict, Any, Optional
-from dotenv import load_dotenv
+import json
+import functools
+from typing import Dict, Any, List, Optional
+
+@functools.lru_cache(maxsize=None)
+def load_environment() -> bool:
+    """Load the .env file into the environment once per process"""
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return False
+    return load_dotenv()
 
 class Config:
     """Configuration management class"""
     
     def __init__(self):
-        # Load environment variables
-        load_dotenv()
+        # Load environment variables (only the first Config reads .env)
+        load_environment()
         
         # API Configuration
         self.gemini_api_key = os.getenv('GEMINI_API_KEY')
         self.default_model = os.getenv('DEFAULT_MODEL', 'gemini-2.0-flash-exp')
         
+        # Model Backend Configuration (gemini, gemini_rest or stub)
+        self.model_backend = os.getenv('MODEL_BACKEND', 'gemini')
+        
+        # Model Transport Configuration (pool and keep-alive apply to the gemini_rest backend)
+        self.model_transport = os.getenv('MODEL_TRANSPORT', 'grpc')
+        self.model_pool_size = int(os.getenv('MODEL_POOL_SIZE', '32'))
+        self.model_keepalive = os.getenv('MODEL_KEEPALIVE', 'true').lower() == 'true'
+        self.model_connect_timeout = float(os.getenv('MODEL_CONNECT_TIMEOUT', '5'))
+        self.model_read_timeout = float(os.getenv('MODEL_READ_TIMEOUT', '60'))
+        self.model_endpoint = os.getenv('MODEL_ENDPOINT', 'https://generativelanguage.googleapis.com')
+        self.stub_latency_ms = float(os.getenv('STUB_LATENCY_MS', '50'))
+        self.stub_latency_distribution = os.getenv('STUB_LATENCY_DISTRIBUTION', 'fixed')
+        self.stub_latency_jitter_ms = float(os.getenv('STUB_LATENCY_JITTER_MS', '0'))
+        self.stub_chunk_size = int(os.getenv('STUB_CHUNK_SIZE', '64'))
+        self.stub_error_rate = float(os.getenv('STUB_ERROR_RATE', '0'))
+        self.stub_seed = int(os.getenv('STUB_SEED', '0'))
+        
         # Application Configuration
         self.debug = os.getenv('DEBUG', 'False').lower() == 'true'
         self.log_level = os.getenv('LOG_LEVEL', 'INFO')
+        self.log_format = os.getenv('LOG_FORMAT', 'text')
+        self.log_file = os.getenv('LOG_FILE', 'vantage_ai.log')
+        self.log_queue_size = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+        self.log_debug_sample_rate = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', '1.0'))
         
         # RAG Configuration
         self.vector_db_path = os.getenv('VECTOR_DB_PATH', 'data/vector_db')
         self.embedding_model = os.getenv('EMBEDDING_MODEL', 'all-MiniLM-L6-v2')
+        self.embedding_batch_size = int(os.getenv('EMBEDDING_BATCH_SIZE', '32'))
+        self.embedding_max_wait_ms = float(os.getenv('EMBEDDING_MAX_WAIT_MS', '5'))
         self.max_retrieval_results = int(os.getenv('MAX_RETRIEVAL_RESULTS', '5'))
+        # Vector index (needs numpy): quantization none, int8 or pq
+        self.vector_search = os.getenv('VECTOR_SEARCH', 'false').lower() == 'true'
+        self.vector_quantization = os.getenv('VECTOR_QUANTIZATION', 'int8')
+        self.vector_pq_subvectors = int(os.getenv('VECTOR_PQ_SUBVECTORS', '32'))
+        self.vector_rescore_factor = int(os.getenv('VECTOR_RESCORE_FACTOR', '4'))
         
         # Persona Configuration
         self.default_persona = os.getenv('DEFAULT_PERSONA', 'college_student')
+        self.persona_data_dir = os.getenv('PERSONA_DATA_DIR', 'data/personas')
         self.max_context_length = int(os.getenv('MAX_CONTEXT_LENGTH', '1000'))
+        # Context entries each persona remembers per session
+        self.max_context_entries = int(os.getenv('MAX_CONTEXT_ENTRIES', '10'))
+        
+        # API Server Configuration
+        self.api_host = os.getenv('API_HOST', '0.0.0.0')
+        self.api_port = int(os.getenv('API_PORT', '8000'))
+        self.api_workers = int(os.getenv('API_WORKERS', '1'))
+        self.api_max_concurrency = int(os.getenv('API_MAX_CONCURRENCY', '32'))
+        self.api_max_connections = int(os.getenv('API_MAX_CONNECTIONS', '256'))
+        self.api_queue_timeout = float(os.getenv('API_QUEUE_TIMEOUT', '5'))
+        self.api_request_timeout = float(os.getenv('API_REQUEST_TIMEOUT', '60'))
+        self.api_shutdown_grace = float(os.getenv('API_SHUTDOWN_GRACE', '30'))
+        self.api_max_batch_size = int(os.getenv('API_MAX_BATCH_SIZE', '50'))
+        
+        # Worker Process Configuration (CPU_WORKERS processes for CPU-bound stages; 0 disables,
+        # -1 uses one per CPU)
+        self.cpu_workers = int(os.getenv('CPU_WORKERS', '0'))
+        self.cpu_offload_min_chars = int(os.getenv('CPU_OFFLOAD_MIN_CHARS', '16384'))
+        
+        # Usage Accounting Configuration
+        # JSON object: model name -> {"input", "output", "cached"} USD per million tokens
+        self.model_pricing = json.loads(os.getenv('MODEL_PRICING', '{}'))
+        
+        # Metrics Configuration
+        self.metrics_enabled = os.getenv('METRICS_ENABLED', 'false').lower() == 'true'
+        self.metrics_exporters = [name.strip() for name in os.getenv('METRICS_EXPORTERS', 'prometheus').split(',')]
+        
+        # Profiling Configuration
+        self.profiling_enabled = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+        self.profiling_dir = os.getenv('PROFILING_DIR', 'profiles')
+        self.profiling_top_n = int(os.getenv('PROFILING_TOP_N', '30'))
+        self.profiling_sort = os.getenv('PROFILING_SORT', 'cumulative')
+        self.profiling_dump_each = os.getenv('PROFILING_DUMP_EACH', 'true').lower() == 'true'
+        self.profiling_signal = os.getenv('PROFILING_SIGNAL', 'true').lower() == 'true'
+        # Required as X-Admin-Token by the /admin and /usage endpoints (disabled while empty)
+        self.api_admin_token = os.getenv('API_ADMIN_TOKEN', '')
+        
+        # Model Routing Configuration (comma-separated models per tier: primary, then fallbacks)
+        self.model_routing = os.getenv('MODEL_ROUTING', 'false').lower() == 'true'
+        self.routing_simple_models = self._model_list('ROUTING_SIMPLE_MODELS', 'gemini-2.0-flash-lite')
+        self.routing_medium_models = self._model_list('ROUTING_MEDIUM_MODELS', 'gemini-2.0-flash')
+        self.routing_complex_models = self._model_list('ROUTING_COMPLEX_MODELS', 'gemini-2.5-pro,gemini-2.0-flash')
+        self.routing_simple_threshold = float(os.getenv('ROUTING_SIMPLE_THRESHOLD', '1.5'))
+        self.routing_complex_threshold = float(os.getenv('ROUTING_COMPLEX_THRESHOLD', '3.5'))
         
         # Output Configuration
         self.default_output_format = os.getenv('DEFAULT_OUTPUT_FORMAT', 'structured')
         self.max_response_length = int(os.getenv('MAX_RESPONSE_LENGTH', '2000'))
+        
+        # Resilience Configuration
+        self.max_retries = int(os.getenv('MAX_RETRIES', '3'))
+        self.retry_base_delay = float(os.getenv('RETRY_BASE_DELAY', '0.5'))
+        self.retry_max_delay = float(os.getenv('RETRY_MAX_DELAY', '8.0'))
+        self.hedge_requests = os.getenv('HEDGE_REQUESTS', 'False').lower() == 'true'
+        self.hedge_percentile = float(os.getenv('HEDGE_PERCENTILE', '95'))
+        self.circuit_failure_threshold = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5'))
+        self.circuit_reset_timeout = float(os.getenv('CIRCUIT_RESET_TIMEOUT', '30'))
+        self.coalesce_requests = os.getenv('COALESCE_REQUESTS', 'True').lower() == 'true'
+        
+        # Session Configuration
+        self.chat_token_budget = int(os.getenv('CHAT_TOKEN_BUDGET', '4000'))
+        self.max_sessions = int(os.getenv('MAX_SESSIONS', '10000'))
+        self.session_ttl = float(os.getenv('SESSION_TTL', '3600'))
+    
+    @staticmethod
+    def _model_list(name: str, default: str) -> List[str]:
+        return [model.strip() for model in os.getenv(name, default).split(',') if model.strip()]
     
     def get(self, key: str, default: Any = None) -> Any:
         """Get configuration value"""
@@ -47,20 +149,86 @@ class Config:
         return {
             'gemini_api_key': self.gemini_api_key,
             'default_model': self.default_model,
+            'model_backend': self.model_backend,
+            'model_transport': self.model_transport,
+            'model_pool_size': self.model_pool_size,
+            'model_keepalive': self.model_keepalive,
+            'model_connect_timeout': self.model_connect_timeout,
+            'model_read_timeout': self.model_read_timeout,
+            'model_endpoint': self.model_endpoint,
+            'stub_latency_ms': self.stub_latency_ms,
+            'stub_latency_distribution': self.stub_latency_distribution,
+            'stub_latency_jitter_ms': self.stub_latency_jitter_ms,
+            'stub_chunk_size': self.stub_chunk_size,
+            'stub_error_rate': self.stub_error_rate,
+            'stub_seed': self.stub_seed,
             'debug': self.debug,
             'log_level': self.log_level,
+            'log_format': self.log_format,
+            'log_file': self.log_file,
+            'log_queue_size': self.log_queue_size,
+            'log_debug_sample_rate': self.log_debug_sample_rate,
             'vector_db_path': self.vector_db_path,
             'embedding_model': self.embedding_model,
+            'embedding_batch_size': self.embedding_batch_size,
+            'embedding_max_wait_ms': self.embedding_max_wait_ms,
             'max_retrieval_results': self.max_retrieval_results,
+            'vector_search': self.vector_search,
+            'vector_quantization': self.vector_quantization,
+            'vector_pq_subvectors': self.vector_pq_subvectors,
+            'vector_rescore_factor': self.vector_rescore_factor,
             'default_persona': self.default_persona,
+            'persona_data_dir': self.persona_data_dir,
             'max_context_length': self.max_context_length,
+            'max_context_entries': self.max_context_entries,
+            'api_host': self.api_host,
+            'api_port': self.api_port,
+            'api_workers': self.api_workers,
+            'api_max_concurrency': self.api_max_concurrency,
+            'api_max_connections': self.api_max_connections,
+            'api_queue_timeout': self.api_queue_timeout,
+            'api_request_timeout': self.api_request_timeout,
+            'api_shutdown_grace': self.api_shutdown_grace,
+            'api_max_batch_size': self.api_max_batch_size,
+            'cpu_workers': self.cpu_workers,
+            'cpu_offload_min_chars': self.cpu_offload_min_chars,
+            'model_pricing': self.model_pricing,
+            'metrics_enabled': self.metrics_enabled,
+            'metrics_exporters': self.metrics_exporters,
+            'model_routing': self.model_routing,
+            'routing_simple_models': self.routing_simple_models,
+            'routing_medium_models': self.routing_medium_models,
+            'routing_complex_models': self.routing_complex_models,
+            'routing_simple_threshold': self.routing_simple_threshold,
+            'routing_complex_threshold': self.routing_complex_threshold,
+            'profiling_enabled': self.profiling_enabled,
+            'profiling_dir': self.profiling_dir,
+            'profiling_top_n': self.profiling_top_n,
+            'profiling_sort': self.profiling_sort,
+            'profiling_dump_each': self.profiling_dump_each,
+            'profiling_signal': self.profiling_signal,
             'default_output_format': self.default_output_format,
-            'max_response_length': self.max_response_length
+            'max_response_length': self.max_response_length,
+            'max_retries': self.max_retries,
+            'retry_base_delay': self.retry_base_delay,
+            'retry_max_delay': self.retry_max_delay,
+            'hedge_requests': self.hedge_requests,
+            'hedge_percentile': self.hedge_percentile,
+            'circuit_failure_threshold': self.circuit_failure_threshold,
+            'circuit_reset_timeout': self.circuit_reset_timeout,
+            'coalesce_requests': self.coalesce_requests,
+            'chat_token_budget': self.chat_token_budget,
+            'max_sessions': self.max_sessions,
+            'session_ttl': self.session_ttl
         }
     
     def validate(self) -> bool:
         """Validate configuration"""
-        if not self.gemini_api_key:
+        if self.model_backend in ('gemini', 'gemini_rest') and not self.gemini_api_key:
             raise ValueError("GEMINI_API_KEY is required")
         return True
 
+@functools.lru_cache(maxsize=None)
+def get_config() -> Config:
+    """Get the process-wide configuration, built on first use"""
+    return Config()
@@ -0,0 +1,49 @@
+"""
+Deferred imports for heavy and optional dependencies in Vantage AI PersonaPilot
+"""
+
+from typing import Any, Dict, Optional
+import importlib
+import threading
+
+# pip extra that provides each optional module (see setup.py extras_require)
+OPTIONAL_EXTRAS = {
+    "sentence_transformers": "rag",
+    "faiss": "rag",
+    "numpy": "rag",
+    "fastapi": "web",
+    "uvicorn": "web",
+    "opentelemetry.trace": "otel",
+    "opentelemetry.metrics": "otel",
+    "opentelemetry.trace.status": "otel",
+    "google.generativeai": None,
+    "requests": None,
+    "urllib3.connectionpool": None
+}
+
+_cache: Dict[str, Optional[Any]] = {}
+_lock = threading.Lock()
+
+
+def optional_import(module_name: str) -> Optional[Any]:
+    """Import a module on first use, returning None if it is not installed"""
+    if module_name in _cache:
+        return _cache[module_name]
+    with _lock:
+        if module_name not in _cache:
+            try:
+                _cache[module_name] = importlib.import_module(module_name)
+            except ImportError:
+                _cache[module_name] = None
+        return _cache[module_name]
+
+
+def require(module_name: str, feature: str = "") -> Any:
+    """Import a module on first use, raising a helpful ImportError if it is missing"""
+    module = optional_import(module_name)
+    if module is None:
+        extra = OPTIONAL_EXTRAS.get(module_name)
+        hint = f"pip install vantage-ai-personapilot[{extra}]" if extra else f"pip install {module_name.split('.')[0]}"
+        needed_for = f" for {feature}" if feature else ""
+        raise ImportError(f"'{module_name}' is required{needed_for}; install it with: {hint}")
+    return module
@@ -1,63 +1,197 @@
 """
 Logging utilities for Vantage AI PersonaPilot
+
+Logging never does I/O on the calling thread. setup_logger attaches a
+QueueHandler that only snapshots the record (message and traceback text) and
+enqueues it; a QueueListener thread formats the record and writes it to the
+console and, in debug mode, to a file. When the queue is full, records are
+dropped and counted instead of blocking the caller.
+
+Records are written as text or, with LOG_FORMAT=json, as one JSON object per
+line. Debug records can be sampled with LOG_DEBUG_SAMPLE_RATE so verbose
+hot-path logging stays cheap; info and above are always kept.
 """
 
+import atexit
+import copy
+import json
 import logging
+import queue
+import random
 import sys
-from typing import Optional
-from .config import Config
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, List, Optional
+from .config import Config, get_config
+
+# Logger of the application's own modules (they log via logging.getLogger(__name__))
+PACKAGE_LOGGER = "src"
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Attributes every LogRecord has; anything else was passed via `extra=`
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional['NonBlockingQueueHandler'] = None
+_setup_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as single-line JSON objects"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DebugSampler(logging.Filter):
+    """Keeps a fraction of debug records; info and above always pass"""
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.rate = min(1.0, max(0.0, rate))
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener and never blocks"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Snapshot what may change or hold frames after the call returns:
+        # the merged message (args can be mutable) and the traceback text.
+        # Timestamps, JSON encoding and the rest of formatting run on the listener.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def create_formatter(log_format: str = "text") -> logging.Formatter:
+    """Build the formatter for a LOG_FORMAT value (text or json)"""
+    if log_format == "json":
+        return JsonFormatter()
+    if log_format != "text":
+        raise ValueError(f"Log format '{log_format}' not found. Available: ['text', 'json']")
+    return logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT)
+
+
+def _create_handlers(config: Config, log_level: str) -> List[logging.Handler]:
+    formatter = create_formatter(config.log_format)
+
+    # Create console handler
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setLevel(getattr(logging, log_level.upper()))
+    console_handler.setFormatter(formatter)
+    handlers: List[logging.Handler] = [console_handler]
+
+    # Create file handler for debug mode
+    if config.debug:
+        file_handler = logging.FileHandler(config.log_file)
+        file_handler.setLevel(logging.DEBUG)
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+    return handlers
+
 
-def setup_logger(name: str = "vantage_ai", 
+def setup_logger(name: str = "vantage_ai",
                 level: Optional[str] = None,
                 config: Optional[Config] = None) -> logging.Logger:
     """
     Setup and configure logger
-    
+
+    The named logger and the package logger (which the src.* modules log
+    through) share one queue handler, so the first call starts the listener
+    thread and later calls only attach it to further loggers.
+
     Args:
         name: Logger name
         level: Log level (if not provided, uses config)
         config: Configuration object
-        
+
     Returns:
         Configured logger
     """
+    global _listener, _queue_handler
     if config is None:
-        config = Config()
-    
-    log_level = level or config.log_level
-    
-    # Create logger
-    logger = logging.getLogger(name)
-    logger.setLevel(getattr(logging, log_level.upper()))
-    
-    # Avoid adding handlers if they already exist
-    if logger.handlers:
-        return logger
-    
-    # Create console handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(getattr(logging, log_level.upper()))
-    
-    # Create formatter
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    console_handler.setFormatter(formatter)
-    
-    # Add handler to logger
-    logger.addHandler(console_handler)
-    
-    # Create file handler for debug mode
-    if config.debug:
-        file_handler = logging.FileHandler('vantage_ai.log')
-        file_handler.setLevel(logging.DEBUG)
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-    
-    return logger
+        config = get_config()
+
+    log_level = getattr(logging, (level or config.log_level).upper())
+
+    with _setup_lock:
+        if _queue_handler is None:
+            log_queue: queue.Queue = queue.Queue(config.log_queue_size)
+            _queue_handler = NonBlockingQueueHandler(log_queue)
+            _queue_handler.addFilter(DebugSampler(config.log_debug_sample_rate))
+            _listener = QueueListener(log_queue, *_create_handlers(config, level or config.log_level),
+                                      respect_handler_level=True)
+            _listener.start()
+            atexit.register(shutdown_logging)
+
+        for logger_name in (name, PACKAGE_LOGGER):
+            target = logging.getLogger(logger_name)
+            target.setLevel(log_level)
+            # Avoid adding the handler twice
+            if _queue_handler not in target.handlers:
+                target.addHandler(_queue_handler)
+
+    return logging.getLogger(name)
+
+def shutdown_logging():
+    """Write out queued records and stop the listener thread"""
+    global _listener, _queue_handler
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+            _listener = None
+        if _queue_handler is not None:
+            for logger_name in list(logging.Logger.manager.loggerDict) + [""]:
+                target = logging.getLogger(logger_name)
+                if _queue_handler in target.handlers:
+                    target.removeHandler(_queue_handler)
+            _queue_handler = None
+
+def dropped_records() -> int:
+    """Records dropped because the log queue was full"""
+    return _queue_handler.dropped if _queue_handler is not None else 0
 
 def get_logger(name: str = "vantage_ai") -> logging.Logger:
     """Get a logger instance"""
     return logging.getLogger(name)
-
@@ -0,0 +1,372 @@
+"""
+Metrics and tracing for Vantage AI PersonaPilot
+
+Pipeline stages are timed with span(), which records into an in-process
+histogram registry and forwards to any configured exporters:
+
+- PrometheusExporter renders the registry in the Prometheus text format
+  (served at /metrics by the HTTP API)
+- OpenTelemetryExporter mirrors spans and instruments through the
+  opentelemetry API (the SDK, providers and exporters are configured by the
+  application, as usual for OpenTelemetry)
+
+Metrics are off by default. While disabled, span() returns a shared no-op
+context manager and observe()/increment() return after a flag check.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import bisect
+import threading
+import time
+
+from .lazy_imports import require
+
+# Metric names
+STAGE_SECONDS = "vantage_stage_duration_seconds"
+TIME_TO_FIRST_CHUNK_SECONDS = "vantage_model_time_to_first_chunk_seconds"
+MODEL_TOKENS = "vantage_model_tokens"
+MODEL_REQUESTS = "vantage_model_requests_total"
+TOKENS_TOTAL = "vantage_tokens_total"
+MODEL_ROUTES = "vantage_model_routes_total"
+MODEL_FALLBACKS = "vantage_model_fallbacks_total"
+EMBEDDING_BATCH_SIZE = "vantage_embedding_batch_size"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (16, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        # label values -> [bucket counts (last is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: Dict[str, Any]):
+        """Record one observation"""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self) -> List[Tuple[Dict[str, str], List[int], float, int]]:
+        """Snapshot as (labels, cumulative bucket counts, sum, count) per series"""
+        with self._lock:
+            snapshot = [(key, list(series[0]), series[1], series[2]) for key, series in self._series.items()]
+        result = []
+        for key, counts, total, count in snapshot:
+            cumulative, running = [], 0
+            for bucket_count in counts:
+                running += bucket_count
+                cumulative.append(running)
+            result.append((dict(zip(self.labelnames, key)), cumulative, total, count))
+        return result
+
+
+class Counter:
+    """Monotonic counter keyed by label values"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, amount: float, labels: Dict[str, Any]):
+        """Add to the counter"""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def collect(self) -> List[Tuple[Dict[str, str], float]]:
+        """Snapshot as (labels, value) per series"""
+        with self._lock:
+            snapshot = list(self._values.items())
+        return [(dict(zip(self.labelnames, key)), value) for key, value in snapshot]
+
+
+class MetricsRegistry:
+    """Named metrics of one process"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Add a metric (the existing one is kept if the name is taken)"""
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def get(self, name: str):
+        """Get a metric by name (None if unknown)"""
+        return self._metrics.get(name)
+
+    def metrics(self) -> List[Any]:
+        """All registered metrics"""
+        with self._lock:
+            return list(self._metrics.values())
+
+
+class MetricsExporter:
+    """Hooks called for every span and observation while metrics are enabled"""
+
+    name = "base"
+
+    def start_span(self, stage: str, labels: Dict[str, Any]) -> Any:
+        """Called when a span starts; the return value is passed to end_span"""
+        return None
+
+    def end_span(self, token: Any, elapsed: float, error: Optional[BaseException]):
+        """Called when a span ends"""
+
+    def record(self, metric, value: float, labels: Dict[str, Any]):
+        """Called for every histogram observation or counter increment"""
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [(name, value) for name, value in labels.items() if value != ""]
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + "}"
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class PrometheusExporter(MetricsExporter):
+    """Renders the registry in the Prometheus text exposition format"""
+
+    name = "prometheus"
+    content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.registry = registry
+
+    def render(self) -> str:
+        """Current values of every metric as Prometheus text"""
+        lines: List[str] = []
+        for metric in (self.registry or get_registry()).metrics():
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            if metric.kind == "histogram":
+                bounds = [_format_number(bound) for bound in metric.buckets] + ["+Inf"]
+                for labels, cumulative, total, count in metric.collect():
+                    for bound, bucket_count in zip(bounds, cumulative):
+                        lines.append(f"{metric.name}_bucket{_format_labels(labels, ('le', bound))} {bucket_count}")
+                    lines.append(f"{metric.name}_sum{_format_labels(labels)} {total!r}")
+                    lines.append(f"{metric.name}_count{_format_labels(labels)} {count}")
+            else:
+                for labels, value in metric.collect():
+                    lines.append(f"{metric.name}{_format_labels(labels)} {_format_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class OpenTelemetryExporter(MetricsExporter):
+    """Mirrors spans and metrics through the OpenTelemetry API"""
+
+    name = "otel"
+
+    def __init__(self, instrumentation_name: str = "vantage_ai"):
+        trace = require("opentelemetry.trace", "OpenTelemetry export")
+        otel_metrics = require("opentelemetry.metrics", "OpenTelemetry export")
+        self._status = require("opentelemetry.trace.status", "OpenTelemetry export")
+        self._tracer = trace.get_tracer(instrumentation_name)
+        self._meter = otel_metrics.get_meter(instrumentation_name)
+        self._instruments: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def start_span(self, stage: str, labels: Dict[str, Any]) -> Any:
+        manager = self._tracer.start_as_current_span(
+            stage, attributes={name: str(value) for name, value in labels.items()}
+        )
+        span = manager.__enter__()
+        return manager, span
+
+    def end_span(self, token: Any, elapsed: float, error: Optional[BaseException]):
+        manager, span = token
+        if error is not None:
+            span.record_exception(error)
+            span.set_status(self._status.Status(self._status.StatusCode.ERROR, str(error)))
+            manager.__exit__(type(error), error, error.__traceback__)
+        else:
+            manager.__exit__(None, None, None)
+
+    def record(self, metric, value: float, labels: Dict[str, Any]):
+        instrument = self._instruments.get(metric.name)
+        if instrument is None:
+            with self._lock:
+                instrument = self._instruments.get(metric.name)
+                if instrument is None:
+                    if metric.kind == "histogram":
+                        instrument = self._meter.create_histogram(metric.name, description=metric.description)
+                    else:
+                        instrument = self._meter.create_counter(metric.name, description=metric.description)
+                    self._instruments[metric.name] = instrument
+        attributes = {name: str(value) for name, value in labels.items() if value not in (None, "")}
+        if metric.kind == "histogram":
+            instrument.record(value, attributes=attributes)
+        else:
+            instrument.add(value, attributes=attributes)
+
+
+EXPORTERS = {
+    PrometheusExporter.name: PrometheusExporter,
+    OpenTelemetryExporter.name: OpenTelemetryExporter
+}
+
+_registry = MetricsRegistry()
+_registry.register(Histogram(STAGE_SECONDS, "Duration of persona pipeline stages",
+                             LATENCY_BUCKETS, ("stage", "persona", "model", "status")))
+_registry.register(Histogram(TIME_TO_FIRST_CHUNK_SECONDS, "Time until the first streamed chunk arrives",
+                             LATENCY_BUCKETS, ("model",)))
+_registry.register(Histogram(MODEL_TOKENS, "Tokens per model call",
+                             TOKEN_BUCKETS, ("model", "direction")))
+_registry.register(Counter(MODEL_REQUESTS, "Model calls by outcome", ("model", "status")))
+_registry.register(Counter(TOKENS_TOTAL, "Tokens consumed by model, persona and direction (input, output, cached)",
+                           ("model", "persona", "direction")))
+_registry.register(Counter(MODEL_ROUTES, "Queries routed by complexity and model", ("complexity", "model")))
+_registry.register(Counter(MODEL_FALLBACKS, "Calls moved to a fallback model after a failure",
+                           ("from_model", "to_model")))
+_registry.register(Histogram(EMBEDDING_BATCH_SIZE, "Texts encoded per embedding batch",
+                             BATCH_SIZE_BUCKETS, ("encoder",)))
+
+_enabled = False
+_exporters: List[MetricsExporter] = []
+
+
+def get_registry() -> MetricsRegistry:
+    """The process-wide metrics registry"""
+    return _registry
+
+
+def metrics_enabled() -> bool:
+    """Whether metrics are being recorded"""
+    return _enabled
+
+
+def configure_metrics(enabled: bool = True, exporters: Iterable[str] = ("prometheus",)) -> List[MetricsExporter]:
+    """
+    Turn metrics on or off and choose exporters
+
+    Args:
+        enabled: Record spans and metrics
+        exporters: Exporter names (prometheus, otel)
+
+    Returns:
+        The active exporters
+    """
+    global _enabled, _exporters
+    active = []
+    if enabled:
+        for name in exporters:
+            name = name.strip()
+            if not name:
+                continue
+            if name not in EXPORTERS:
+                raise ValueError(f"Metrics exporter '{name}' not found. Available: {list(EXPORTERS.keys())}")
+            active.append(EXPORTERS[name]())
+    _exporters = active
+    _enabled = enabled
+    return active
+
+
+def get_exporter(name: str) -> Optional[MetricsExporter]:
+    """Get an active exporter by name"""
+    for exporter in _exporters:
+        if exporter.name == name:
+            return exporter
+    return None
+
+
+def observe(metric_name: str, value: float, **labels):
+    """Record a histogram observation"""
+    if not _enabled:
+        return
+    metric = _registry.get(metric_name)
+    metric.observe(value, labels)
+    for exporter in _exporters:
+        exporter.record(metric, value, labels)
+
+
+def increment(metric_name: str, amount: float = 1, **labels):
+    """Increase a counter"""
+    if not _enabled:
+        return
+    metric = _registry.get(metric_name)
+    metric.increment(amount, labels)
+    for exporter in _exporters:
+        exporter.record(metric, amount, labels)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("stage", "labels", "start", "tokens")
+
+    def __init__(self, stage: str, labels: Dict[str, Any]):
+        self.stage = stage
+        self.labels = labels
+
+    def __enter__(self):
+        exporters = _exporters
+        self.tokens = [(exporter, exporter.start_span(self.stage, self.labels)) for exporter in exporters]
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        observe(STAGE_SECONDS, elapsed, stage=self.stage, status="error" if exc_type else "ok", **self.labels)
+        for exporter, token in self.tokens:
+            exporter.end_span(token, elapsed, exc)
+        return False
+
+
+def span(stage: str, **labels):
+    """
+    Time a pipeline stage
+
+    Usage:
+        with span("format", persona=persona.name):
+            ...
+
+    Args:
+        stage: Stage name
+        **labels: Low-cardinality labels (persona, model)
+    """
+    if not _enabled:
+        return _NOOP_SPAN
+    return _Span(stage, labels)
@@ -0,0 +1,402 @@
+"""
+Opt-in CPU profiling for Vantage AI PersonaPilot
+
+While profiling is enabled, PersonaManager.get_response runs under cProfile,
+and get_batch_responses profiles every query on its worker thread and adds
+them up into one profile per batch. Each profile can be written to the dump
+directory as a .prof file (open it with pstats, snakeviz, or gprof2dot). All
+profiles are also added to a running aggregate, which report() and
+top_functions() summarize as the top-N hot functions.
+
+Profiling can be switched on at runtime without a restart: send SIGUSR2 to
+the process (see install_signal_handler) or use the /admin/profiling
+endpoints of the HTTP API. Both act on the process that receives them, so
+with several API workers each worker is toggled separately.
+
+capture_flamegraph() samples the stacks of every thread for a few seconds
+and writes them in the folded format read by flamegraph.pl, speedscope and
+inferno. It works whether or not cProfile profiling is enabled.
+
+While disabled, profiled() returns a shared no-op context manager.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+from collections import Counter
+import cProfile
+import io
+import logging
+import os
+import pstats
+import re
+import signal
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Profile kinds (used in dump file names)
+REQUEST = "request"
+BATCH = "batch"
+
+SORT_KEYS = {"cumulative": 3, "tottime": 2, "calls": 1}
+
+_local = threading.local()
+
+
+def _safe_label(label: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", label)[:64] or "unnamed"
+
+
+def _profile_stats(profile: cProfile.Profile) -> Optional[pstats.Stats]:
+    """Stats of a finished profile (None if it recorded nothing)"""
+    profile.create_stats()
+    if not profile.stats:
+        return None
+    return pstats.Stats(profile)
+
+
+class Profiler:
+    """Collects cProfile profiles of requests and batches"""
+
+    def __init__(self,
+                 dump_dir: str = "profiles",
+                 top_n: int = 30,
+                 sort: str = "cumulative",
+                 dump_each: bool = True):
+        """
+        Initialize the profiler (disabled until enable() is called)
+
+        Args:
+            dump_dir: Directory for .prof dumps, reports and flame graphs
+            top_n: Default number of functions in reports
+            sort: Report order (cumulative, tottime or calls)
+            dump_each: Write a .prof file for every request and batch
+        """
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Profile sort '{sort}' not found. Available: {list(SORT_KEYS.keys())}")
+        self.dump_dir = dump_dir
+        self.top_n = top_n
+        self.sort = sort
+        self.dump_each = dump_each
+        self.enabled = False
+        self.profiles = 0
+        self.skipped = 0
+        self._aggregate: Optional[pstats.Stats] = None
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def enable(self):
+        """Start profiling requests and batches"""
+        self.enabled = True
+        logger.info("Profiling enabled (dumps in %s)", self.dump_dir)
+
+    def disable(self) -> Optional[str]:
+        """Stop profiling and write the aggregate report; returns its path"""
+        self.enabled = False
+        path = self.write_report()
+        logger.info("Profiling disabled after %s profiles", self.profiles)
+        return path
+
+    def toggle(self) -> bool:
+        """Switch profiling on or off; returns the new state"""
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+        return self.enabled
+
+    def reset(self):
+        """Discard the aggregate"""
+        with self._lock:
+            self._aggregate = None
+            self.profiles = 0
+            self.skipped = 0
+
+    def _next_path(self, kind: str, label: str, suffix: str) -> str:
+        with self._lock:
+            self._sequence += 1
+            sequence = self._sequence
+        os.makedirs(self.dump_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        return os.path.join(self.dump_dir, f"{kind}-{stamp}-{os.getpid()}-{sequence:06d}-{_safe_label(label)}{suffix}")
+
+    def collect(self, stats: Optional[pstats.Stats], kind: str, label: str):
+        """Dump one finished profile (if dump_each) and add it to the aggregate"""
+        if stats is None:
+            return
+        if self.dump_each:
+            try:
+                stats.dump_stats(self._next_path(kind, label, ".prof"))
+            except OSError as e:
+                logger.warning("Could not write profile: %s", e)
+        with self._lock:
+            if self._aggregate is None:
+                self._aggregate = pstats.Stats()
+            self._aggregate.add(stats)
+            self.profiles += 1
+
+    def top_functions(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Hottest functions of the aggregate
+
+        Args:
+            limit: Number of functions (defaults to top_n)
+
+        Returns:
+            Dictionaries with function, calls, tottime and cumtime, hottest first
+        """
+        with self._lock:
+            if self._aggregate is None:
+                return []
+            entries = list(self._aggregate.stats.items())
+        slot = SORT_KEYS[self.sort]
+        entries.sort(key=lambda item: item[1][slot], reverse=True)
+        return [
+            {
+                "function": pstats.func_std_string(func),
+                "calls": calls,
+                "tottime": tottime,
+                "cumtime": cumtime
+            }
+            for func, (_, calls, tottime, cumtime, _) in entries[:limit or self.top_n]
+        ]
+
+    def report(self, limit: Optional[int] = None) -> str:
+        """Top-N hot functions of the aggregate in the pstats text layout"""
+        stream = io.StringIO()
+        with self._lock:
+            if self._aggregate is None:
+                return "No profiles collected\n"
+            stats = pstats.Stats(stream=stream)
+            stats.add(self._aggregate)
+        stream.write(f"Aggregate of {self.profiles} profiles\n")
+        stats.sort_stats(self.sort).print_stats(limit or self.top_n)
+        return stream.getvalue()
+
+    def write_report(self) -> Optional[str]:
+        """Write the aggregate (.prof) and its top-N report (.txt); returns the report path"""
+        with self._lock:
+            if self._aggregate is None:
+                return None
+            aggregate = pstats.Stats()
+            aggregate.add(self._aggregate)
+        try:
+            path = self._next_path("aggregate", "all", "")
+            aggregate.dump_stats(path + ".prof")
+            with open(path + ".txt", "w", encoding="utf-8") as f:
+                f.write(self.report())
+        except OSError as e:
+            logger.warning("Could not write profile report: %s", e)
+            return None
+        return path + ".txt"
+
+
+class _NoopSection:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def wrap(self, func: Callable[..., T]) -> Callable[..., T]:
+        return func
+
+
+_NOOP_SECTION = _NoopSection()
+
+
+class _ThreadSection:
+    """Profiles the calling thread for the duration of the block and hands the stats to a sink"""
+
+    __slots__ = ("sink", "profile")
+
+    def __init__(self, sink: Callable[[Optional[pstats.Stats]], None]):
+        self.sink = sink
+        self.profile = None
+
+    def __enter__(self):
+        if getattr(_local, "active", False):
+            # Already inside a profiled batch query on this thread
+            return self
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler (or, on Python 3.12+, a profile on another thread) is active
+            _profiler.skipped += 1
+            return self
+        _local.active = True
+        self.profile = profile
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.profile is not None:
+            self.profile.disable()
+            _local.active = False
+            self.sink(_profile_stats(self.profile))
+        return False
+
+
+class _BatchSection:
+    """Profiles each wrapped call on its own thread and adds them up into one batch profile"""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.stats: Optional[pstats.Stats] = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def wrap(self, func: Callable[..., T]) -> Callable[..., T]:
+        """Wrap a function that runs on a worker thread of the batch"""
+        def profiled_call(*args, **kwargs):
+            with _ThreadSection(self._add):
+                return func(*args, **kwargs)
+        return profiled_call
+
+    def _add(self, stats: Optional[pstats.Stats]):
+        if stats is None:
+            return
+        with self._lock:
+            if self.stats is None:
+                self.stats = pstats.Stats()
+            self.stats.add(stats)
+
+    def __exit__(self, exc_type, exc, tb):
+        _profiler.collect(self.stats, BATCH, self.label)
+        return False
+
+
+_profiler = Profiler()
+
+
+def get_profiler() -> Profiler:
+    """The process-wide profiler"""
+    return _profiler
+
+
+def configure_profiling(enabled: bool = False,
+                        dump_dir: str = "profiles",
+                        top_n: int = 30,
+                        sort: str = "cumulative",
+                        dump_each: bool = True) -> Profiler:
+    """
+    Configure the process-wide profiler
+
+    Args:
+        enabled: Start profiling immediately
+        dump_dir: Directory for .prof dumps, reports and flame graphs
+        top_n: Default number of functions in reports
+        sort: Report order (cumulative, tottime or calls)
+        dump_each: Write a .prof file for every request and batch
+
+    Returns:
+        The profiler
+    """
+    global _profiler
+    if _profiler.enabled:
+        _profiler.disable()
+    _profiler = Profiler(dump_dir, top_n, sort, dump_each)
+    if enabled:
+        _profiler.enable()
+    return _profiler
+
+
+def profiled(label: str = ""):
+    """
+    Profile a request on the calling thread
+
+    Usage:
+        with profiled(persona_name):
+            ...
+    """
+    if not _profiler.enabled:
+        return _NOOP_SECTION
+    profiler = _profiler
+    return _ThreadSection(lambda stats: profiler.collect(stats, REQUEST, label))
+
+
+def profiled_batch(label: str = ""):
+    """
+    Profile a batch whose work runs on worker threads
+
+    Usage:
+        with profiled_batch("batch") as batch:
+            executor.map(batch.wrap(handle), items)
+    """
+    if not _profiler.enabled:
+        return _NOOP_SECTION
+    return _BatchSection(label)
+
+
+def install_signal_handler(signum: Optional[int] = None) -> bool:
+    """
+    Toggle profiling when the process receives a signal (SIGUSR2 by default)
+
+    Returns:
+        Whether the handler was installed (signals are only available on the
+        main thread of POSIX processes)
+    """
+    if signum is None:
+        signum = getattr(signal, "SIGUSR2", None)
+    if signum is None or threading.current_thread() is not threading.main_thread():
+        return False
+
+    def handle(received, frame):
+        # Signal handlers interrupt the main thread; log and write the report elsewhere
+        threading.Thread(target=_profiler.toggle, name="profile-toggle", daemon=True).start()
+
+    signal.signal(signum, handle)
+    return True
+
+
+def _fold_stack(frame) -> List[str]:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def capture_flamegraph(seconds: float = 10.0, interval: float = 0.005, path: Optional[str] = None) -> str:
+    """
+    Sample the stacks of all threads and write them as folded stacks
+
+    Each output line is "thread;outer;...;inner count", the input format of
+    flamegraph.pl, speedscope and inferno. Blocks for `seconds`.
+
+    Args:
+        seconds: Sampling duration
+        interval: Time between samples
+        path: Output file (defaults to a new file in the profiler's dump directory)
+
+    Returns:
+        Path of the written file
+    """
+    own_id = threading.get_ident()
+    samples: Counter = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack = _fold_stack(frame)
+            samples[";".join([names.get(thread_id, str(thread_id))] + stack)] += 1
+        time.sleep(interval)
+
+    path = path or _profiler._next_path("flamegraph", "threads", ".folded")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, count in samples.most_common():
+            f.write(f"{stack} {count}\n")
+    logger.info("Wrote flame graph samples to %s", path)
+    return path